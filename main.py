@@ -2,9 +2,10 @@ import datetime
 import logging
 
 from trading.BackTestMain import back_test, back_test_range
-from trading.HistoricalDataMain import historical_data
+from trading.HistoricalDataMain import historical_data, download_historical_data, copy_historical_data
 from trading.ScreenerMain import screen
 from trading.SetupMain import set_up
+from trading.SweepMain import sweep_range, successive_halving_range
 from trading.TradeMain import trade
 from trading.constants import EXCHANGE
 from trading.helpers.AccessTokenHelper import AccessTokenHelper
@@ -28,6 +29,10 @@ if __name__ == '__main__':
     #back_test(kite, instruments_helper, datetime.datetime(2021, 12, 3, 9, 15, 0))
     back_test_range(kite, instruments_helper)
     # historical_data(kite, instruments_helper)
+    # download_historical_data(kite, instruments_helper)
+    # copy_historical_data(kite, instruments_helper)
+    # sweep_range(kite, instruments_helper)
+    # successive_halving_range(kite, instruments_helper)
 
     # screen(kite)
     # set_up(kite, instruments_helper)
@@ -1,22 +1,56 @@
 import datetime
+import hashlib
 import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 
+from trading.analytics.BackTestResultCache import back_test_result_cache
+from trading.analytics.BackTestResultStore import back_test_result_store
+from trading.analytics.TradeAnalytics import TradeAnalytics
 from trading.constants import BACK_TEST, SPM_STRATEGY, EXCHANGE
+from trading.data.CandleCache import candle_cache
 from trading.data.DataManagerFactory import DataManagerFactory
+from trading.data.historical.HistoricalDataDownloader import HistoricalDataDownloader
 from trading.factory.StrategyFactory import StrategyFactory
+from trading.helpers.CodeVersionHelper import code_version_helper
 from trading.workers.BackTestAutoSquareOffWorker import BackTestAutoSquareOffWorker
+from trading.workers.BackTestEngine import BackTestEngine
+from trading.workers.BackTestStrategyRunner import BackTestStrategyRunner
 from trading.zerodha.kite.BackTestOrders import BackTestOrders
 from trading.zerodha.kite.TimeSequencer import get_n_previous_trading_days
 
 
+def download_symbols_for_back_test(kite, instruments_helper, strategies):
+    """
+    Downloads the candles of all the strategies (their symbols, days and candle intervals) with a single download,
+    before their back tests are initialized. Chunks are fetched concurrently within the rate limit of the historical
+    api (see HistoricalDataDownloader) instead of a day at a time
+    """
+    # Period to its symbols, days and candle intervals
+    downloads = {}
+    for strategy in strategies:
+        symbols, days, candle_intervals = downloads.setdefault(strategy.get_period(), (set(), set(), set()))
+
+        symbols.add(strategy.get_symbol())
+        days.add(strategy.get_opening_time().date())
+        candle_intervals.update(ind.get_candle_interval() for ind in strategy.get_indicators())
+
+    downloader = HistoricalDataDownloader(kite, instruments_helper)
+    for period, (symbols, days, candle_intervals) in downloads.items():
+        downloader.download(sorted(symbols), min(days), max(days), sorted(candle_intervals), period)
+
+
 def initialize_symbols_for_back_test(strategies, instruments_helper):
     for strategy in strategies:
         candle_intervals = set()
 
+        # Strategies usually need candles of several intervals. Most of them are built from the same stored candles
         for ind in strategy.get_indicators():
-            candle_intervals.add(ind.get_candle_interval())
+            candle_intervals.add(DataManagerFactory.get_stored_candle_interval(strategy.get_period(),
+                                                                               ind.get_candle_interval()))
 
         for candle_interval in candle_intervals:
             if not initialize_symbol_for_back_test(strategy, candle_interval, instruments_helper):
@@ -42,31 +76,20 @@ def initialize_symbol_for_back_test(strategy, candle_interval, instruments_helpe
     return can_backtest_proceed
 
 
-def start_threads_and_wait(threads):
-    # Start all threads
-    for t in threads:
-        t.start()
-
-    # Wait for all of them to finish
-    for t in threads:
-        t.join()
-
-
 def back_test(kite, instruments_helper, opening_time):
-    threads = []
+    workers = []
     mode = BACK_TEST
-    results = []
     orders = BackTestOrders(kite, 1, 0.90, EXCHANGE)
 
-    # threads.extend(StrategyFactory(kite, mode, instruments_helper).get_strategies(PARABOLIC_SAR))
-    # threads.extend(StrategyFactory(kite, mode, instruments_helper).get_strategies(SUPER_TREND_STRATEGY_7_3))
-    # threads.extend(StrategyFactory(kite, mode, instruments_helper).get_strategies(ADX_STRATEGY))
-    # threads.extend(StrategyFactory(kite, mode, instruments_helper).get_strategies(PARABOLIC_SAR_MTF))
-    threads.extend(StrategyFactory(kite, mode, orders, instruments_helper, opening_time).get_strategies(SPM_STRATEGY))
+    # workers.extend(StrategyFactory(kite, mode, instruments_helper).get_strategies(PARABOLIC_SAR))
+    # workers.extend(StrategyFactory(kite, mode, instruments_helper).get_strategies(SUPER_TREND_STRATEGY_7_3))
+    # workers.extend(StrategyFactory(kite, mode, instruments_helper).get_strategies(ADX_STRATEGY))
+    # workers.extend(StrategyFactory(kite, mode, instruments_helper).get_strategies(PARABOLIC_SAR_MTF))
+    workers.extend(StrategyFactory(kite, mode, orders, instruments_helper, opening_time).get_strategies(SPM_STRATEGY))
 
     # Get all strategies
     strategies = []
-    for worker in threads:
+    for worker in workers:
         if worker.strategy is not None:
             strategies.append(worker.strategy)
 
@@ -77,30 +100,225 @@ def back_test(kite, instruments_helper, opening_time):
             'Status': "FAILED"
         }]
 
-    start_threads_and_wait(threads)
+    return run_back_test(kite, orders, workers, opening_time)
+
 
-    # We have to let the auto square off worker run in the last
-    # Otherwise, it runs pretty fast, even before the strategy threads finish
-    threads = [BackTestAutoSquareOffWorker(kite, orders=orders, opening_time=opening_time)]
-    start_threads_and_wait(threads)
+def run_back_test(kite, orders, workers, opening_time):
+    # All the workers run on one simulated clock. At every minute the strategies act before positions are squared off
+    engine = BackTestEngine(opening_time)
+    for worker in workers:
+        engine.add_worker(worker)
 
-    for s in strategies:
-        results.append(s.get_results())
-        s.plot()
+    engine.add_worker(BackTestAutoSquareOffWorker(kite, orders=orders, opening_time=opening_time))
+    engine.run()
+
+    results = []
+    for worker in workers:
+        if worker.strategy is not None:
+            results.append(worker.strategy.get_results())
+            worker.strategy.plot()
 
     return results
 
 
+def back_test_job(strategy_name, symbol, opening_time, label):
+    """
+    Back tests one strategy for one symbol and one day. Runs in a worker process
+    Candles are read from the local store, so neither kite nor the instruments are needed
+    Only the strategies whose results are not cached are back tested. Results are stored in the results store by
+    the worker itself
+    :return: a list of results
+    """
+    workers = get_job_workers(strategy_name, symbol, opening_time, BackTestOrders(None, 1, 0.90, EXCHANGE))
+
+    data_hashes = [get_data_hash(worker.strategy) for worker in workers]
+    keys = [get_cell_key(worker.strategy, "", data_hash, back_test_job)
+            for worker, data_hash in zip(workers, data_hashes)]
+    cells = [back_test_result_cache.get(key) for key in keys]
+
+    for i, key in enumerate(keys):
+        if cells[i] is not None:
+            continue
+
+        # Every strategy is back tested with orders of its own, so that its trades are not mixed with the others'
+        orders = BackTestOrders(None, 1, 0.90, EXCHANGE)
+        worker = get_job_workers(strategy_name, symbol, opening_time, orders)[i]
+
+        # Days are back tested independently, so the indicator values are not needed by another day. Jobs running at
+        # the same time would also replace each other's stored values
+        worker.persist = False
+
+        run_back_test(None, orders, [worker], opening_time)
+
+        cells[i] = (get_result(worker.strategy, orders), orders.get_trades())
+        back_test_result_cache.put(key, *cells[i])
+
+    back_test_result_store.append([get_run_record(label, strategy_name, "", worker.strategy, data_hash, result, trades)
+                                   for worker, data_hash, (result, trades) in zip(workers, data_hashes, cells)])
+
+    return [result for result, trades in cells]
+
+
+def get_job_workers(strategy_name, symbol, opening_time, orders):
+    """
+    :return: the workers of the strategies the factories create for the symbol, all of them placing the given orders
+    """
+    return [worker for worker in StrategyFactory(None, BACK_TEST, orders, None, opening_time).
+            get_strategies(strategy_name) if worker.strategy is not None and worker.strategy.symbol == symbol]
+
+
+def get_result(strategy, orders):
+    """
+    :return: results of the back test of the strategy. Back tests without any trade have results too, so that they
+    are cached and stored like any other
+    """
+    result = strategy.get_results()
+
+    if result is None:
+        result = {
+            'Status': "PASS",
+            'Total Orders': 0
+        }
+        result.update(TradeAnalytics(orders.get_start_cash()).get_run_statistics(orders.get_trades()))
+
+    return result
+
+
+def get_run_record(label, strategy_name, parameters, strategy, data_hash, result, trades):
+    """
+    :param label: Label of the back tests the run is part of. i.e a sweep
+    :param parameters: Parameters of the strategy that differ from the ones the strategy factories use
+    :param data_hash: Hash of the candles the strategy reads. See get_data_hash
+    :param trades: Trades of the run. See OrderLedger.get_trades
+    :return: the result of a back test run along with its metadata and trades, as kept in the results store
+    """
+    record = {
+        'Sweep': label,
+        'Created': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'Strategy': strategy_name,
+        'Parameters': parameters,
+        'Symbol': strategy.get_symbol(),
+        'Day': str(strategy.get_opening_time().date()),
+        'Data hash': data_hash
+    }
+    record.update(result)
+    record['trades'] = trades
+
+    return record
+
+
+def get_cell_key(strategy, parameters, data_hash, job):
+    """
+    Content address of a back test run of the strategy. It changes whenever anything the results depend on changes
+    i.e the code of the strategy and of the back test, the settings of the orders, the parameters of the strategy and
+    its indicators, the symbol, the session or its candles
+    :param parameters: Parameters of the strategy that differ from the ones the strategy factories use
+    :param data_hash: Hash of the candles the strategy reads. See get_data_hash
+    :param job: Function that runs the back test. Its module is part of the code of the back test
+    :return: hex digest
+    """
+    code_version = code_version_helper.get_code_version([strategy.__class__, job, BackTestEngine, BackTestOrders,
+                                                         BackTestStrategyRunner, BackTestAutoSquareOffWorker])
+
+    indicators = [(ind.indicator_name, ind.candle_interval, ind.candle_length, ind.get_parameters())
+                  for ind in strategy.get_indicators()]
+
+    digest = hashlib.sha1()
+    for part in [strategy.__class__.__name__, code_version, repr(strategy.get_orders().get_settings()), parameters,
+                 repr(indicators), strategy.get_symbol(), str(strategy.get_opening_time()), data_hash]:
+        digest.update(part.encode())
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+def get_data_hash(strategy):
+    """
+    :return: hex digest of all the candles the strategy reads i.e of the candle intervals of its indicators for the
+    session and the one before it
+    """
+    indicators = {}
+    for ind in strategy.get_indicators():
+        indicators.setdefault(ind.candle_interval, ind)
+
+    days = [opening_time.date() for opening_time in get_n_previous_trading_days(2, strategy.get_opening_time())]
+
+    digest = hashlib.sha1()
+    for candle_interval in sorted(indicators):
+        ind = indicators[candle_interval]
+
+        for day in days:
+            digest.update(candle_cache.get_session_hash(ind.symbol, ind.period, candle_interval, day,
+                                                        ind.load_data).encode())
+
+    return digest.hexdigest()
+
+
+def back_test_days(kite, instruments_helper, opening_times, strategy_names, processes=None, label=None):
+    """
+    Back tests the strategies for all the given days in parallel. Every (day, symbol, strategy) is a job of its own
+    Strategies have to be stateless i.e not depend on the previous day's indicator values
+    Candles are downloaded upfront in this process. Jobs only read them
+    :param processes: Number of worker processes. Number of cpus by default
+    :param label: Label the runs are stored with. Start time of the back tests by default
+    :return: a list of results of all the jobs, in the order of the days, strategies and symbols
+    """
+    label = label or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    strategies = []
+    for opening_time in opening_times:
+        for strategy_name in strategy_names:
+            orders = BackTestOrders(kite, 1, 0.90, EXCHANGE)
+            workers = StrategyFactory(kite, BACK_TEST, orders, instruments_helper, opening_time).\
+                get_strategies(strategy_name)
+
+            strategies.extend((strategy_name, opening_time, worker.strategy) for worker in workers
+                              if worker.strategy is not None)
+
+    download_symbols_for_back_test(kite, instruments_helper, [strategy for _, _, strategy in strategies])
+
+    jobs = []
+    for strategy_name, opening_time, strategy in strategies:
+        if not initialize_symbols_for_back_test([strategy], instruments_helper):
+            logging.warning("Back test of {} cannot be done for opening time {}".format(
+                strategy.symbol, opening_time))
+            continue
+
+        jobs.append((strategy_name, strategy.symbol, opening_time, label))
+
+    if not jobs:
+        return []
+
+    processes = processes or os.cpu_count()
+    logging.info("Back testing {} jobs on {} processes".format(len(jobs), processes))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=processes, mp_context=get_pool_context()) as executor:
+        for job_results in executor.map(back_test_job, *zip(*jobs)):
+            results.extend(job_results)
+
+    return results
+
+
+def get_pool_context():
+    """
+    Workers of the pools are forked, so that they start with the candles this process has loaded (the candle cache
+    and the mapped columnar tables) instead of reading them again. Where fork is not available (i.e Windows),
+    workers start afresh and every worker loads the candles it needs from the store
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+
+    return multiprocessing.get_context()
+
+
 def back_test_range(kite, instruments_helper):
     start_time = datetime.datetime(2021, 12, 3, 9, 15, 0)
     days = 5
     opening_times = get_n_previous_trading_days(days, start_time)
-    results = []
 
-    for o in opening_times:
-        result = back_test(kite, instruments_helper, o)
-        if result[0]['Status'] == "PASS":
-            results.extend(result)
+    results = back_test_days(kite, instruments_helper, opening_times, [SPM_STRATEGY])
+    results = [result for result in results if result is not None and result['Status'] == "PASS"]
 
     results_df = pd.DataFrame(results)
     print(results_df)
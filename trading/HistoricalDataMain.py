@@ -1,7 +1,11 @@
 import datetime
+import logging
 
-from trading.constants import CSV_PATH, BACK_TEST
+from trading.constants import CSV_PATH, BACK_TEST, STORE_PATH, SQLITE_STORE, COLUMNAR_STORE, BASE_CANDLE_INTERVAL
 from trading.data.DataManagerFactory import DataManagerFactory
+from trading.data.historical.HistoricalDataDownloader import HistoricalDataDownloader
+from trading.data.symbols.NSESymbolsDataFetcher import NSESymbolsDataFetcher
+from trading.helpers.StoreHelper import StoreHelper
 from trading.zerodha.kite.Period import Period
 
 
@@ -38,3 +42,45 @@ def historical_data(kite, instruments_helper):
 
     get_data(kite, 5, Period.MIN, instruments_helper, 'SBIN', opening_time_list)
 
+
+def download_historical_data(kite, instruments_helper):
+    """
+    Downloads the one minute candles of all the symbols allowed for intraday into the OHLC store.
+    Days that are already stored are skipped, so running it again resumes an interrupted download
+    """
+    data_fetcher = NSESymbolsDataFetcher(StoreHelper(STORE_PATH))
+    symbols = data_fetcher.get_symbols_allowed_for_intraday()
+
+    end_date = datetime.date.today()
+    start_date = end_date - datetime.timedelta(days=90)
+
+    downloader = HistoricalDataDownloader(kite, instruments_helper)
+    downloader.download(symbols, start_date, end_date, [1])
+
+
+def copy_historical_data(kite, instruments_helper):
+    """
+    Copies the one minute candles of all the symbols allowed for intraday that are already downloaded into SQLite into
+    the columnar candle store, so that they are not downloaded again once HISTORICAL_DATA_STORE is switched to it
+    Days that are already copied are skipped, so running it again resumes an interrupted copy
+    """
+    data_fetcher = NSESymbolsDataFetcher(StoreHelper(STORE_PATH))
+    symbols = data_fetcher.get_symbols_allowed_for_intraday()
+
+    source = DataManagerFactory(kite, BACK_TEST, SQLITE_STORE).get_object(
+        period=Period.MIN,
+        candle_interval=BASE_CANDLE_INTERVAL,
+        instruments_helper=instruments_helper
+    )
+    target = DataManagerFactory(kite, BACK_TEST, COLUMNAR_STORE).get_object(
+        period=Period.MIN,
+        candle_interval=BASE_CANDLE_INTERVAL,
+        instruments_helper=instruments_helper
+    )
+
+    for symbol in symbols:
+        days = target.copy_from(source, symbol)
+        logging.info("Copied {} days of {} to the columnar candle store".format(days, symbol))
+
+    source.close()
+    target.close()
@@ -8,8 +8,10 @@ def initialize_symbols_for_back_test(strategies, instruments_helper):
     for strategy in strategies:
         candle_intervals = set()
 
+        # Strategies usually need candles of several intervals. Most of them are built from the same stored candles
         for ind in strategy.get_indicators():
-            candle_intervals.add(ind.get_candle_interval())
+            candle_intervals.add(DataManagerFactory.get_stored_candle_interval(strategy.get_period(),
+                                                                               ind.get_candle_interval()))
 
         for candle_interval in candle_intervals:
             initialize_symbol_for_back_test(strategy, candle_interval, instruments_helper)
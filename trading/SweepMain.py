@@ -0,0 +1,370 @@
+import datetime
+import itertools
+import logging
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from trading.BackTestMain import initialize_symbols_for_back_test, get_run_record, get_data_hash, get_cell_key, \
+    get_pool_context, get_result, download_symbols_for_back_test
+from trading.analytics.BackTestResultCache import back_test_result_cache
+from trading.analytics.BackTestResultStore import back_test_result_store
+from trading.constants import BACK_TEST, EXCHANGE, STRATEGY_DB_PATH, SUPER_TREND_STRATEGY_7_3, PARABOLIC_SAR, \
+    PARABOLIC_SAR_MTF, ADAPTIVE_SAR_STRATEGY, ADX_STRATEGY, SPM_STRATEGY
+from trading.data.CandleCache import candle_cache
+from trading.lines.SessionLinesCache import session_lines_cache
+from trading.strategies.ADXStrategy import ADXStrategy
+from trading.strategies.AdaptiveSARStrategy import AdaptiveSARStrategy
+from trading.strategies.ParabolicSARMTFStrategy import ParabolicSARMTFStrategy
+from trading.strategies.ParabolicSARStrategy import ParabolicSARStrategy
+from trading.strategies.StructuralPivotMethodStrategy import StructuralPivotMethodStrategy
+from trading.strategies.SuperTrend73Strategy import SuperTrend73Strategy
+from trading.workers.BackTestAutoSquareOffWorker import BackTestAutoSquareOffWorker
+from trading.workers.BackTestEngine import BackTestEngine
+from trading.workers.BackTestStrategyRunner import BackTestStrategyRunner
+from trading.zerodha.kite.BackTestOrders import BackTestOrders
+from trading.zerodha.kite.TimeSequencer import get_n_previous_trading_days
+
+# Strategy name to its class and the parameters the strategy factories use
+SWEEP_STRATEGIES = {
+    SUPER_TREND_STRATEGY_7_3: (SuperTrend73Strategy, {'candle_interval': 3, 'candle_length': 7, 'multiplier': 3}),
+    PARABOLIC_SAR: (ParabolicSARStrategy, {'candle_interval': 3, 'af': 0.02, 'max_af': 0.20}),
+    PARABOLIC_SAR_MTF: (ParabolicSARMTFStrategy, {'candle_interval_lt': 1, 'candle_interval_ht': 5, 'af': 0.02,
+                                                  'max_af': 0.20}),
+    ADAPTIVE_SAR_STRATEGY: (AdaptiveSARStrategy, {'candle_interval': 3}),
+    ADX_STRATEGY: (ADXStrategy, {'candle_interval': 1}),
+    SPM_STRATEGY: (StructuralPivotMethodStrategy, {'candle_interval': 5})
+}
+
+
+def get_combinations(grid):
+    """
+    :param grid: Parameter name to the list of values to try. i.e {'multiplier': [2, 3], 'candle_interval': [3, 5]}
+    :return: a list of parameters, one for every combination of the values. Combinations that only differ in the
+    last parameters are next to each other
+    """
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*[grid[name] for name in names])]
+
+
+def get_sweep_strategy(kite, instruments_helper, strategy_name, symbol, opening_time, orders, params):
+    """
+    Strategy for the parameters. Parameters that are not swept take the values the strategy factories use
+    """
+    strategy_class, default_params = SWEEP_STRATEGIES[strategy_name]
+
+    return strategy_class(kite, symbol,
+                          orders=orders,
+                          db_path=STRATEGY_DB_PATH + BACK_TEST.lower() + "/",
+                          instruments_helper=instruments_helper,
+                          opening_time=opening_time,
+                          mode=BACK_TEST,
+                          # Every combination starts afresh and shares the indicators it has in common with others
+                          stateless=True,
+                          share_session_lines=True,
+                          # Later sweeps (i.e of the strategy's rules) replay the lines instead of calculating them
+                          record_lines=True,
+                          **get_sweep_parameters(strategy_name, params))
+
+
+def get_sweep_parameters(strategy_name, params):
+    """
+    :return: all the parameters of the strategy. Parameters that are not swept take the values the strategy factories
+    use
+    """
+    if strategy_name not in SWEEP_STRATEGIES:
+        raise ValueError("Strategy {} cannot be swept".format(strategy_name))
+
+    strategy_class, default_params = SWEEP_STRATEGIES[strategy_name]
+
+    parameters = dict(default_params)
+    parameters.update(params)
+    return parameters
+
+
+def sweep_job(strategy_name, symbol, opening_time, combinations, label):
+    """
+    Back tests a strategy with every combination of parameters for one symbol and one day. Runs in a worker process
+    Combinations run one after the other so that the indicators that do not depend on the swept parameters are
+    calculated only once. Candles are read from the local store, so neither kite nor the instruments are needed
+    Combinations whose results are cached are not back tested again. Results are stored in the results store by the
+    worker itself
+    :return: a list of results, one for every combination
+    """
+    results = []
+    records = []
+
+    for params in combinations:
+        parameters = format_parameters(params)
+
+        orders = BackTestOrders(None, 1, 0.90, EXCHANGE)
+        strategy = get_sweep_strategy(None, None, strategy_name, symbol, opening_time, orders, params)
+
+        data_hash = get_data_hash(strategy)
+        # Combinations that only differ in parameters left at their defaults are the same cell
+        key = get_cell_key(strategy, format_parameters(get_sweep_parameters(strategy_name, params)), data_hash,
+                           sweep_job)
+        cell = back_test_result_cache.get(key)
+
+        if cell is None:
+            engine = BackTestEngine(opening_time)
+            engine.add_worker(BackTestStrategyRunner(None, strategy, persist=False))
+            engine.add_worker(BackTestAutoSquareOffWorker(None, orders=orders, opening_time=opening_time))
+            engine.run()
+
+            cell = (get_result(strategy, orders), orders.get_trades())
+            back_test_result_cache.put(key, *cell)
+
+        result, trades = cell
+        records.append(get_run_record(label, strategy_name, parameters, strategy, data_hash, result, trades))
+
+        result = dict(result)
+        result.update({
+            'Strategy': strategy_name,
+            'Parameters': parameters,
+            'Symbol': symbol,
+            'Day': opening_time.date()
+        })
+        results.append(result)
+
+    back_test_result_store.append(records)
+
+    # Lines of the day are not needed by the next job
+    session_lines_cache.clear()
+
+    return results
+
+
+def format_parameters(params):
+    return ", ".join("{}={}".format(name, value) for name, value in sorted(params.items()))
+
+
+def load_sessions(strategy):
+    """
+    Loads the candles the strategy needs (the session and the one before it) into the candle cache
+    Worker processes are forked from this process (see get_pool_context), so they get the loaded candles without
+    reading them again. Where they cannot be forked, workers read the candles themselves
+    """
+    days = [opening_time.date() for opening_time in get_n_previous_trading_days(2, strategy.get_opening_time())]
+
+    for ind in strategy.get_indicators():
+        for day in days:
+            candle_cache.get_session(ind.symbol, ind.period, ind.candle_interval, day, ind.load_data)
+
+
+def sweep(kite, instruments_helper, grids, symbols, opening_times, processes=None, label=None):
+    """
+    Back tests every combination of parameters of the strategies for the symbols and days on a pool of processes
+    :param grids: Strategy name to its grid of parameters. See get_combinations
+    :param processes: Number of worker processes. Number of cpus by default
+    :param label: Label the runs are stored with. Start time of the sweep by default
+    :return: dataframe of the combinations ranked by their net income over all the symbols and days
+    """
+    slices = []
+    for strategy_name, grid in grids.items():
+        slices.extend(get_slices(kite, instruments_helper, strategy_name, get_combinations(grid), symbols,
+                                 opening_times))
+
+    results = run_slices(slices, label or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), processes)
+    if not results:
+        return pd.DataFrame()
+
+    return rank_results(pd.DataFrame(results))
+
+
+def successive_halving(kite, instruments_helper, strategy_name, grid, symbols, opening_times, first_days=2, keep=0.5,
+                       budget=None, processes=None, seed=0, label=None):
+    """
+    Adaptive search over the grid of parameters of a strategy. All the combinations are back tested on a few days.
+    Only the best fraction of them is kept and back tested on twice as many days, and so on till a single combination
+    or all the days are left, or the budget is spent. Clearly bad combinations are hence dropped after a few back tests
+    Results of the days a combination was already back tested on are reused in the later rounds
+    :param first_days: Number of days of the first round
+    :param keep: Fraction of the combinations kept after every round
+    :param budget: Maximum number of back tests (i.e combination, symbol and day). No limit by default
+    :param seed: Seed of the random order of the days. Early rounds hence sample days from the whole range
+    :param label: Label the runs are stored with. Start time of the search by default
+    :return: dataframe of the combinations of the last round ranked by their net income over its days
+    """
+    if not 0 < keep < 1:
+        raise ValueError("Fraction of the combinations kept should be between 0 and 1. Given {}".format(keep))
+
+    label = label or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    combinations = get_combinations(grid)
+
+    days = [opening_time.replace(hour=9, minute=15, second=0, microsecond=0) for opening_time in opening_times]
+    random.Random(seed).shuffle(days)
+
+    results = []
+    # Formatted parameters and the days they were back tested on
+    tested = set()
+    spent = 0
+
+    ranked_df = pd.DataFrame()
+    n = min(first_days, len(days))
+
+    while combinations:
+        round_days = days[:n]
+
+        pending = []
+        for day in round_days:
+            day_combinations = [params for params in combinations if (format_parameters(params), day) not in tested]
+            if day_combinations:
+                pending.append((day, day_combinations))
+
+        cost = sum(len(day_combinations) for day, day_combinations in pending) * len(symbols)
+        if budget is not None and spent + cost > budget:
+            logging.info("Budget of {} back tests is spent. {} back tests were done".format(budget, spent))
+            break
+
+        slices = []
+        for day, day_combinations in pending:
+            slices.extend(get_slices(kite, instruments_helper, strategy_name, day_combinations, symbols, [day]))
+            tested.update((format_parameters(params), day) for params in day_combinations)
+
+        results.extend(run_slices(slices, label, processes))
+        spent = spent + cost
+
+        round_df = pd.DataFrame(results)
+        if round_df.empty:
+            break
+
+        names = [format_parameters(params) for params in combinations]
+        round_df = round_df[round_df['Parameters'].isin(names) &
+                            round_df['Day'].isin([day.date() for day in round_days])]
+        ranked_df = rank_results(round_df)
+
+        logging.info("Back tested {} combinations of {} on {} days".format(len(combinations), strategy_name,
+                                                                           len(round_days)))
+
+        if len(combinations) == 1 or n == len(days):
+            break
+
+        best = list(ranked_df.index.get_level_values('Parameters')[:math.ceil(len(combinations) * keep)])
+        combinations = [combinations[names.index(name)] for name in best]
+        n = min(2 * n, len(days))
+
+    return ranked_df
+
+
+def get_slices(kite, instruments_helper, strategy_name, combinations, symbols, opening_times):
+    """
+    Every (strategy, symbol, day) is a slice of data that all the combinations of the strategy run on
+    Candles of the slices are downloaded and loaded upfront in this process. Jobs only read them
+    :return: a list of slices whose candles are available
+    """
+    # (opening time, symbol) to the strategies of all the combinations
+    slice_strategies = {}
+
+    for opening_time in opening_times:
+        opening_time = opening_time.replace(hour=9, minute=15, second=0, microsecond=0)
+
+        for symbol in symbols:
+            slice_strategies[(opening_time, symbol)] = [
+                get_sweep_strategy(kite, instruments_helper, strategy_name, symbol, opening_time, None, params)
+                for params in combinations]
+
+    download_symbols_for_back_test(kite, instruments_helper,
+                                   [strategy for strategies in slice_strategies.values() for strategy in strategies])
+
+    slices = []
+    for (opening_time, symbol), strategies in slice_strategies.items():
+        if not initialize_symbols_for_back_test(strategies, instruments_helper):
+            logging.warning("Sweep of {} for {} cannot be done for opening time {}".format(
+                strategy_name, symbol, opening_time))
+            continue
+
+        for strategy in strategies:
+            load_sessions(strategy)
+
+        slices.append((strategy_name, symbol, opening_time, combinations))
+
+    return slices
+
+
+def run_slices(slices, label, processes=None):
+    """
+    Back tests all the combinations of the slices on a pool of processes
+    :param label: Label the runs are stored with
+    :param processes: Number of worker processes. Number of cpus by default
+    :return: a list of results of all the combinations of all the slices
+    """
+    if not slices:
+        return []
+
+    processes = processes or os.cpu_count()
+
+    # Combinations of a slice are split only as much as needed to keep all the processes busy
+    jobs = []
+    for strategy_name, symbol, opening_time, combinations in slices:
+        chunks = min(len(combinations), math.ceil(processes / len(slices)))
+        size = math.ceil(len(combinations) / chunks)
+
+        for i in range(0, len(combinations), size):
+            jobs.append((strategy_name, symbol, opening_time, combinations[i:i + size], label))
+
+    logging.info("Sweeping {} jobs on {} processes".format(len(jobs), processes))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=processes, mp_context=get_pool_context()) as executor:
+        for job_results in executor.map(sweep_job, *zip(*jobs)):
+            results.extend(job_results)
+
+    return results
+
+
+def rank_results(results_df):
+    """
+    Sums up the results of every combination over all the symbols and days
+    :return: dataframe indexed by strategy and parameters. Best combination first
+    """
+    ranked_df = results_df.groupby(['Strategy', 'Parameters']).agg(**{
+        'Net income': ('Net income', 'sum'),
+        'Mean ROI': ('ROI', 'mean'),
+        'Total Trades': ('Total Trades', 'sum'),
+        'Total Winning Trades': ('Total Winning Trades', 'sum'),
+        'Total Loosing Trades': ('Total Loosing Trades', 'sum'),
+        'Max Drawdown': ('Max Drawdown', 'max'),
+        'Mean Sharpe Ratio': ('Sharpe Ratio', 'mean'),
+        'Sessions': ('Day', 'count')
+    })
+
+    ranked_df = ranked_df.sort_values(by=['Net income', 'Mean ROI'], ascending=False)
+    ranked_df['Rank'] = range(1, len(ranked_df) + 1)
+
+    return ranked_df
+
+
+def sweep_range(kite, instruments_helper):
+    start_time = datetime.datetime(2021, 12, 3, 9, 15, 0)
+    days = 5
+    opening_times = get_n_previous_trading_days(days, start_time)
+
+    grids = {
+        SUPER_TREND_STRATEGY_7_3: {'candle_interval': [3, 5], 'multiplier': [2, 2.5, 3, 3.5]},
+        PARABOLIC_SAR: {'af': [0.01, 0.02, 0.03], 'max_af': [0.1, 0.2]},
+        PARABOLIC_SAR_MTF: {'candle_interval_lt': [1, 3], 'candle_interval_ht': [5, 15]},
+        SPM_STRATEGY: {'candle_interval': [3, 5, 15]}
+    }
+
+    results_df = sweep(kite, instruments_helper, grids, ['SBIN'], opening_times)
+    print(results_df)
+
+
+def successive_halving_range(kite, instruments_helper):
+    start_time = datetime.datetime(2021, 12, 3, 9, 15, 0)
+    days = 250
+    opening_times = get_n_previous_trading_days(days, start_time)
+
+    grid = {
+        'candle_interval': [1, 2, 3, 5, 15],
+        'candle_length': [5, 7, 10, 14, 20],
+        'multiplier': [1.5, 2, 2.5, 3, 3.5, 4]
+    }
+
+    results_df = successive_halving(kite, instruments_helper, SUPER_TREND_STRATEGY_7_3, grid, ['SBIN'], opening_times,
+                                    budget=2000)
+    print(results_df)
@@ -7,10 +7,15 @@ from datetime import datetime
 
 from kiteconnect import KiteTicker
 
-from trading.constants import EXCHANGE, LIVE, TICKS_DB_PATH, PARABOLIC_SAR, SUPER_TREND_STRATEGY_7_3, PARABOLIC_SAR_MTF
+from trading.constants import EXCHANGE, LIVE, TICKS_DB_PATH, PARABOLIC_SAR, SUPER_TREND_STRATEGY_7_3, PARABOLIC_SAR_MTF, \
+    LIVE_TRIGGER, BAR_CLOSE_TRIGGER
+from trading.data.live.BarBuilder import bar_builder
 from trading.factory.StrategyFactory import StrategyFactory
 from trading.helpers.InstrumentsHelper import InstrumentsHelper
 from trading.workers.AutoSqaureOffWorker import AutoSquareOffWorker
+from trading.workers.BarCloseStrategyRunner import BarCloseStrategyRunner
+from trading.workers.BarCloseWorker import BarCloseWorker
+from trading.workers.LiveScheduler import LiveScheduler
 from trading.zerodha.kite.Ticks import Ticks
 
 
@@ -19,7 +24,9 @@ def listen_to_market(kite, symbols, instruments_helper):
     on_ticks = ticks.on_ticks
 
     on_connect = ticks.on_connect
-    do_listen_to_market(kite, on_ticks, on_connect)
+    kite_ticker = do_listen_to_market(kite, on_ticks, on_connect)
+
+    return ticks, kite_ticker
 
 
 def do_listen_to_market(kite, on_ticks, on_connect):
@@ -31,8 +38,18 @@ def do_listen_to_market(kite, on_ticks, on_connect):
     kite_ticker.connect(threaded=True)
     logging.info("Started listening to market")
 
+    return kite_ticker
+
+
+def run_workers_and_wait(workers):
+    # All the workers are run by a single scheduler instead of a thread each
+    scheduler = LiveScheduler()
+    for worker in workers:
+        if isinstance(worker, BarCloseStrategyRunner):
+            scheduler.add_event_worker(worker)
+        else:
+            scheduler.add_worker(worker)
 
-def start_threads_and_wait(threads):
     # We want to start at the strike of every minute
     init_time = datetime.now()
     logging.info("Sleeping {} seconds to synchronize with minutes".format(60 - init_time.second))
@@ -40,13 +57,7 @@ def start_threads_and_wait(threads):
     # Comment me for tests!
     time.sleep(60 - init_time.second)
 
-    # Start all threads
-    for t in threads:
-        t.start()
-
-    # Wait for all of them to finish
-    for t in threads:
-        t.join()
+    scheduler.run()
 
 
 def initialize_symbol_for_live_trade(symbol):
@@ -83,18 +94,34 @@ def trade(kite):
     threads.extend(StrategyFactory(kite, mode, orders, instruments_helper).get_strategies(PARABOLIC_SAR_MTF))
     threads.append(AutoSquareOffWorker(kite))
 
+    if LIVE_TRIGGER == BAR_CLOSE_TRIGGER:
+        threads.append(BarCloseWorker(kite))
+
     # Collect all the symbols that our strategies want to act on
     # Then, listen to the market for those symbols
     symbols = []
     for worker in threads:
-        if hasattr(worker, 'strategy'):
+        if hasattr(worker, 'strategy') and worker.strategy is not None:
             symbols.append(worker.strategy.symbol)
 
     # Different strategies can run for the same symbol
     unique_symbols = list(set(symbols))
 
+    # Bars of every candle interval the indicators use are built as ticks arrive
+    for worker in threads:
+        if hasattr(worker, 'strategy') and worker.strategy is not None:
+            for ind in worker.strategy.get_indicators():
+                bar_builder.add_candle_interval(ind.get_candle_interval())
+
     initialize_symbols_for_live_trade(unique_symbols)
     logging.info("Db for symbols {} initialised in {}".format(','.join(unique_symbols), TICKS_DB_PATH))
-    listen_to_market(kite, symbols, instruments_helper)
+    ticks, kite_ticker = listen_to_market(kite, symbols, instruments_helper)
+
+    run_workers_and_wait(threads)
+
+    # Stop listening before the ticks that are still queued are flushed. Bars closed after the market ends are not
+    # acted on anyway
+    kite_ticker.close()
 
-    start_threads_and_wait(threads)
+    # Flush the ticks that are still queued
+    ticks.stop()
@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from trading.constants import RESULT_CACHE_DB_PATH, RESULT_CACHE_SIZE
+
+
+class BackTestResultCache:
+    """
+    On disk cache of the results of back test runs, addressed by their content.
+    A run (i.e a cell) is identified by a hash of everything it depends on: the strategy, the version of the code it
+    runs, its parameters, the symbol, the session and the candles (see get_cell_key in BackTestMain). A cell whose
+    inputs have not changed is hence never back tested twice. Changing a strategy, or the candles of a day, changes
+    the hash of only the cells that depend on it.
+    Cells are rows of a sqlite table. Once the capacity is reached, the least recently used cells are evicted
+    """
+
+    def __init__(self, path=RESULT_CACHE_DB_PATH, capacity=RESULT_CACHE_SIZE):
+        if capacity <= 0:
+            raise ValueError("Capacity of the result cache should be positive. Given {}".format(capacity))
+
+        self.path = path
+        self.capacity = capacity
+        self.table_name = "BackTestResults"
+
+    def get(self, key):
+        """
+        :return: a tuple of the result and the trades (see OrderLedger.get_trades) of the cell. None if not cached
+        """
+        db = self.connect()
+        try:
+            row = db.execute("SELECT result, trades FROM {} WHERE key = ?".format(self.table_name), (key,)).fetchone()
+            if row is None:
+                return None
+
+            db.execute("UPDATE {} SET last_used = ? WHERE key = ?".format(self.table_name), (time.time_ns(), key))
+            db.commit()
+        finally:
+            db.close()
+
+        trades = json.loads(row[1])
+        return json.loads(row[0]), {
+            'net': np.asarray(trades['net'], dtype=np.float64),
+            'entry_minute': np.asarray(trades['entry_minute'], dtype=np.int64),
+            'exit_minute': np.asarray(trades['exit_minute'], dtype=np.int64)
+        }
+
+    def put(self, key, result, trades):
+        """
+        Caches the result and the trades of the cell. Evicts the least recently used cells beyond the capacity
+        """
+        trades = {name: values.tolist() for name, values in trades.items()}
+
+        db = self.connect()
+        try:
+            db.execute("INSERT OR REPLACE INTO {} (key, result, trades, last_used) VALUES (?, ?, ?, ?)".format(
+                self.table_name), (key, json.dumps(result), json.dumps(trades), time.time_ns()))
+
+            count = db.execute("SELECT COUNT(*) FROM {}".format(self.table_name)).fetchone()[0]
+            if count > self.capacity:
+                db.execute("DELETE FROM {0} WHERE key IN (SELECT key FROM {0} ORDER BY last_used LIMIT ?)".format(
+                    self.table_name), (count - self.capacity,))
+                logging.debug("Evicted {} back test results".format(count - self.capacity))
+
+            db.commit()
+        finally:
+            db.close()
+
+    def connect(self):
+        # Connections are not shared, so the cache can be used from worker processes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("CREATE TABLE IF NOT EXISTS {} (key TEXT PRIMARY KEY, result TEXT, trades TEXT, "
+                   "last_used INTEGER)".format(self.table_name))
+        db.execute("CREATE INDEX IF NOT EXISTS {0}_last_used ON {0} (last_used)".format(self.table_name))
+        return db
+
+
+# Shared by everything in the process
+back_test_result_cache = BackTestResultCache()
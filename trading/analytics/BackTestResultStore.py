@@ -0,0 +1,200 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from trading.constants import RESULTS_STORE_PATH
+
+# Columns of a trade. Every trade also has the run it belongs to
+TRADE_COLUMNS = ['entry_minute', 'exit_minute', 'net']
+
+
+class BackTestResultStore:
+    """
+    On disk, column oriented store of back test runs.
+    Every run has its metadata (strategy, parameters, symbol, day, hash of the candles, ...) and summary statistics as
+    a row of the runs table, and its trades as rows of the trades table.
+    Runs are appended in parts. A part is a directory with one compressed numpy archive per table holding a flat
+    array per column. Parts are written under a hidden name and renamed once complete, so readers never see half
+    written parts and writers (i.e workers of a sweep) never wait for each other.
+    Parts are loaded once and kept in memory. Queries are pandas operations over all the loaded runs
+    """
+
+    def __init__(self, path=RESULTS_STORE_PATH):
+        self.path = path
+
+        # Part name to its runs and trades
+        self.parts = {}
+        self.lock = threading.Lock()
+
+    def append(self, runs):
+        """
+        Stores the runs as a new part
+        :param runs: a list of dictionaries of the metadata and statistics of the runs. The trades of a run (see
+        OrderLedger.get_trades) are under the 'trades' key. A run without a 'Run' id gets one
+        :return: name of the part
+        """
+        if not runs:
+            return None
+
+        records = []
+        trade_columns = {name: [] for name in ['Run'] + TRADE_COLUMNS}
+
+        for run in runs:
+            record = dict(run)
+            record.setdefault('Run', uuid.uuid4().hex)
+            trades = record.pop('trades', None)
+            records.append(record)
+
+            if trades is not None:
+                trade_columns['Run'].append(np.full(len(trades['net']), record['Run']))
+                for name in TRADE_COLUMNS:
+                    trade_columns[name].append(trades[name])
+
+        trade_columns = {name: np.concatenate(arrays) if arrays else np.empty(0)
+                         for name, arrays in trade_columns.items()}
+
+        name = "part-{}-{}-{}".format(time.strftime("%Y%m%d%H%M%S"), os.getpid(), uuid.uuid4().hex[:8])
+        os.makedirs(self.path, exist_ok=True)
+
+        hidden_path = os.path.join(self.path, "." + name)
+        os.makedirs(hidden_path)
+        self.write_table(os.path.join(hidden_path, "runs.npz"), pd.DataFrame(records))
+        self.write_table(os.path.join(hidden_path, "trades.npz"), pd.DataFrame(trade_columns))
+        os.rename(hidden_path, os.path.join(self.path, name))
+
+        logging.debug("Stored {} back test runs in part {}".format(len(records), name))
+        return name
+
+    def get_runs(self, **filters):
+        """
+        :param filters: Column name to a value or a list of values. i.e Strategy="SPMStrategy", Symbol=["SBIN", "ITC"]
+        :return: dataframe of the runs that match all the filters
+        """
+        runs, trades = self.load()
+        return self.filter(runs, filters)
+
+    def get_trades(self, **filters):
+        """
+        :param filters: Filters of the runs. See get_runs
+        :return: dataframe of the trades of the runs that match the filters, along with the metadata of their runs
+        """
+        runs, trades = self.load()
+        runs = self.filter(runs, filters)
+
+        return trades.merge(runs, on='Run', how='inner')
+
+    def get_summary(self, by, **filters):
+        """
+        Aggregates the statistics of the runs that match the filters
+        :param by: Columns to group the runs by. i.e ['Sweep', 'Parameters'] compares sweeps with each other
+        :return: dataframe indexed by the groups. Best net income first
+        """
+        runs = self.get_runs(**filters)
+        if runs.empty:
+            return pd.DataFrame()
+
+        summary_df = runs.groupby(by).agg(**{
+            'Net income': ('Net income', 'sum'),
+            'Mean ROI': ('ROI', 'mean'),
+            'Total Trades': ('Total Trades', 'sum'),
+            'Total Winning Trades': ('Total Winning Trades', 'sum'),
+            'Total Loosing Trades': ('Total Loosing Trades', 'sum'),
+            'Max Drawdown': ('Max Drawdown', 'max'),
+            'Mean Sharpe Ratio': ('Sharpe Ratio', 'mean'),
+            'Runs': ('Run', 'count')
+        })
+
+        return summary_df.sort_values(by=['Net income'], ascending=False)
+
+    def compact(self):
+        """
+        Merges all the parts into one. Parts appended meanwhile are left as they are
+        """
+        runs, trades = self.load()
+
+        with self.lock:
+            names = list(self.parts.keys())
+
+        if len(names) < 2:
+            return
+
+        trades_by_run = {run: run_trades for run, run_trades in trades.groupby('Run')}
+
+        records = runs.to_dict('records')
+        for record in records:
+            if record['Run'] in trades_by_run:
+                run_trades = trades_by_run[record['Run']]
+                record['trades'] = {name: run_trades[name].values for name in TRADE_COLUMNS}
+
+        self.append(records)
+
+        with self.lock:
+            for name in names:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+                self.parts.pop(name, None)
+
+    def load(self):
+        """
+        Loads the parts that were appended since the last load
+        :return: a tuple of dataframes of all the runs and all the trades
+        """
+        names = sorted(name for name in os.listdir(self.path) if not name.startswith(".")) \
+            if os.path.exists(self.path) else []
+
+        with self.lock:
+            for name in names:
+                if name not in self.parts:
+                    part_path = os.path.join(self.path, name)
+                    self.parts[name] = (self.read_table(os.path.join(part_path, "runs.npz")),
+                                        self.read_table(os.path.join(part_path, "trades.npz")))
+
+            parts = [self.parts[name] for name in names if name in self.parts]
+
+        if not parts:
+            return pd.DataFrame(columns=['Run']), pd.DataFrame(columns=['Run'] + TRADE_COLUMNS)
+
+        return pd.concat([runs for runs, trades in parts], ignore_index=True), \
+            pd.concat([trades for runs, trades in parts], ignore_index=True)
+
+    @staticmethod
+    def filter(df, filters):
+        mask = np.ones(len(df), dtype=bool)
+
+        for name, value in filters.items():
+            if name not in df.columns:
+                raise ValueError("Back test runs do not have column {}".format(name))
+
+            if isinstance(value, (list, tuple, set)):
+                mask &= df[name].isin(list(value)).values
+            else:
+                mask &= (df[name] == value).values
+
+        return df[mask]
+
+    @staticmethod
+    def write_table(path, df):
+        columns = {}
+        for name in df.columns:
+            values = df[name].values
+            # Anything that is not a number (names, dates, ...) is stored as text
+            columns[name] = values if values.dtype.kind in 'iufb' else values.astype(str)
+
+        # Column names are not always valid keyword names. They are stored in order along with the columns
+        np.savez_compressed(path, names=np.array(list(columns.keys()), dtype=str), *columns.values())
+
+    @staticmethod
+    def read_table(path):
+        with np.load(path) as archive:
+            names = archive['names'].tolist()
+            return pd.DataFrame({name: archive['arr_{}'.format(i)] for i, name in enumerate(names)},
+                                columns=names)
+
+
+# Shared by everything in the process
+back_test_result_store = BackTestResultStore()
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from trading.zerodha.kite.TradingCalendar import MARKET_OPEN_MINUTE, MARKET_CLOSE_MINUTE
+
+SESSION_MINUTES = MARKET_CLOSE_MINUTE - MARKET_OPEN_MINUTE
+
+
+class TradeAnalytics:
+    """
+    Statistics of the trades of back test runs.
+    Trades of all the runs are concatenated and every statistic is calculated for all the runs at once with numpy
+    (grouped sums, segmented running maximums, ...). There is no loop over the trades or the runs, so thousands of
+    runs of a sweep are as cheap to evaluate as one
+    """
+
+    def __init__(self, start_cash):
+        if start_cash <= 0:
+            raise ValueError("Start cash should be positive. Given {}".format(start_cash))
+
+        self.start_cash = start_cash
+
+    def get_run_statistics(self, trades):
+        """
+        :param trades: Trades of a run. See OrderLedger.get_trades
+        :return: dictionary of the statistics of the run
+        """
+        return {name: values[0].item() for name, values in self.get_statistics([trades]).items()}
+
+    def get_frame(self, runs):
+        """
+        :param runs: a list of trades of every run
+        :return: dataframe of the statistics with a row for every run
+        """
+        return pd.DataFrame(self.get_statistics(runs))
+
+    def get_statistics(self, runs):
+        """
+        Trades are taken in the order they were entered. Returns are per trade, relative to the start cash
+        :param runs: a list of trades of every run. See OrderLedger.get_trades
+        :return: dictionary of statistic name to a numpy array with its value for every run
+        """
+        n = len(runs)
+        counts = np.array([len(trades['net']) for trades in runs], dtype=np.int64)
+
+        net = np.concatenate([trades['net'] for trades in runs]) if n else np.empty(0)
+        entry_minute = np.concatenate([trades['entry_minute'] for trades in runs]) if n else np.empty(0, dtype=np.int64)
+        exit_minute = np.concatenate([trades['exit_minute'] for trades in runs]) if n else np.empty(0, dtype=np.int64)
+
+        # Run of every trade
+        run = np.repeat(np.arange(n), counts)
+
+        net_income = np.bincount(run, weights=net, minlength=n).astype(np.float64)
+        wins = np.bincount(run, weights=net > 0, minlength=n).astype(np.int64)
+        losses = np.bincount(run, weights=net < 0, minlength=n).astype(np.int64)
+
+        max_winning_streak, max_loosing_streak = self.get_streaks(net, run, n)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = net / self.start_cash
+            mean = np.bincount(run, weights=returns, minlength=n) / counts
+            deviation = np.sqrt(np.maximum(np.bincount(run, weights=returns ** 2, minlength=n) / counts - mean ** 2, 0))
+            downside_deviation = np.sqrt(np.bincount(run, weights=np.minimum(returns, 0) ** 2, minlength=n) / counts)
+
+            sharpe_ratio = np.where(deviation > 0, mean / deviation, np.nan)
+            sortino_ratio = np.where(downside_deviation > 0, mean / downside_deviation, np.nan)
+
+            win_pct = np.where(counts > 0, wins / counts * 100, 0.0)
+            loss_pct = np.where(counts > 0, losses / counts * 100, 0.0)
+
+        # Positions that are not exited are not counted
+        minutes = np.where(exit_minute >= entry_minute, exit_minute - entry_minute, 0)
+        exposure = np.bincount(run, weights=minutes, minlength=n).astype(np.float64) / SESSION_MINUTES * 100
+
+        return {
+            'Total Trades': counts,
+            'Total Cash Invested': np.full(n, float(self.start_cash)),
+            'Net income': net_income,
+            'ROI': net_income / self.start_cash * 100,
+            'Total Winning Trades': wins,
+            'Total Loosing Trades': losses,
+            'Win %': win_pct,
+            'Loss %': loss_pct,
+            'Max Winning Streak': max_winning_streak,
+            'Max Loosing Streak': max_loosing_streak,
+            'Max Drawdown': self.get_max_drawdown(net, run, n),
+            'Sharpe Ratio': sharpe_ratio,
+            'Sortino Ratio': sortino_ratio,
+            'Exposure %': exposure
+        }
+
+    @staticmethod
+    def get_streaks(net, run, n):
+        """
+        :return: a tuple of the longest streak of winning trades and of loosing trades of every run. A trade that
+        breaks even ends both
+        """
+        sign = np.sign(net)
+
+        # A streak starts at every trade whose outcome or run differs from the previous trade's
+        starts = np.flatnonzero(np.concatenate([[True], (sign[1:] != sign[:-1]) | (run[1:] != run[:-1])])) \
+            if len(net) else np.empty(0, dtype=np.int64)
+        lengths = np.diff(np.append(starts, len(net)))
+
+        max_winning_streak = np.zeros(n, dtype=np.int64)
+        max_loosing_streak = np.zeros(n, dtype=np.int64)
+
+        winning = sign[starts] > 0
+        np.maximum.at(max_winning_streak, run[starts][winning], lengths[winning])
+
+        loosing = sign[starts] < 0
+        np.maximum.at(max_loosing_streak, run[starts][loosing], lengths[loosing])
+
+        return max_winning_streak, max_loosing_streak
+
+    @staticmethod
+    def get_max_drawdown(net, run, n):
+        """
+        Largest fall of the equity curve (i.e the cumulative net income after every trade, starting at 0) from its
+        previous peak
+        """
+        max_drawdown = np.zeros(n)
+        if len(net) == 0:
+            return max_drawdown
+
+        # Equity of every run starts afresh
+        cumulative = np.cumsum(net)
+        totals = np.bincount(run, weights=net, minlength=n)
+        equity = cumulative - np.concatenate([[0.0], np.cumsum(totals)[:-1]])[run]
+
+        # Lifting every run above all the previous ones lets one running maximum serve as the peak of every run
+        low = min(equity.min(), 0.0)
+        lift = (max(equity.max(), 0.0) - low + 1) * run
+        peak = np.maximum.accumulate(equity - low + lift) - lift + low
+        peak = np.maximum(peak, 0.0)
+
+        np.maximum.at(max_drawdown, run, peak - equity)
+        return max_drawdown
@@ -6,6 +6,31 @@ BACK_TEST_OHLC_DB_PATH = STORE_PATH + "db/stock_data/ohlc.db"
 TICKS_DB_PATH = STORE_PATH + "db/stock_data/ticks.db"
 SCREENER_DB_PATH = STORE_PATH + "db/screener/screener.db"
 STRATEGY_DB_PATH = STORE_PATH + "db/strategies/"
+COLUMNAR_STORE_PATH = STORE_PATH + "columnar/"
+RESULTS_STORE_PATH = STORE_PATH + "results/"
+RESULT_CACHE_DB_PATH = STORE_PATH + "db/backtest/results.db"
+RECORDED_LINES_PATH = STORE_PATH + "lines/"
+# Number of one minute slots in a trading session (09:15 - 15:30)
+INDICATOR_STORE_CAPACITY = 375
+# Years covered by the precomputed trading calendar (both inclusive)
+TRADING_CALENDAR_START_YEAR = 2020
+TRADING_CALENDAR_END_YEAR = 2030
+# Number of trading sessions (per symbol and candle interval) held in the in memory candle cache
+CANDLE_CACHE_SESSIONS = 256
+# Number of indicator session lines held in memory for strategies that share them (i.e parameter sweeps)
+SESSION_LINES_CACHE_SIZE = 256
+# Number of back test runs (strategy, parameters, symbol and day) whose results are kept on disk
+RESULT_CACHE_SIZE = 100000
+# Zerodha allows 3 requests per second to the historical api
+KITE_HISTORICAL_API_RATE = 3
+# Number of concurrent requests made by the historical data downloader
+HISTORICAL_DOWNLOAD_THREADS = 4
+# Attempts the historical data downloader makes for a chunk and the delay (in seconds, doubled every time) between them
+HISTORICAL_DOWNLOAD_TRIES = 5
+HISTORICAL_DOWNLOAD_RETRY_DELAY = 2
+# Ticks are committed to the ticks db every these many seconds or once these many websocket messages are queued
+TICK_WRITER_COMMIT_INTERVAL = 0.5
+TICK_WRITER_BATCH_SIZE = 1000
 EXCHANGE = "NSE"
 SUPER_TREND_STRATEGY_7_3 = "SuperTrendStrategy73"
 PARABOLIC_SAR = "ParabolicSAR"
@@ -19,3 +44,20 @@ BACK_TEST = "backtest"
 SETUP = "setup"
 SCREEN = "screen"
 LIVE = "live"
+
+# What triggers live strategies. Either the strike of every minute or the close of a bar of the strategy's lowest
+# candle interval
+CLOCK_TRIGGER = "clock"
+BAR_CLOSE_TRIGGER = "bar_close"
+LIVE_TRIGGER = BAR_CLOSE_TRIGGER
+# Number of threads the live scheduler runs indicators, strategies and orders on
+LIVE_SCHEDULER_THREADS = 8
+
+# Historical data store constants
+SQLITE_STORE = "sqlite"
+COLUMNAR_STORE = "columnar"
+# Store that back tests, screeners and setups read historical candles from
+HISTORICAL_DATA_STORE = SQLITE_STORE
+# Only one minute candles are stored. Candles of these intervals (in minutes) are built from them
+BASE_CANDLE_INTERVAL = 1
+DERIVED_CANDLE_INTERVALS = [2, 3, 5, 15, 30]
@@ -0,0 +1,116 @@
+import datetime
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from trading.constants import CANDLE_CACHE_SESSIONS
+from trading.zerodha.kite.TimeSequencer import to_epoch_minute, to_epoch_minutes, get_trading_days_between
+
+
+class CandleCache:
+    """
+    In memory cache of the candles of whole trading sessions, shared by all the indicators and strategies of the
+    process.
+    A session is loaded with a single query the first time any of its candles is asked for. Every later request is a
+    slice of the loaded session. Sessions are evicted in least recently used order once the capacity is reached.
+    Only data that does not change once stored (i.e historical data) should be cached
+    """
+
+    def __init__(self, capacity=CANDLE_CACHE_SESSIONS):
+        if capacity <= 0:
+            raise ValueError("Capacity of the candle cache should be positive. Given {}".format(capacity))
+
+        self.capacity = capacity
+
+        # (symbol, period, candle interval, session date) to a tuple of epoch minutes and candles
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_data(self, symbol, period, candle_interval, start_time, end_time, load_data):
+        """
+        Gets the candles between the start time (inclusive) and the end time (exclusive)
+        :param load_data: Function that loads the candles between two times from the underlying store
+        :return: dataframe of candles. It is shared and should not be modified
+        """
+        start_key = to_epoch_minute(start_time)
+        end_key = to_epoch_minute(end_time)
+
+        frames = []
+        # Weekends and holidays have no candles. They are skipped instead of being looked up every time
+        for day in get_trading_days_between(start_time.date(), (end_time - datetime.timedelta(minutes=1)).date()):
+            keys, df = self.get_session(symbol, period, candle_interval, day, load_data)
+
+            first = np.searchsorted(keys, start_key, side='left')
+            last = np.searchsorted(keys, end_key, side='left')
+            frames.append(df.iloc[first:last])
+
+        if not frames:
+            # Nothing is traded between the times. The store returns an empty frame of the right shape
+            return load_data(start_time, end_time)
+
+        if len(frames) == 1:
+            return frames[0]
+
+        return pd.concat(frames)
+
+    def get_session(self, symbol, period, candle_interval, day, load_data):
+        key = (symbol, period, candle_interval, day)
+
+        with self.lock:
+            if key in self.sessions:
+                self.sessions.move_to_end(key)
+                return self.sessions[key]
+
+            session_start = datetime.datetime.combine(day, datetime.time())
+            df = load_data(session_start, session_start + datetime.timedelta(days=1))
+            if not df.index.is_monotonic_increasing:
+                df = df.sort_index()
+
+            session = (to_epoch_minutes(df.index), df)
+
+            if df.empty:
+                # Data of the session might not have been stored yet. Do not remember it
+                return session
+
+            logging.debug("Cached {} candles of {} for {}".format(len(df), symbol, day))
+
+            self.sessions[key] = session
+            if len(self.sessions) > self.capacity:
+                self.sessions.popitem(last=False)
+
+            return session
+
+    def get_session_hash(self, symbol, period, candle_interval, day, load_data):
+        """
+        :return: hex digest of the candles of the session. It changes whenever the stored candles change
+        """
+        keys, df = self.get_session(symbol, period, candle_interval, day, load_data)
+
+        digest = hashlib.sha1(np.ascontiguousarray(keys, dtype=np.int64).tobytes())
+        for name in ['open', 'high', 'low', 'close', 'volume']:
+            if name in df.columns:
+                digest.update(np.ascontiguousarray(df[name].values, dtype=np.float64).tobytes())
+
+        return digest.hexdigest()
+
+    def invalidate(self, symbol, period, candle_interval=None):
+        """
+        Forgets all the sessions of the symbol. Has to be called when its stored candles change
+        :param candle_interval: Candle interval whose sessions are forgotten. All of them if None
+        """
+        with self.lock:
+            for key in [k for k in self.sessions if k[:2] == (symbol, period) and
+                        (candle_interval is None or k[2] == candle_interval)]:
+                del self.sessions[key]
+
+    def clear(self):
+        with self.lock:
+            self.sessions.clear()
+
+
+# Shared by everything in the process
+candle_cache = CandleCache()
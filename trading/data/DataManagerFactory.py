@@ -1,6 +1,10 @@
-from trading.constants import SCREEN, LIVE, BACK_TEST, SETUP
+from trading.constants import SCREEN, LIVE, BACK_TEST, SETUP, SQLITE_STORE, COLUMNAR_STORE, HISTORICAL_DATA_STORE, \
+    BASE_CANDLE_INTERVAL, DERIVED_CANDLE_INTERVALS
+from trading.data.historical.ColumnarDataManager import ColumnarDataManager
 from trading.data.historical.KiteHistoricalDataManager import KiteHistoricalDataManager
+from trading.data.historical.ResampledDataManager import ResampledDataManager
 from trading.data.live.TicksDataManager import TicksDataManager
+from trading.zerodha.kite.Period import Period
 
 
 class DataManagerFactory:
@@ -8,15 +12,43 @@ class DataManagerFactory:
     Factory class which constructs a historical data (i.e OHLC) fetcher based on the given exchange
     For example if the exchange is NSE, it uses NSEpy library which talks to NSE website and scraps OHLC data
     for the given time
+    Historical data is kept either in SQLite or in the columnar candle store. See HISTORICAL_DATA_STORE
+    Only one minute candles are stored. Candles of the derived intervals are built from them
     """
-    def __init__(self, kite, mode):
+    def __init__(self, kite, mode, store=HISTORICAL_DATA_STORE):
         self.kite = kite
         self.mode = mode
+        self.store = store
 
     def get_object(self, **kwargs):
         if self.mode == LIVE:
             return TicksDataManager(**kwargs)
         elif self.mode == BACK_TEST or self.mode == SCREEN or self.mode == SETUP:
-            return KiteHistoricalDataManager(self.kite, **kwargs)
+            candle_interval = kwargs['candle_interval']
+            stored_candle_interval = self.get_stored_candle_interval(kwargs['period'], candle_interval)
+
+            if stored_candle_interval != candle_interval:
+                kwargs['candle_interval'] = stored_candle_interval
+                return ResampledDataManager(self.get_historical_object(**kwargs), candle_interval)
+
+            return self.get_historical_object(**kwargs)
         else:
             raise ValueError("Unknown mode {}".format(self.mode))
+
+    def get_historical_object(self, **kwargs):
+        if self.store == COLUMNAR_STORE:
+            return ColumnarDataManager(self.kite, **kwargs)
+        elif self.store == SQLITE_STORE:
+            return KiteHistoricalDataManager(self.kite, **kwargs)
+        else:
+            raise ValueError("Unknown historical data store {}".format(self.store))
+
+    @staticmethod
+    def get_stored_candle_interval(period, candle_interval):
+        """
+        :return: Candle interval whose candles are stored (and downloaded) for the given candle interval
+        """
+        if period == Period.MIN and candle_interval in DERIVED_CANDLE_INTERVALS:
+            return BASE_CANDLE_INTERVAL
+
+        return candle_interval
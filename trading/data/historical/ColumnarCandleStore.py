@@ -0,0 +1,227 @@
+import logging
+import os
+import threading
+import uuid
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows. Writers are serialised within the process alone there
+    fcntl = None
+
+from trading.constants import COLUMNAR_STORE_PATH
+from trading.zerodha.kite.TimeSequencer import EPOCH_ORDINAL, to_epoch_minutes, from_epoch_minutes
+
+MINUTES_IN_A_DAY = 24 * 60
+
+# Fixed width columns of a candle
+COLUMNS = {
+    'epoch_minute': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.int64
+}
+
+
+class ColumnarCandleStore:
+    """
+    On disk, column oriented store of candles.
+    Every table (i.e symbol, period and candle interval) is a directory with one flat binary file per column and a
+    session index. The session index records, for every stored trading day, where its rows start and how many there
+    are. Column files are memory mapped read only, so reads are slices of the mapped files (no copies) and processes
+    reading the same table share the pages through the OS page cache.
+    Sessions are always appended, even when they are rewritten, and the index is then pointed to them. Rows the index
+    refers to are hence never changed, so readers never see half written sessions. Writers of a table (of any process)
+    hold a lock on its lock file
+    """
+
+    def __init__(self, path=COLUMNAR_STORE_PATH):
+        self.path = path
+
+        # Table name to its session index and memory mapped columns
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def write_session(self, table_name, day, df):
+        """
+        Stores the candles of a trading day
+        :param table_name: Name of the table. i.e symbol, candle interval and period
+        :param day: Trading day
+        :param df: Candles of the day indexed by candle time
+        """
+        table_path = self.get_table_path(table_name)
+        os.makedirs(table_path, exist_ok=True)
+
+        columns = {'epoch_minute': to_epoch_minutes(df.index)}
+        for name in COLUMNS:
+            if name != 'epoch_minute':
+                columns[name] = df[name].values
+
+        epoch_day = self.to_epoch_day(day)
+
+        with self.lock:
+            lock_file = self.lock_table(table_name)
+            try:
+                sessions = self.read_sessions(table_name)
+                first_row = self.get_row_count(sessions)
+
+                for name, dtype in COLUMNS.items():
+                    with open(self.get_column_path(table_name, name), 'ab') as f:
+                        # Rows beyond the index were left by a write that did not complete. Overwrite them
+                        f.truncate(first_row * np.dtype(dtype).itemsize)
+                        f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+
+                session = np.array([[epoch_day, first_row, len(df)]], dtype=np.int64)
+                matches = np.nonzero(sessions[:, 0] == epoch_day)[0]
+                if len(matches) > 0:
+                    sessions[matches[0]] = session[0]
+                else:
+                    sessions = np.concatenate([sessions, session])
+                    sessions = sessions[np.argsort(sessions[:, 0], kind='stable')]
+
+                self.write_sessions(table_name, sessions)
+            finally:
+                self.unlock_table(lock_file)
+
+            # Mapped files have changed. They are mapped again on the next read
+            self.tables.pop(table_name, None)
+
+        logging.debug("Stored {} candles of table {} for {}".format(len(df), table_name, day))
+
+    def get_columns(self, table_name, start_key, end_key):
+        """
+        Gets the candles whose epoch minutes are between the start key (inclusive) and the end key (exclusive)
+        :return: dictionary of column name and numpy array. Arrays are read only views of the mapped files when the
+        candles belong to a single session
+        """
+        sessions, columns = self.get_table(table_name)
+
+        slices = []
+        first_day = start_key // MINUTES_IN_A_DAY
+        last_day = (end_key - 1) // MINUTES_IN_A_DAY
+
+        first = np.searchsorted(sessions[:, 0], first_day, side='left')
+        last = np.searchsorted(sessions[:, 0], last_day, side='right')
+
+        for epoch_day, first_row, row_count in sessions[first:last].tolist():
+            keys = columns['epoch_minute'][first_row:first_row + row_count]
+            lo = first_row + int(np.searchsorted(keys, start_key, side='left'))
+            hi = first_row + int(np.searchsorted(keys, end_key, side='left'))
+            if hi > lo:
+                slices.append((lo, hi))
+
+        if len(slices) == 1:
+            lo, hi = slices[0]
+            return {name: column[lo:hi] for name, column in columns.items()}
+
+        return {name: np.concatenate([column[lo:hi] for lo, hi in slices]) if slices
+                else np.empty(0, dtype=COLUMNS[name])
+                for name, column in columns.items()}
+
+    def get_sessions(self, table_name, non_empty=False):
+        """
+        :param non_empty: Leave out the trading days that were stored without any candle
+        :return: the trading days that are stored for the table, in ascending order
+        """
+        sessions, columns = self.get_table(table_name)
+        if non_empty:
+            sessions = sessions[sessions[:, 2] > 0]
+
+        return [d.date() for d in from_epoch_minutes(sessions[:, 0] * MINUTES_IN_A_DAY)]
+
+    def has_session(self, table_name, day):
+        sessions, columns = self.get_table(table_name)
+        return bool(np.any(sessions[:, 0] == self.to_epoch_day(day)))
+
+    def get_table(self, table_name):
+        with self.lock:
+            if table_name not in self.tables:
+                sessions = self.read_sessions(table_name)
+
+                row_count = self.get_row_count(sessions)
+
+                columns = {}
+                for name, dtype in COLUMNS.items():
+                    path = self.get_column_path(table_name, name)
+                    if os.path.exists(path) and os.path.getsize(path) > 0:
+                        columns[name] = np.memmap(path, dtype=dtype, mode='r')
+                    else:
+                        columns[name] = np.empty(0, dtype=dtype)
+
+                    if len(columns[name]) < row_count:
+                        raise ValueError("Column {} of table {} has {} rows. The index refers to {}".format(
+                            name, table_name, len(columns[name]), row_count))
+
+                self.tables[table_name] = (sessions, columns)
+
+            return self.tables[table_name]
+
+    def lock_table(self, table_name):
+        """
+        Waits till no other process writes the table
+        :return: the locked file. See unlock_table
+        """
+        if fcntl is None:
+            return None
+
+        lock_file = open(os.path.join(self.get_table_path(table_name), ".lock"), 'a')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    @staticmethod
+    def unlock_table(lock_file):
+        if lock_file is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def read_sessions(self, table_name):
+        path = self.get_sessions_path(table_name)
+        if not os.path.exists(path):
+            return np.empty((0, 3), dtype=np.int64)
+
+        return np.load(path)
+
+    def write_sessions(self, table_name, sessions):
+        """
+        Replaces the session index. It is written under a hidden name and renamed once complete, so the index never
+        refers to rows that were not written and is never left half written
+        """
+        path = self.get_sessions_path(table_name)
+        hidden_path = os.path.join(self.get_table_path(table_name), ".sessions." + uuid.uuid4().hex)
+
+        with open(hidden_path, 'wb') as f:
+            np.save(f, sessions)
+
+        os.replace(hidden_path, path)
+
+    @staticmethod
+    def get_row_count(sessions):
+        """
+        :return: number of rows of the columns that the session index refers to. Rows after them are not part of
+        the table
+        """
+        if len(sessions) == 0:
+            return 0
+
+        return int(np.max(sessions[:, 1] + sessions[:, 2]))
+
+    def get_table_path(self, table_name):
+        return os.path.join(self.path, table_name)
+
+    def get_column_path(self, table_name, name):
+        return os.path.join(self.get_table_path(table_name), name + ".bin")
+
+    def get_sessions_path(self, table_name):
+        return os.path.join(self.get_table_path(table_name), "sessions.npy")
+
+    @staticmethod
+    def to_epoch_day(day):
+        return day.toordinal() - EPOCH_ORDINAL
+
+
+# Shared by everything in the process so that tables are mapped only once
+columnar_candle_store = ColumnarCandleStore()
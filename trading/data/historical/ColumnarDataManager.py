@@ -0,0 +1,75 @@
+import datetime
+import logging
+
+import pandas as pd
+
+from trading.data.historical.ColumnarCandleStore import columnar_candle_store
+from trading.data.historical.KiteHistoricalDataManager import KiteHistoricalDataManager
+from trading.zerodha.kite.TimeSequencer import to_epoch_minute, from_epoch_minutes
+
+
+class ColumnarDataManager(KiteHistoricalDataManager):
+    """
+    Gets historical OHLC data from Zerodha's historical api like KiteHistoricalDataManager but keeps it in the
+    memory mapped columnar candle store instead of SQLite
+    """
+
+    def __init__(self, kite, **kwargs):
+        super().__init__(kite, **kwargs)
+
+        self.store = columnar_candle_store
+
+    def get_stored_days(self, symbol):
+        # Today's session is incomplete until the market closes. Fetch it again the next time. So are the sessions
+        # that were downloaded without any candle when refreshing
+        return set(self.store.get_sessions(symbol + self.table_name_suffix, non_empty=self.refresh)) - \
+            {datetime.date.today()}
+
+    def store_data(self, symbol, df, days):
+        table_name = symbol + self.table_name_suffix
+        today = datetime.date.today()
+
+        sessions = {}
+        if not df.empty:
+            sessions = {day: session_df for day, session_df in df.groupby(df.index.date)}
+
+        for day in days:
+            if day in sessions:
+                self.store.write_session(table_name, day, sessions[day])
+            elif day < today:
+                # Nothing to download for the day. An empty session remembers that
+                self.store.write_session(table_name, day, self.get_empty_session())
+
+    @staticmethod
+    def get_empty_session():
+        return pd.DataFrame({'open': [], 'high': [], 'low': [], 'close': [], 'volume': []},
+                            index=pd.DatetimeIndex([], name='ts'))
+
+    def copy_from(self, data_manager, symbol):
+        """
+        Copies the days that are already downloaded into another store (i.e SQLite) into the columnar store, so that
+        they are not downloaded again. Days that are already in the columnar store are skipped
+        :param data_manager: Data manager to read the candles from
+        :return: Number of days copied
+        """
+        days = sorted(data_manager.get_stored_days(symbol) - self.get_stored_days(symbol))
+
+        if not days:
+            return 0
+
+        start = datetime.datetime.combine(days[0], datetime.time())
+        end = datetime.datetime.combine(days[-1] + datetime.timedelta(days=1), datetime.time())
+
+        self.store_data(symbol, data_manager.get_data(symbol, start, end), days)
+        self.invalidate_cache(symbol)
+
+        return len(days)
+
+    def get_data(self, symbol, start, end):
+        logging.debug("Fetching candles from columnar store for {} from {} till {}".format(symbol, start, end))
+
+        columns = self.store.get_columns(symbol + self.table_name_suffix, to_epoch_minute(start),
+                                         to_epoch_minute(end))
+        index = from_epoch_minutes(columns.pop('epoch_minute'))
+
+        return pd.DataFrame(columns, index=index)
@@ -0,0 +1,122 @@
+import datetime
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from trading.constants import BACK_TEST, KITE_HISTORICAL_API_RATE, HISTORICAL_DOWNLOAD_THREADS, \
+    HISTORICAL_DOWNLOAD_TRIES, HISTORICAL_DOWNLOAD_RETRY_DELAY
+from trading.data.DataManagerFactory import DataManagerFactory
+from trading.zerodha.kite.Period import Period
+from trading.zerodha.kite.TimeSequencer import get_trading_days_between
+from trading.zerodha.kite.TokenBucket import TokenBucket
+
+
+class HistoricalDataDownloader:
+    """
+    Downloads historical candles for many symbols, days and candle intervals.
+    Only the trading days that are not stored yet are downloaded. They are split into the largest chunks a single
+    request allows. Chunks are fetched concurrently behind a token bucket that keeps to the rate limit of the
+    historical api, and are stored one at a time as they arrive. Failed requests are retried behind the same bucket.
+    Every stored chunk is recorded as downloaded, so an interrupted download resumes where it stopped when it is run
+    again
+    """
+
+    def __init__(self, kite, instruments_helper, **kwargs):
+        self.kite = kite
+        self.instruments_helper = instruments_helper
+
+        self.mode = kwargs.get('mode', BACK_TEST)
+        self.threads = kwargs.get('threads', HISTORICAL_DOWNLOAD_THREADS)
+        self.refresh = kwargs.get('refresh', False)
+        self.tries = kwargs.get('tries', HISTORICAL_DOWNLOAD_TRIES)
+        self.rate_limiter = TokenBucket(kwargs.get('rate', KITE_HISTORICAL_API_RATE))
+
+    def download(self, symbols, start_date, end_date, candle_intervals, period=Period.MIN):
+        """
+        :param symbols: list of symbols
+        :param start_date: First day to download
+        :param end_date: Last day to download
+        :param candle_intervals: list of candle intervals
+        :return: True if every chunk was downloaded
+        """
+        trading_days = get_trading_days_between(start_date, end_date)
+
+        # Candles of the derived intervals are not downloaded. They are built from the stored ones
+        candle_intervals = sorted(set(DataManagerFactory.get_stored_candle_interval(period, candle_interval)
+                                      for candle_interval in candle_intervals))
+
+        jobs = []
+        for candle_interval in candle_intervals:
+            data_manager = DataManagerFactory(self.kite, self.mode).get_object(
+                period=period,
+                candle_interval=candle_interval,
+                instruments_helper=self.instruments_helper,
+                refresh=self.refresh
+            )
+
+            for symbol in symbols:
+                stored_days = data_manager.get_stored_days(symbol)
+                missing_days = [day for day in trading_days if day not in stored_days]
+
+                if missing_days and not data_manager.has_instrument(symbol):
+                    logging.warning("Instrument of {} is not known. Skipping it".format(symbol))
+                    continue
+
+                for days in data_manager.get_chunks(missing_days):
+                    jobs.append((data_manager, symbol, days))
+
+        logging.info("Downloading {} chunks of historical data for {} symbols from {} till {}".format(
+            len(jobs), len(symbols), start_date, end_date))
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            futures = {executor.submit(self.fetch, *job): job for job in jobs}
+
+            for i, future in enumerate(as_completed(futures)):
+                data_manager, symbol, days = futures[future]
+
+                try:
+                    df = future.result()
+                except Exception as e:
+                    logging.error("Could not download {} from {} till {}: {}".format(symbol, days[0], days[-1], e))
+                    failed = failed + 1
+                    continue
+
+                # Stores are written from this thread alone
+                data_manager.store_data(symbol, df, days)
+                data_manager.invalidate_cache(symbol)
+
+                logging.info("Downloaded {} of {} chunks. {} from {} till {}".format(
+                    i + 1, len(jobs), symbol, days[0], days[-1]))
+
+        for data_manager in set(job[0] for job in jobs):
+            data_manager.close()
+
+        if failed > 0:
+            logging.warning("{} chunks could not be downloaded. Run again to resume".format(failed))
+
+        return failed == 0
+
+    def fetch(self, data_manager, symbol, days):
+        """
+        Fetches a chunk. Every attempt takes a token of the bucket, so that retries keep to the rate limit as well
+        :return: Candles of the chunk
+        """
+        start = datetime.datetime.combine(days[0], datetime.time(9, 15))
+        end = datetime.datetime.combine(days[-1], datetime.time(15, 30))
+
+        delay = HISTORICAL_DOWNLOAD_RETRY_DELAY
+        for attempt in range(1, self.tries + 1):
+            self.rate_limiter.acquire()
+
+            try:
+                return data_manager.fetch_data_from_kite(symbol, start, end)
+            except Exception as e:
+                if attempt == self.tries:
+                    raise
+
+                logging.warning("Attempt {} to download {} from {} till {} failed: {}. Retrying in {} seconds".format(
+                    attempt, symbol, days[0], days[-1], e, delay))
+
+            time.sleep(delay)
+            delay = delay * 2
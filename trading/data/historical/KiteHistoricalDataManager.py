@@ -1,12 +1,18 @@
+import datetime
 import logging
 import sqlite3
 
 import pandas as pd
-from sqlalchemy import create_engine
 
-from trading.constants import BACK_TEST_OHLC_DB_PATH, CSV_PATH
+from trading.constants import BACK_TEST_OHLC_DB_PATH, CSV_PATH, BASE_CANDLE_INTERVAL
+from trading.data.CandleCache import candle_cache
 from trading.zerodha.kite.Period import Period
 from trading.zerodha.kite.Retry import retry
+from trading.zerodha.kite.TimeSequencer import to_epoch_minute, to_epoch_minutes, from_epoch_minutes, \
+    get_trading_days_between
+
+# Trading days (of every table) that are already downloaded
+COVERAGE_TABLE_NAME = "sync_coverage"
 
 
 class KiteHistoricalDataManager:
@@ -15,10 +21,16 @@ class KiteHistoricalDataManager:
     Requires a valid kite object and symbols-instruments map
     """
 
+    # Tables that were stored before epoch minutes were recorded. They are read by their string time
+    legacy_tables = set()
+
     def __init__(self, kite, **kwargs):
         self.kite = kite
         self.instruments_helper = kwargs['instruments_helper']
 
+        # Fetch the days that were downloaded without any candle (i.e holidays) again
+        self.refresh = kwargs.get('refresh', False)
+
         self.period = kwargs['period']
         self.candle_interval = kwargs['candle_interval']
         self.interval = self.get_interval()
@@ -29,6 +41,13 @@ class KiteHistoricalDataManager:
 
     @retry(tries=5, delay=2, backoff=2)
     def get_data_from_kite(self, symbol, start, end):
+        return self.fetch_data_from_kite(symbol, start, end)
+
+    def fetch_data_from_kite(self, symbol, start, end):
+        """
+        Fetches the candles with a single request. Failures are raised, not retried (see get_data_from_kite), so that
+        callers keeping to the rate limit (i.e HistoricalDataDownloader) can retry on their own
+        """
         from_date = start.date()
         to_date = end.date()
 
@@ -57,17 +76,171 @@ class KiteHistoricalDataManager:
 
     @retry(tries=5, delay=2, backoff=2)
     def put_data(self, symbol, start, end):
-        df = self.get_data_from_kite(symbol, start, end)
+        """
+        Downloads the candles between start and end unless they are already stored
+        Only the trading days that are missing are fetched from Zerodha. Contiguous missing days are fetched together
+        Days are always fetched whole since they are recorded as downloaded
+        :return: True if candles are available for the given time
+        """
+        stored_days = self.get_stored_days(symbol)
+        missing_days = [day for day in get_trading_days_between(start.date(), end.date()) if day not in stored_days]
 
-        if df.empty:
-            # This could be a non trading day
-            return False
+        if missing_days and not self.has_instrument(symbol):
+            # Nothing can be downloaded. Do not record the days as downloaded so that they are fetched once the
+            # instruments are refreshed
+            logging.warning("Instrument of {} is not known. Candles cannot be downloaded".format(symbol))
+            return bool(stored_days) and not self.get_data(symbol, start, end).empty
+
+        for days in self.get_chunks(missing_days):
+            fetch_start = datetime.datetime.combine(days[0], datetime.time(9, 15))
+            fetch_end = datetime.datetime.combine(days[-1], datetime.time(15, 30))
+
+            df = self.get_data_from_kite(symbol, fetch_start, fetch_end)
+            self.store_data(symbol, df, days)
+
+        if missing_days:
+            self.invalidate_cache(symbol)
+        else:
+            logging.debug("Candles of {} from {} till {} are already stored".format(symbol, start, end))
+
+        return not self.get_data(symbol, start, end).empty
+
+    def has_instrument(self, symbol):
+        return self.instruments_helper is not None and \
+            bool(self.instruments_helper.get_instrument_token_from_symbol(symbol))
+
+    def invalidate_cache(self, symbol):
+        # Candles of the derived intervals are built from the base candles. They are stale as well
+        if self.candle_interval == BASE_CANDLE_INTERVAL:
+            candle_cache.invalidate(symbol, self.period)
+        else:
+            candle_cache.invalidate(symbol, self.period, self.candle_interval)
+
+    def get_chunks(self, days):
+        """
+        Splits the days into runs of consecutive trading days, each of which can be fetched with a single request
+        :param days: trading days in ascending order
+        :return: list of lists of trading days
+        """
+        max_days = self.get_max_days_per_request()
+        chunks = []
+
+        for day in days:
+            if chunks and get_trading_days_between(chunks[-1][-1], day)[1:] == [day] and \
+                    (day - chunks[-1][0]).days < max_days:
+                chunks[-1].append(day)
+            else:
+                chunks.append([day])
+
+        return chunks
+
+    def get_max_days_per_request(self):
+        """
+        Zerodha limits the number of days a single historical data request can span. It depends on the interval
+        """
+        if self.period == Period.DAY:
+            return 2000
+        elif self.candle_interval == 1:
+            return 60
+        elif self.candle_interval < 15:
+            return 100
+        elif self.candle_interval < 60:
+            return 200
+        else:
+            return 400
+
+    def get_stored_days(self, symbol):
+        """
+        :return: set of trading days that are already downloaded for the symbol. Days that were downloaded without
+        any candle are left out only when refreshing
+        """
+        table_name = symbol + self.table_name_suffix
+
+        db = sqlite3.connect(BACK_TEST_OHLC_DB_PATH)
+        try:
+            rows = self.get_coverage(db, table_name)
+        finally:
+            db.close()
+
+        return set(datetime.date.fromisoformat(r[0]) for r in rows if r[1] > 0 or not self.refresh)
+
+    def get_coverage(self, db, table_name):
+        """
+        :return: rows of the days that are downloaded for the table along with the number of candles of the day
+        """
+        self.create_coverage_table(db)
+
+        rows = db.execute("SELECT day, candles FROM {} WHERE table_name = ?".format(COVERAGE_TABLE_NAME),
+                          (table_name,)).fetchall()
+
+        if not rows and self.table_exists(db, table_name):
+            # Stored before the coverage was recorded. Every day that has candles is complete
+            rows = db.execute("SELECT date(ts), count(*) FROM {} GROUP BY date(ts)".format(table_name)).fetchall()
+            db.executemany("INSERT OR REPLACE INTO {} (table_name, day, candles) VALUES (?, ?, ?)".
+                           format(COVERAGE_TABLE_NAME), [(table_name, r[0], r[1]) for r in rows])
+            db.commit()
+
+        return rows
+
+    def store_data(self, symbol, df, days):
+        """
+        Inserts the candles, replacing the candles of the same time if any, and records the days as downloaded
+        :param df: Candles downloaded from Zerodha
+        :param days: Trading days the candles were downloaded for
+        """
+        table_name = symbol + self.table_name_suffix
+        today = datetime.date.today()
+
+        db = sqlite3.connect(BACK_TEST_OHLC_DB_PATH)
+        try:
+            # Coverage of the candles stored so far has to be known before adding to it
+            self.get_coverage(db, table_name)
+            self.create_candles_table(db, table_name)
+
+            candles_per_day = {}
+            if not df.empty:
+                rows = zip(df.index.strftime('%Y-%m-%d %H:%M:%S.%f'), df['open'].tolist(), df['high'].tolist(),
+                           df['low'].tolist(), df['close'].tolist(), df['volume'].tolist(),
+                           to_epoch_minutes(df.index).tolist())
+                db.executemany("INSERT OR REPLACE INTO {} (ts, open, high, low, close, volume, epoch_minute) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)".format(table_name), rows)
 
-        engine = create_engine(f"sqlite:///" + BACK_TEST_OHLC_DB_PATH)
-        df.to_sql(symbol + self.table_name_suffix, engine, if_exists='replace')
-        engine.dispose()
+                candles_per_day = df.groupby(df.index.date).size().to_dict()
 
-        return True
+            # Today's candles are incomplete until the market closes. Fetch them again the next time
+            coverage = [(table_name, str(day), candles_per_day.get(day, 0)) for day in days if day < today]
+            db.executemany("INSERT OR REPLACE INTO {} (table_name, day, candles) VALUES (?, ?, ?)".
+                           format(COVERAGE_TABLE_NAME), coverage)
+
+            db.commit()
+        finally:
+            db.close()
+
+        self.legacy_tables.discard(table_name)
+
+    @staticmethod
+    def create_coverage_table(db):
+        db.execute("CREATE TABLE IF NOT EXISTS {} (table_name TEXT, day TEXT, candles INTEGER, "
+                   "PRIMARY KEY (table_name, day))".format(COVERAGE_TABLE_NAME))
+
+    def create_candles_table(self, db, table_name):
+        if not self.table_exists(db, table_name):
+            db.execute("CREATE TABLE {} (ts DATETIME, open FLOAT, high FLOAT, low FLOAT, close FLOAT, volume BIGINT, "
+                       "epoch_minute BIGINT)".format(table_name))
+        elif 'epoch_minute' not in [r[1] for r in db.execute("PRAGMA table_info({})".format(table_name))]:
+            # Stored before epoch minutes were recorded
+            db.execute("ALTER TABLE {} ADD COLUMN epoch_minute BIGINT".format(table_name))
+            db.execute("UPDATE {} SET epoch_minute = CAST(strftime('%s', ts) AS INTEGER) / 60".format(table_name))
+
+        # Upserts rely on the candle time being unique
+        db.execute("DROP INDEX IF EXISTS ix_{}_epoch_minute".format(table_name))
+        db.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_{}_epoch_minute ON {} (epoch_minute)".
+                   format(table_name, table_name))
+
+    @staticmethod
+    def table_exists(db, table_name):
+        return db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+                          (table_name,)).fetchone() is not None
 
     @retry(tries=5, delay=2, backoff=2)
     def put_data_to_csv(self, file_name, symbol, start, end):
@@ -82,11 +255,30 @@ class KiteHistoricalDataManager:
     def get_data(self, symbol, start, end):
         logging.debug("Fetching ticks data from OHLC db for {} from {} till {}".format(symbol, start, end))
 
-        query = "SELECT * FROM {} where ts >= '{}' and ts < '{}'".format(symbol + self.table_name_suffix, start, end)
+        table_name = symbol + self.table_name_suffix
 
         db = sqlite3.connect(BACK_TEST_OHLC_DB_PATH)
-        data = pd.read_sql_query(query, db)
-        db.close()
+        try:
+            if table_name not in self.legacy_tables:
+                query = "SELECT * FROM {} where epoch_minute >= {} and epoch_minute < {}".format(
+                    table_name, to_epoch_minute(start), to_epoch_minute(end))
+
+                try:
+                    data = pd.read_sql_query(query, db)
+                    data = data.drop('ts', axis=1)
+                    data.index = from_epoch_minutes(data.pop('epoch_minute'))
+                    return data
+                except pd.errors.DatabaseError as e:
+                    if 'no such column' not in str(e):
+                        raise
+
+                    logging.info("Table {} does not have epoch minutes. Reading by time".format(table_name))
+                    self.legacy_tables.add(table_name)
+
+            query = "SELECT * FROM {} where ts >= '{}' and ts < '{}'".format(table_name, start, end)
+            data = pd.read_sql_query(query, db)
+        finally:
+            db.close()
 
         data = data.set_index(['ts'])
         data.index = pd.to_datetime(data.index)
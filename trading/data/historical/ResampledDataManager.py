@@ -0,0 +1,97 @@
+import datetime
+import logging
+
+import numpy as np
+import pandas as pd
+
+from trading.zerodha.kite.TimeSequencer import to_epoch_minutes, from_epoch_minutes
+from trading.zerodha.kite.TradingCalendar import MARKET_OPEN_MINUTE, MARKET_CLOSE_MINUTE, MINUTES_IN_A_DAY
+
+
+class ResampledDataManager:
+    """
+    Builds candles of a higher interval (i.e 5 min) from the stored candles of a lower interval (i.e 1 min) instead of
+    storing them separately.
+    Candles are aligned to the start of the session (09:15), the same way Zerodha aligns them. A 5 min candle at 09:15
+    is built from the 1 min candles of 09:15 till 09:19. Back tests cache the built sessions in the candle cache
+    """
+
+    def __init__(self, data_manager, candle_interval):
+        if candle_interval % data_manager.candle_interval != 0:
+            raise ValueError("Candles of {} min cannot be built from candles of {} min".format(
+                candle_interval, data_manager.candle_interval))
+
+        self.data_manager = data_manager
+
+        self.period = data_manager.period
+        self.candle_interval = candle_interval
+
+    def put_data(self, symbol, start, end):
+        """
+        Downloads the underlying candles between start and end unless they are already stored
+        :return: True if candles are available for the given time
+        """
+        return self.data_manager.put_data(symbol, start, end)
+
+    def put_data_to_csv(self, file_name, symbol, start, end):
+        df = self.get_data_from_kite(symbol, start, end)
+
+        if df.empty:
+            return
+
+        df.to_csv(file_name)
+
+    def get_data_from_kite(self, symbol, start, end):
+        return self.resample(self.data_manager.get_data_from_kite(symbol, start, end), self.candle_interval)
+
+    def get_data(self, symbol, start, end):
+        """
+        :return: candles starting between start (inclusive) and end (exclusive)
+        """
+        logging.debug("Building {} min candles of {} from {} till {}".format(self.candle_interval, symbol, start, end))
+
+        # The last candle is built from the underlying candles that start before its end
+        df = self.data_manager.get_data(symbol, start, end + datetime.timedelta(minutes=self.candle_interval - 1))
+        df = self.resample(df, self.candle_interval)
+
+        return df[(df.index >= start) & (df.index < end)]
+
+    def close(self):
+        self.data_manager.close()
+
+    @staticmethod
+    def resample(df, candle_interval):
+        """
+        Aggregates candles into candles of the given interval aligned to the start of the session
+        :param df: Candles indexed by candle time
+        :return: dataframe of open, high, low, close and volume indexed by candle time
+        """
+        if df.empty:
+            return df
+
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+
+        # Zerodha returns a 1 min candle at 15:30 i.e when the market closes. Candles of higher intervals end before it
+        keys = to_epoch_minutes(df.index)
+        in_session = keys % MINUTES_IN_A_DAY < MARKET_CLOSE_MINUTE
+        if not in_session.all():
+            df = df[in_session]
+            keys = keys[in_session]
+
+        if df.empty:
+            return df
+
+        buckets = keys - (keys % MINUTES_IN_A_DAY - MARKET_OPEN_MINUTE) % candle_interval
+
+        # Rows where a new candle starts and where each candle ends
+        starts = np.flatnonzero(np.concatenate([[True], buckets[1:] != buckets[:-1]]))
+        ends = np.append(starts[1:], len(buckets)) - 1
+
+        return pd.DataFrame({
+            'open': df['open'].values[starts],
+            'high': np.maximum.reduceat(df['high'].values, starts),
+            'low': np.minimum.reduceat(df['low'].values, starts),
+            'close': df['close'].values[ends],
+            'volume': np.add.reduceat(df['volume'].values, starts)
+        }, index=from_epoch_minutes(buckets[starts]))
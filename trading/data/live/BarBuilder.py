@@ -0,0 +1,164 @@
+import bisect
+import datetime
+import threading
+
+import pandas as pd
+
+from trading.data.live.BarSeries import BarSeries
+from trading.zerodha.kite.TimeSequencer import to_epoch_minute, from_epoch_minutes
+
+
+class BarBuilder:
+    """
+    Builds OHLC bars of every symbol, for every candle interval in use, in memory as ticks arrive.
+    Indicators read the closed bars from here instead of querying and resampling the ticks db. Ticks are still written
+    to the ticks db (see TickWriter). It serves as the audit log and as the source of the bars from before the bar
+    builder started.
+    Listeners are told as soon as a bar closes, so that strategies can run on it right away
+    """
+
+    def __init__(self):
+        self.candle_intervals = set()
+
+        # Symbol to candle interval to bar series
+        self.series = {}
+        self.lock = threading.Lock()
+
+        # (symbol, candle interval) to the listeners of its closed bars
+        self.listeners = {}
+
+        # (symbol, candle interval) to the key of the last bar its listeners were told about
+        self.notified_keys = {}
+
+    def subscribe(self, symbol, candle_interval, listener):
+        """
+        Tells the listener every time a bar of the symbol and candle interval closes
+        :param listener: Object with on_bar_close(candle_time) and on_market_close(candle_time). Candle time is the end
+        of the bar. Listeners are called from the thread that closed the bar and should return quickly
+        """
+        with self.lock:
+            self.candle_intervals.add(candle_interval)
+            self.listeners.setdefault((symbol, candle_interval), []).append(listener)
+
+    def add_candle_interval(self, candle_interval):
+        """
+        Bars of the candle interval are built for the ticks that arrive from now on
+        """
+        with self.lock:
+            self.candle_intervals.add(candle_interval)
+
+    def on_ticks(self, tick_time, ticks):
+        """
+        :param tick_time: Time the ticks were received at
+        :param ticks: list of tuples of symbol, last price and last quantity
+        """
+        minute_key = to_epoch_minute(tick_time)
+
+        with self.lock:
+            closed_symbols = set()
+            for symbol, price, quantity in ticks:
+                if symbol not in self.series:
+                    self.series[symbol] = {}
+
+                symbol_series = self.series[symbol]
+                for candle_interval in self.candle_intervals:
+                    if candle_interval not in symbol_series:
+                        symbol_series[candle_interval] = BarSeries(candle_interval)
+
+                    symbol_series[candle_interval].add_tick(minute_key, price, quantity)
+
+                closed_symbols.add(symbol)
+
+            events = self.get_bar_close_events(closed_symbols)
+
+        self.notify(events)
+
+    def close_bars(self, candle_time):
+        """
+        Closes the bars of every symbol that end by the candle time, even if no tick arrived after them
+        """
+        end_key = to_epoch_minute(candle_time)
+
+        with self.lock:
+            for symbol_series in self.series.values():
+                for series in symbol_series.values():
+                    series.close_bars(end_key)
+
+            events = self.get_bar_close_events(self.series.keys())
+
+        self.notify(events)
+
+    def stop(self, candle_time):
+        """
+        Tells all the listeners that the market has closed
+        """
+        with self.lock:
+            listeners = [listener for symbol_listeners in self.listeners.values() for listener in symbol_listeners]
+
+        for listener in listeners:
+            listener.on_market_close(candle_time)
+
+    def get_bar_close_events(self, symbols):
+        """
+        :return: list of listener and the end time of the last closed bar, for every listened series that closed a bar
+        since its listeners were last told
+        """
+        events = []
+
+        for symbol in symbols:
+            for candle_interval, series in self.series[symbol].items():
+                key = (symbol, candle_interval)
+                if key not in self.listeners or not series.keys or series.keys[-1] == self.notified_keys.get(key):
+                    continue
+
+                # Only the last bar matters if several bars closed at once
+                self.notified_keys[key] = series.keys[-1]
+                candle_time = from_epoch_minutes([series.get_bar_end(series.keys[-1])])[0].to_pydatetime()
+
+                for listener in self.listeners[key]:
+                    events.append((listener, candle_time))
+
+        return events
+
+    @staticmethod
+    def notify(events):
+        for listener, candle_time in events:
+            listener.on_bar_close(candle_time)
+
+    def get_data(self, symbol, candle_interval, start, end):
+        """
+        Gets the closed bars starting between start (inclusive) and end (exclusive)
+        :return: dataframe of bars or None if bars from the start time were not built
+        """
+        start_key = to_epoch_minute(start)
+
+        # Bars that have not ended yet are not returned
+        end_key = min(to_epoch_minute(end), to_epoch_minute(datetime.datetime.now()))
+
+        with self.lock:
+            series = self.series.get(symbol, {}).get(candle_interval)
+            if series is None or not series.covers(start_key):
+                return None
+
+            series.close_bars(end_key)
+
+            first = bisect.bisect_left(series.keys, start_key)
+            last = bisect.bisect_left(series.keys, end_key)
+
+            df = pd.DataFrame({
+                'open': series.opens[first:last],
+                'high': series.highs[first:last],
+                'low': series.lows[first:last],
+                'close': series.closes[first:last],
+                'volume': series.volumes[first:last]
+            }, index=from_epoch_minutes(series.keys[first:last]))
+
+            events = self.get_bar_close_events([symbol])
+
+        self.notify(events)
+
+        return df
+
+
+# Shared by the websocket callback and all the strategies of the process
+bar_builder = BarBuilder()
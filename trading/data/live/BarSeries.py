@@ -0,0 +1,99 @@
+from trading.zerodha.kite.TradingCalendar import MARKET_OPEN_MINUTE, MARKET_CLOSE_MINUTE, MINUTES_IN_A_DAY
+
+
+class BarSeries:
+    """
+    OHLC bars of one symbol and candle interval built tick by tick.
+    Bars are aligned to the start of the session (09:15) and keyed by the epoch minute they start at. The bar that ticks
+    are arriving for is open. It is closed once a tick of a later bar arrives or once its end is asked for. Bars without
+    any tick are filled with the previous close so that there are no holes in the series
+    """
+
+    def __init__(self, candle_interval):
+        self.candle_interval = candle_interval
+
+        # Closed bars
+        self.keys = []
+        self.opens = []
+        self.highs = []
+        self.lows = []
+        self.closes = []
+        self.volumes = []
+
+        # Bar that is open as a list of key, open, high, low, close and volume
+        self.bar = None
+
+        # Key of the first bar built from all of its ticks. Bars before it are not known
+        self.first_key = None
+
+    def get_bar_key(self, minute_key):
+        return minute_key - (minute_key % MINUTES_IN_A_DAY - MARKET_OPEN_MINUTE) % self.candle_interval
+
+    def add_tick(self, minute_key, price, quantity):
+        """
+        :param minute_key: Epoch minute the tick was received at
+        """
+        bar_key = self.get_bar_key(minute_key)
+
+        if self.bar is not None and bar_key == self.bar[0]:
+            bar = self.bar
+            if price > bar[2]:
+                bar[2] = price
+            if price < bar[3]:
+                bar[3] = price
+            bar[4] = price
+            bar[5] = bar[5] + quantity
+            return
+
+        if self.bar is None and not self.keys:
+            # Ticks before the first one were missed. The first bar is incomplete
+            self.first_key = bar_key + self.candle_interval
+        elif bar_key < (self.bar[0] if self.bar is not None else self.keys[-1] + self.candle_interval):
+            # Late tick of a closed bar
+            return
+        else:
+            self.close_bars(bar_key)
+
+        self.bar = [bar_key, price, price, price, price, quantity]
+
+    def close_bars(self, end_key):
+        """
+        Closes the open bar if it ends by the given key and fills the bars without ticks till then
+        """
+        if self.bar is not None:
+            if self.get_bar_end(self.bar[0]) > end_key:
+                return
+
+            self.append(*self.bar)
+            self.bar = None
+
+        if not self.keys:
+            return
+
+        # No tick arrived for these bars. They stay flat at the last price
+        key = self.keys[-1] + self.candle_interval
+        close = self.closes[-1]
+        day = self.keys[-1] // MINUTES_IN_A_DAY
+
+        while self.is_in_session(key) and key // MINUTES_IN_A_DAY == day and self.get_bar_end(key) <= end_key:
+            self.append(key, close, close, close, close, 0)
+            key = key + self.candle_interval
+
+    def append(self, key, o, h, l, c, v):
+        self.keys.append(key)
+        self.opens.append(o)
+        self.highs.append(h)
+        self.lows.append(l)
+        self.closes.append(c)
+        self.volumes.append(v)
+
+    def get_bar_end(self, key):
+        # The last bar of the session is cut short by the market close
+        return min(key + self.candle_interval, key - key % MINUTES_IN_A_DAY + MARKET_CLOSE_MINUTE)
+
+    def covers(self, start_key):
+        return self.first_key is not None and start_key >= self.first_key
+
+    @staticmethod
+    def is_in_session(key):
+        return MARKET_OPEN_MINUTE <= key % MINUTES_IN_A_DAY < MARKET_CLOSE_MINUTE
@@ -0,0 +1,93 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+
+from trading.constants import TICKS_DB_PATH, TICK_WRITER_COMMIT_INTERVAL, TICK_WRITER_BATCH_SIZE
+
+
+class TickWriter(threading.Thread):
+    """
+    Writes ticks received from the websocket to the ticks db in the background.
+    The websocket callback only puts the ticks on a queue. This thread drains the queue, inserts the ticks of every
+    symbol with a single executemany and commits at a fixed interval, on one connection that lives as long as the
+    thread. The db is put in WAL mode so that it can be read while ticks are written.
+    Strategies read the bars built in memory (see BarBuilder). The ticks db is the audit log of the ticks
+    """
+
+    # Marks the end of the ticks
+    STOP = object()
+
+    def __init__(self, instruments_helper, db_path=TICKS_DB_PATH):
+        super().__init__(daemon=True)
+
+        self.instruments_helper = instruments_helper
+        self.db_path = db_path
+
+        self.ticks = queue.Queue()
+
+    def put(self, tick_time, ticks):
+        """
+        Queues the ticks to be written. Called from the websocket thread
+        :param tick_time: Time the ticks were received at
+        """
+        self.ticks.put((tick_time, ticks))
+
+    def stop(self):
+        """
+        Writes the ticks that are queued and waits for the thread to exit
+        """
+        self.ticks.put(self.STOP)
+        self.join()
+
+    def run(self):
+        db = sqlite3.connect(self.db_path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+
+        stopped = False
+        while not stopped:
+            # Collect whatever arrives till the next commit
+            commit_time = time.monotonic() + TICK_WRITER_COMMIT_INTERVAL
+            batch = []
+
+            while len(batch) < TICK_WRITER_BATCH_SIZE:
+                try:
+                    item = self.ticks.get(timeout=max(0.0, commit_time - time.monotonic()))
+                except queue.Empty:
+                    break
+
+                if item is self.STOP:
+                    stopped = True
+                    break
+
+                batch.append(item)
+
+            if batch:
+                self.write(db, batch)
+
+        db.close()
+        logging.info("Tick writer stopped")
+
+    def write(self, db, batch):
+        rows = {}
+        for tick_time, ticks in batch:
+            ts = tick_time.strftime("%Y-%m-%d %H:%M:%S")
+            for tick in ticks:
+                symbol = self.instruments_helper.get_symbol_from_instrument_token(tick['instrument_token'])
+                rows.setdefault(symbol, []).append((ts, tick['last_price'], tick['last_quantity']))
+
+        for symbol, symbol_rows in rows.items():
+            try:
+                db.executemany("INSERT OR REPLACE INTO {} (ts,current_price,volume) VALUES (?,?,?)".format(symbol),
+                               symbol_rows)
+            except Exception:
+                logging.error("Exception while inserting ticks of {}: {}".format(symbol, traceback.format_exc()))
+
+        try:
+            db.commit()
+        except Exception:
+            logging.error("Exception while committing ticks: " + traceback.format_exc())
+            db.rollback()
@@ -1,18 +1,22 @@
-import datetime
 import logging
 import sqlite3
-import traceback
 
 import pandas as pd
 
 from trading.constants import TICKS_DB_PATH
+from trading.data.live.BarBuilder import bar_builder
 from trading.zerodha.kite.Period import Period
 from trading.zerodha.kite.Retry import retry
 
 
 class TicksDataManager:
+    """
+    Gets candles of live ticks. Bars built in memory by the bar builder are used when they are available. Otherwise
+    candles are built from the ticks stored in the ticks db
+    """
+
     def __init__(self, **kwargs):
-        self.db = sqlite3.connect(TICKS_DB_PATH)
+        self.db = None
         self.instruments_helper = kwargs['instruments_helper']
 
         if 'period' in kwargs and 'candle_interval' in kwargs:
@@ -22,27 +26,13 @@ class TicksDataManager:
             if self.period == Period.MIN:
                 self.resample_time = str(self.candle_interval) + 'Min'
 
-    def insert_ticks(self, ticks):
-        c = self.db.cursor()
-        for tick in ticks:
-            try:
-                tok = self.instruments_helper.get_symbol_from_instrument_token(tick['instrument_token'])
-                vals = [datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), tick['last_price'], tick['last_quantity']]
-                query = "INSERT OR REPLACE INTO {} (ts,current_price,volume) VALUES (?,?,?)".format(tok)
-                c.execute(query, vals)
-            except:
-                logging.error("Exception while inserting ticks: " + traceback.format_exc())
-                pass
-        try:
-            self.db.commit()
-        except Exception as e:
-            print("Exception while committing ticks: " + traceback.format_exc())
-            self.db.rollback()
-
     @retry(tries=5, delay=0.02, backoff=2)
     def get_ticks(self, symbol, start_time, end_time):
         logging.debug("Fetching ticks data from ticks db for {} from {} till {}".format(symbol, start_time, end_time))
 
+        if self.db is None:
+            self.db = sqlite3.connect(TICKS_DB_PATH)
+
         query = "SELECT * FROM {} where ts >= '{}' and ts < '{}'".format(symbol, start_time, end_time)
         # query = "SELECT * FROM {} ORDER BY ts DESC LIMIT 2000".format(symbol)
         data = pd.read_sql_query(query, self.db)
@@ -62,6 +52,10 @@ class TicksDataManager:
         return resampled_df
 
     def get_data(self, symbol, start, end):
+        df = bar_builder.get_data(symbol, self.candle_interval, start, end)
+        if df is not None:
+            return df
+
         ticks_df = self.get_ticks(symbol, start, end)
 
         return self.resample_data(ticks_df)
@@ -70,4 +64,5 @@ class TicksDataManager:
         pass
 
     def close(self):
-        self.db.close()
+        if self.db is not None:
+            self.db.close()
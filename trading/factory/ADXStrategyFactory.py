@@ -1,6 +1,7 @@
-from trading.constants import BACK_TEST, SETUP, ADX_STRATEGY
+from trading.constants import BACK_TEST, SETUP, ADX_STRATEGY, LIVE_TRIGGER, BAR_CLOSE_TRIGGER
 from trading.strategies.ADXStrategy import ADXStrategy
 from trading.workers.BackTestStrategyRunner import BackTestStrategyRunner
+from trading.workers.BarCloseStrategyRunner import BarCloseStrategyRunner
 from trading.workers.LiveStrategyRunner import LiveStrategyRunner
 
 
@@ -41,5 +42,7 @@ class ADXStrategyFactory:
     def get_strategy_runner(self, strategy):
         if self.mode == BACK_TEST or self.mode == SETUP:
             return BackTestStrategyRunner(self.kite, strategy)
+        elif LIVE_TRIGGER == BAR_CLOSE_TRIGGER:
+            return BarCloseStrategyRunner(self.kite, strategy)
         else:
             return LiveStrategyRunner(self.kite, strategy)
@@ -1,7 +1,8 @@
-from trading.constants import BACK_TEST, SETUP, ADAPTIVE_SAR_STRATEGY
+from trading.constants import BACK_TEST, SETUP, ADAPTIVE_SAR_STRATEGY, LIVE_TRIGGER, BAR_CLOSE_TRIGGER
 from trading.screener.PreviousDayMaxMover import PreviousDayMaxMover
 from trading.strategies.AdaptiveSARStrategy import AdaptiveSARStrategy
 from trading.workers.BackTestStrategyRunner import BackTestStrategyRunner
+from trading.workers.BarCloseStrategyRunner import BarCloseStrategyRunner
 from trading.workers.LiveStrategyRunner import LiveStrategyRunner
 
 
@@ -42,5 +43,7 @@ class AdaptiveSARStrategyFactory:
     def get_strategy_runner(self, strategy):
         if self.mode == BACK_TEST or self.mode == SETUP:
             return BackTestStrategyRunner(self.kite, strategy)
+        elif LIVE_TRIGGER == BAR_CLOSE_TRIGGER:
+            return BarCloseStrategyRunner(self.kite, strategy)
         else:
             return LiveStrategyRunner(self.kite, strategy)
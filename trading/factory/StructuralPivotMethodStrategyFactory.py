@@ -1,8 +1,9 @@
-from trading.constants import PARABOLIC_SAR, BACK_TEST, SETUP
+from trading.constants import PARABOLIC_SAR, BACK_TEST, SETUP, LIVE_TRIGGER, BAR_CLOSE_TRIGGER
 from trading.screener.PreviousDayMaxMover import PreviousDayMaxMover
 from trading.strategies.ParabolicSARStrategy import ParabolicSARStrategy
 from trading.strategies.StructuralPivotMethodStrategy import StructuralPivotMethodStrategy
 from trading.workers.BackTestStrategyRunner import BackTestStrategyRunner
+from trading.workers.BarCloseStrategyRunner import BarCloseStrategyRunner
 from trading.workers.LiveStrategyRunner import LiveStrategyRunner
 
 
@@ -47,5 +48,7 @@ class StructuralPivotMethodStrategyFactory:
     def get_strategy_runner(self, strategy):
         if self.mode == BACK_TEST or self.mode == SETUP:
             return BackTestStrategyRunner(self.kite, strategy)
+        elif LIVE_TRIGGER == BAR_CLOSE_TRIGGER:
+            return BarCloseStrategyRunner(self.kite, strategy)
         else:
             return LiveStrategyRunner(self.kite, strategy)
@@ -4,9 +4,11 @@ import traceback
 import pandas as pd
 from sqlalchemy import create_engine
 
-from trading.constants import SUPER_TREND_STRATEGY_7_3, SCREENER_DB_PATH, BACK_TEST, SETUP, EXCHANGE, LIVE
+from trading.constants import SUPER_TREND_STRATEGY_7_3, SCREENER_DB_PATH, BACK_TEST, SETUP, EXCHANGE, LIVE, \
+    LIVE_TRIGGER, BAR_CLOSE_TRIGGER
 from trading.strategies.SuperTrend73Strategy import SuperTrend73Strategy
 from trading.workers.BackTestStrategyRunner import BackTestStrategyRunner
+from trading.workers.BarCloseStrategyRunner import BarCloseStrategyRunner
 from trading.workers.LiveStrategyRunner import LiveStrategyRunner
 from trading.zerodha.kite.BackTestOrders import BackTestOrders
 from trading.zerodha.kite.Orders import Orders
@@ -70,5 +72,7 @@ class SuperTrendStrategyFactory:
     def get_strategy_runner(self, strategy):
         if self.mode == BACK_TEST or self.mode == SETUP:
             return BackTestStrategyRunner(self.kite, strategy)
+        elif LIVE_TRIGGER == BAR_CLOSE_TRIGGER:
+            return BarCloseStrategyRunner(self.kite, strategy)
         else:
             return LiveStrategyRunner(self.kite, strategy)
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import sys
+import threading
+import types
+
+# Modules holding the strategies and their factories. Only the modules of the classes being versioned are followed, so
+# changing one strategy does not change the version of the others
+STRATEGY_PACKAGES = ("trading.factory.", "trading.strategies.")
+STRATEGY_BASE_MODULE = "trading.strategies.Strategy"
+
+# Modules whose values (i.e capacities and intervals) have no module of their own, so they are always versioned
+SHARED_MODULES = ["trading.constants"]
+
+
+class CodeVersionHelper:
+    """
+    Versions of the code that classes (or functions) run, so that results calculated by older code are not reused
+    (see get_cell_key in BackTestMain and Indicator.get_recorded_lines_key).
+    Source files do not change while the process runs, so versions are calculated once
+    """
+
+    def __init__(self):
+        # Names of the classes to the version of the code they run
+        self.code_versions = {}
+        self.lock = threading.Lock()
+
+    def get_code_version(self, classes):
+        """
+        Version of the code the classes run. It is a hash of the source of their modules, of trading.constants and of
+        every module of the trading package that those modules refer to, directly or not. Other strategies and the
+        factories are not followed, so they do not change it
+        :param classes: a list of classes or functions
+        :return: hex digest
+        """
+        names = tuple(sorted(cls.__module__ + "." + cls.__name__ for cls in classes))
+
+        with self.lock:
+            if names not in self.code_versions:
+                self.code_versions[names] = self.calculate_code_version([cls.__module__ for cls in classes])
+
+            return self.code_versions[names]
+
+    @staticmethod
+    def calculate_code_version(module_names):
+        modules = {}
+        roots = set(module_names)
+        pending = list(module_names) + SHARED_MODULES
+
+        while pending:
+            module_name = pending.pop()
+            if module_name in modules or module_name not in sys.modules:
+                continue
+
+            if module_name not in roots and module_name != STRATEGY_BASE_MODULE and \
+                    module_name.startswith(STRATEGY_PACKAGES):
+                continue
+
+            module = sys.modules[module_name]
+            modules[module_name] = module
+
+            for value in vars(module).values():
+                name = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, '__module__', None)
+                if isinstance(name, str) and name.split(".")[0] == "trading":
+                    pending.append(name)
+
+        digest = hashlib.sha1()
+        for module_name in sorted(modules):
+            path = getattr(modules[module_name], '__file__', None)
+            if path is not None and os.path.exists(path):
+                digest.update(module_name.encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+
+        return digest.hexdigest()
+
+
+# Shared by everything in the process
+code_version_helper = CodeVersionHelper()
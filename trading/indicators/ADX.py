@@ -1,6 +1,11 @@
+import math
+
+import numpy as np
 import pandas as pd
 
 from trading.indicators.Indicator import Indicator
+from trading.indicators.kernels.ADXKernel import ADXKernel
+from trading.lines.SessionLines import SessionLines
 
 
 class ADX(Indicator):
@@ -51,3 +56,69 @@ class ADX(Indicator):
         df.index.names = ['ts']
 
         self.store_indicator_value(df.tail(1), candle_time)
+
+    def prime_kernel(self, candle_time):
+        if self.kernel is None:
+            self.kernel = ADXKernel(self.candle_length)
+
+        self.kernel.seed(self.values.get_last_value(self.indicator_name))
+
+    def stream_lines(self, candle_time):
+        dx_row = self.dx.get_last_line(candle_time)
+
+        row = {
+            'open': dx_row['open'],
+            'high': dx_row['high'],
+            'low': dx_row['low'],
+            'close': dx_row['close'],
+            'volume': dx_row['volume'],
+            'PLUSDI_14': dx_row['PLUSDI_14'],
+            'MINUSDI_14': dx_row['MINUSDI_14'],
+            self.dx.indicator_name: dx_row[self.dx.indicator_name],
+            self.indicator_name: self.kernel.update(dx_row[self.dx.indicator_name])
+        }
+
+        self.store_indicator_line(row, candle_time)
+
+    def calculate_session_lines(self, opening_time):
+        dx_lines = self.dx.get_session_lines()
+        if dx_lines is None:
+            return None
+
+        n = self.candle_length
+        dx_exists = dx_lines.exists.tolist()
+        dx = dx_lines.get_column(self.dx.indicator_name).tolist()
+
+        exists = [False] * len(dx_lines)
+        adx = [np.nan] * len(dx_lines)
+        kernel = ADXKernel(n)
+
+        lines = SessionLines.like(dx_lines)
+        for name in ['open', 'high', 'low', 'close', 'volume']:
+            lines.add_column(name, dx_lines.get_column(name).copy())
+
+        for i in range(dx_lines.first_session_slot, len(dx_lines)):
+            if not dx_exists[i]:
+                continue
+
+            if exists[i - 1]:
+                adx[i] = kernel.update(dx[i])
+            elif i + 1 >= n and all(dx_exists[i - n + 1:i + 1]):
+                # Simple average of the first n DX values. The very first value does not carry the candle
+                adx[i] = math.fsum(dx[i - n + 1:i + 1]) / n
+                kernel.seed(adx[i])
+
+                for name in ['open', 'high', 'low', 'close', 'volume']:
+                    lines.get_column(name)[i] = np.nan
+            else:
+                continue
+
+            exists[i] = True
+
+        lines.add_column('PLUSDI_14', dx_lines.get_column('PLUSDI_14'))
+        lines.add_column('MINUSDI_14', dx_lines.get_column('MINUSDI_14'))
+        lines.add_column(self.dx.indicator_name, dx_lines.get_column(self.dx.indicator_name))
+        lines.add_column(self.indicator_name, np.array(adx))
+        lines.exists[:] = exists
+
+        return lines
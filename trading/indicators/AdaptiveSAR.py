@@ -1,4 +1,8 @@
+import numpy as np
+
 from trading.indicators.Indicator import Indicator
+from trading.indicators.kernels.AdaptiveSARKernel import AdaptiveSARKernel
+from trading.lines.SessionLines import SessionLines
 
 
 class AdaptiveSAR(Indicator):
@@ -101,3 +105,65 @@ class AdaptiveSAR(Indicator):
             df['color'] = "red"
 
         return df
+
+    def prime_kernel(self, candle_time):
+        if self.kernel is None:
+            self.kernel = AdaptiveSARKernel(self.arc)
+
+        row = self.values.get_last_row()
+        self.kernel.seed(row['SIC'], row[self.indicator_name], row['color'])
+
+    def stream_lines(self, candle_time):
+        row = self.average_true_range.get_last_line(candle_time)
+
+        sic, sar, color = self.kernel.update(row['close'], row[self.atr_name])
+
+        row['SIC'] = sic
+        row[self.indicator_name] = sar
+        row['color'] = color
+
+        self.store_indicator_line(row, candle_time)
+
+    def calculate_session_lines(self, opening_time):
+        atr_lines = self.average_true_range.get_session_lines()
+        if atr_lines is None:
+            return None
+
+        atr_exists = atr_lines.exists.tolist()
+        close = atr_lines.get_column('close').tolist()
+        atr = atr_lines.get_column(self.atr_name).tolist()
+
+        names = ['SIC', self.indicator_name, 'color']
+        values = [[np.nan] * len(atr_lines) for _ in names]
+        exists = [False] * len(atr_lines)
+        kernel = AdaptiveSARKernel(self.arc)
+
+        for i in range(max(atr_lines.first_session_slot, 1), len(atr_lines)):
+            if not atr_exists[i]:
+                continue
+
+            if exists[i - 1]:
+                row = kernel.update(close[i], atr[i])
+            elif atr_exists[i - 1]:
+                # The starting value is a guess
+                if close[i - 1] < close[i]:
+                    row = (close[i], close[i] - (atr[i] * self.arc), "green")
+                else:
+                    row = (close[i], close[i] + (atr[i] * self.arc), "red")
+                kernel.seed(*row)
+            else:
+                continue
+
+            for j in range(len(names)):
+                values[j][i] = row[j]
+            exists[i] = True
+
+        lines = SessionLines.like(atr_lines)
+        for name in ['open', 'high', 'low', 'close', 'volume', self.atr_name]:
+            lines.add_column(name, atr_lines.get_column(name))
+        lines.add_column('SIC', np.array(values[0]))
+        lines.add_column(self.indicator_name, np.array(values[1]))
+        lines.add_column('color', np.array(values[2], dtype=object))
+        lines.exists[:] = exists
+
+        return lines
@@ -1,6 +1,11 @@
+import math
+
+import numpy as np
 import pandas as pd
 
 from trading.indicators.Indicator import Indicator
+from trading.indicators.kernels.AverageTrueRangeKernel import AverageTrueRangeKernel
+from trading.lines.SessionLines import SessionLines
 
 
 class AverageTrueRange(Indicator):
@@ -49,3 +54,58 @@ class AverageTrueRange(Indicator):
 
         self.store_indicator_value(df.tail(1), candle_time)
 
+    def prime_kernel(self, candle_time):
+        if self.kernel is None:
+            self.kernel = AverageTrueRangeKernel(self.candle_length)
+
+        self.kernel.seed(self.values.get_last_value(self.indicator_name))
+
+    def stream_lines(self, candle_time):
+        tr_row = self.true_range.get_last_line(candle_time)
+
+        row = {
+            'open': tr_row['open'],
+            'high': tr_row['high'],
+            'low': tr_row['low'],
+            'close': tr_row['close'],
+            'volume': tr_row['volume'],
+            self.indicator_name: self.kernel.update(tr_row[self.true_range.indicator_name])
+        }
+
+        self.store_indicator_line(row, candle_time)
+
+    def calculate_session_lines(self, opening_time):
+        tr_lines = self.true_range.get_session_lines()
+        if tr_lines is None:
+            return None
+
+        n = self.candle_length
+        tr_exists = tr_lines.exists.tolist()
+        true_range = tr_lines.get_column(self.true_range.indicator_name).tolist()
+
+        exists = [False] * len(tr_lines)
+        atr = [np.nan] * len(tr_lines)
+        kernel = AverageTrueRangeKernel(n)
+
+        for i in range(tr_lines.first_session_slot, len(tr_lines)):
+            if not tr_exists[i]:
+                continue
+
+            if exists[i - 1]:
+                atr[i] = kernel.update(true_range[i])
+            elif i + 1 >= n and all(tr_exists[i - n + 1:i + 1]):
+                # Simple average of the first n true ranges
+                atr[i] = math.fsum(true_range[i - n + 1:i + 1]) / n
+                kernel.seed(atr[i])
+            else:
+                continue
+
+            exists[i] = True
+
+        lines = SessionLines.like(tr_lines)
+        for name in ['open', 'high', 'low', 'close', 'volume']:
+            lines.add_column(name, tr_lines.get_column(name))
+        lines.add_column(self.indicator_name, np.array(atr))
+        lines.exists[:] = exists
+
+        return lines
@@ -1,4 +1,8 @@
+import numpy as np
+
 from trading.indicators.Indicator import Indicator
+from trading.indicators.kernels.DXKernel import DXKernel
+from trading.lines.SessionLines import SessionLines
 
 
 class DX(Indicator):
@@ -89,3 +93,92 @@ class DX(Indicator):
         df.loc[ind[i], 'MINUSDM_14'] = minus_dm_sum
 
         return df
+
+    def prime_kernel(self, candle_time):
+        if self.kernel is None:
+            self.kernel = DXKernel(self.candle_length)
+
+        row = self.values.get_last_row()
+        self.kernel.seed(row['high'], row['low'], row['TR_14'], row['PLUSDM_14'], row['MINUSDM_14'])
+
+    def stream_lines(self, candle_time):
+        row = self.true_range.get_last_line(candle_time)
+
+        lines = self.kernel.update(row['high'], row['low'], row[self.true_range.indicator_name])
+        row.update(zip(['PLUSDM_1', 'MINUSDM_1', 'TR_14', 'PLUSDM_14', 'MINUSDM_14', 'PLUSDI_14', 'MINUSDI_14',
+                        'DI_DIFF', 'DI_SUM', self.indicator_name], lines))
+
+        self.store_indicator_line(row, candle_time)
+
+    def calculate_session_lines(self, opening_time):
+        tr_lines = self.true_range.get_session_lines()
+        if tr_lines is None:
+            return None
+
+        n = self.candle_length
+        tr_exists = tr_lines.exists.tolist()
+        high = tr_lines.get_column('high').tolist()
+        low = tr_lines.get_column('low').tolist()
+        true_range = tr_lines.get_column(self.true_range.indicator_name).tolist()
+
+        names = ['PLUSDM_1', 'MINUSDM_1', 'TR_14', 'PLUSDM_14', 'MINUSDM_14', 'PLUSDI_14', 'MINUSDI_14',
+                 'DI_DIFF', 'DI_SUM', self.indicator_name]
+        values = [[np.nan] * len(tr_lines) for _ in names]
+        exists = [False] * len(tr_lines)
+        kernel = DXKernel(n)
+
+        for i in range(tr_lines.first_session_slot, len(tr_lines)):
+            if not tr_exists[i]:
+                continue
+
+            if exists[i - 1]:
+                row = kernel.update(high[i], low[i], true_range[i])
+            elif i + 1 >= n and all(tr_exists[i - n + 1:i + 1]):
+                row = self.calculate_session_base_params(high, low, true_range, i - n + 1, i)
+                kernel.seed(high[i], low[i], row[2], row[3], row[4])
+            else:
+                continue
+
+            for j in range(len(names)):
+                values[j][i] = row[j]
+            exists[i] = True
+
+        lines = SessionLines.like(tr_lines)
+        for name in ['open', 'high', 'low', 'close', 'volume']:
+            lines.add_column(name, tr_lines.get_column(name))
+        lines.add_column(self.true_range.indicator_name, tr_lines.get_column(self.true_range.indicator_name))
+        for j in range(len(names)):
+            lines.add_column(names[j], np.array(values[j]))
+        lines.exists[:] = exists
+
+        return lines
+
+    def calculate_session_base_params(self, high, low, true_range, first, last):
+        """
+        Same as calculate_base_params for the candles between first and last (both inclusive)
+        """
+        plus_dm = 0.0
+        minus_dm = 0.0
+        tr_sum = 0.0
+        plus_dm_sum = 0.0
+        minus_dm_sum = 0.0
+
+        for i in range(first + 1, last + 1):
+            high_diff = high[i] - high[i - 1]
+            low_diff = low[i - 1] - low[i]
+
+            if high_diff > 0 and high_diff > low_diff:
+                plus_dm = high_diff
+                minus_dm = 0.0
+                plus_dm_sum = plus_dm_sum + high_diff
+            elif low_diff > 0 and low_diff > high_diff:
+                plus_dm = 0.0
+                minus_dm = low_diff
+                minus_dm_sum = minus_dm_sum + low_diff
+            else:
+                plus_dm = 0.0
+                minus_dm = 0.0
+
+            tr_sum = tr_sum + true_range[i]
+
+        return plus_dm, minus_dm, tr_sum, plus_dm_sum, minus_dm_sum, 0.0, 0.0, 0.0, 0.0, 0.0
@@ -1,12 +1,22 @@
+import datetime
+import hashlib
 import logging
 from abc import ABC, abstractmethod
 
 import pandas as pd
 from sqlalchemy import create_engine
 
+from trading.constants import INDICATOR_STORE_CAPACITY, BACK_TEST
+from trading.data.CandleCache import candle_cache
 from trading.data.DataManagerFactory import DataManagerFactory
 from trading.errors.DataNotAvailableError import DataNotAvailableError
-from trading.zerodha.kite.TimeSequencer import get_previous_time, get_time_sequence, get_allowed_time_slots
+from trading.helpers.CodeVersionHelper import code_version_helper
+from trading.lines.LineStore import LineStore
+from trading.lines.RecordedLinesStore import recorded_lines_store
+from trading.lines.SessionLines import SessionLines
+from trading.lines.SessionLinesCache import session_lines_cache
+from trading.zerodha.kite.TimeSequencer import get_previous_time, get_time_sequence, get_allowed_time_slots, \
+    get_time_delta, is_allowed_time, to_epoch_minute, to_epoch_minutes, from_epoch_minutes, get_n_previous_trading_days
 
 
 class Indicator(ABC):
@@ -30,8 +40,11 @@ class Indicator(ABC):
                                  + "_" + str(self.period.name) + ".db"
         self.indicator_table_name = self.symbol + "_" + self.indicator_name
 
-        # Historical dataframe
-        if kwargs['stateless'] is True:
+        # Maximum number of indicator values held in memory
+        self.capacity = kwargs.get('capacity', INDICATOR_STORE_CAPACITY)
+
+        # Historical values
+        if kwargs.get('stateless', False) is True:
             self.values = self.load_indicator_values(True)
         else:
             self.values = self.load_indicator_values(False)
@@ -40,17 +53,309 @@ class Indicator(ABC):
         # This depends on the candle interval. i.e 1 min, 2 min, etc
         self.allowed_time_slots = get_allowed_time_slots(self.period, self.candle_interval)
 
+        # Indicators that support streaming carry their state in a kernel which is primed by do_calculate_lines
+        # When streaming is switched off, do_calculate_lines is used for every candle
+        self.streaming = kwargs.get('streaming', True)
+        self.kernel = None
+
+        # When the whole session's data is available upfront (i.e back tests), indicators that support it
+        # precompute their lines for the session in one pass. See prepare_session
+        self.batch = kwargs.get('batch', True)
+        self.session_lines = None
+
+        # Session lines can be shared with other strategies whose indicators have the same inputs. See get_session_key
+        self.share_session_lines = kwargs.get('share_session_lines', False)
+
+        # Session lines can be recorded the first time they are calculated and replayed by later back tests, so only
+        # the strategy's rules run again. See prepare_session
+        self.record_lines = kwargs.get('record_lines', False)
+        self.recording = None
+
     def calculate_lines(self, candle_time):
         # Indicators can run only on pre-determined time slots based on the candle interval and period
-        if not candle_time.strftime('%H:%M') in self.allowed_time_slots:
+        if not is_allowed_time(self.period, self.candle_interval, candle_time):
+            return
+
+        self.update_lines(candle_time)
+
+        if self.recording is not None:
+            self.record_row(candle_time)
+
+    def update_lines(self, candle_time):
+        """
+        Replays, streams or calculates the indicator value for the candle time, whichever is the cheapest
+        """
+        if self.session_lines is not None and self.replay_session_lines(candle_time):
+            return
+
+        if self.kernel is not None and self.kernel.is_primed() and self.is_in_sync(candle_time):
+            self.stream_lines(candle_time)
             return
 
         self.do_calculate_lines(candle_time)
 
+        if self.streaming:
+            self.prime_kernel(candle_time)
+
     @abstractmethod
     def do_calculate_lines(self, candle_time):
+        """
+        Calculates the indicator value for the candle time from the (dataframe based) previous values
+        This is the reference implementation. Streaming kernels are expected to match it
+        """
         pass
 
+    def prime_kernel(self, candle_time):
+        """
+        Seeds the streaming kernel with the most recent indicator value
+        Called every time do_calculate_lines succeeds. Indicators without a kernel do nothing
+        """
+        pass
+
+    def stream_lines(self, candle_time):
+        """
+        Calculates the indicator value for the candle time using the kernel in constant time
+        """
+        raise NotImplementedError("Indicator {} does not support streaming".format(self.indicator_name))
+
+    def prepare_session(self, opening_time):
+        """
+        Precomputes the indicator lines for the whole trading session in one pass
+        calculate_lines then simply replays the precomputed value for the candle time. Hence the indicator never
+        sees a value before it would have been calculated minute by minute
+        Indicators that do not support it, or whose dependencies could not be prepared, stay minute by minute
+        :param opening_time: Opening time of the trading session
+        """
+        self.session_lines = None
+        self.recording = None
+
+        if self.record_lines and self.values.empty:
+            # Lines of an indicator that starts afresh depend only on its inputs. Replay them if they are recorded
+            key = self.get_recorded_lines_key(opening_time)
+            self.session_lines = session_lines_cache.get_lines(key, lambda: recorded_lines_store.get_lines(key))
+
+            if self.session_lines is not None:
+                return
+
+            self.recording = (key, self.get_session_slots(opening_time))
+
+        if not self.batch:
+            return
+
+        first_candle_time = opening_time.replace(hour=9, minute=15, second=0, microsecond=0) + \
+            get_time_delta(self.period, self.candle_interval)
+
+        if self.is_in_sync(first_candle_time):
+            # We are continuing from the previous session's values. Stay minute by minute
+            return
+
+        try:
+            if self.share_session_lines:
+                self.session_lines = session_lines_cache.get_lines(self.get_session_key(opening_time),
+                                                                   lambda: self.calculate_session_lines(opening_time))
+            else:
+                self.session_lines = self.calculate_session_lines(opening_time)
+        except DataNotAvailableError:
+            logging.warning("Session lines could not be prepared for indicator {}".format(self.indicator_name))
+            self.session_lines = None
+
+        if self.recording is not None and self.session_lines is not None:
+            # Precomputed lines are recorded as they are, so that other indicators can calculate theirs from them
+            recorded_lines_store.put_lines(self.recording[0], self.session_lines)
+            self.recording = None
+
+    def get_session_key(self, opening_time):
+        """
+        Everything the session lines of the indicator depend on. Indicators depend on the ones before them in the
+        strategy, so their names, candle intervals and parameters are part of the key too
+        :param opening_time: Opening time of the trading session
+        """
+        indicators = []
+        for ind in self.strategy.get_indicators():
+            indicators.append((ind.indicator_name, ind.candle_interval, ind.get_parameters()))
+
+            if ind is self:
+                break
+
+        return self.symbol, self.period, self.candle_length, opening_time.date(), tuple(indicators)
+
+    def get_session_lines(self):
+        """
+        :return: session lines other indicators can calculate their session lines from. None if the lines are not
+        precomputed or can only be replayed
+        """
+        if self.session_lines is None or self.session_lines.replay_only:
+            return None
+
+        return self.session_lines
+
+    def get_recorded_lines_key(self, opening_time):
+        """
+        Content address of the session lines of the indicator. Besides the session key, it covers the code of the
+        indicators and the candles they read i.e of the session and the one before it
+        :param opening_time: Opening time of the trading session
+        :return: hex digest
+        """
+        indicators = {}
+        classes = []
+        for ind in self.strategy.get_indicators():
+            indicators.setdefault(ind.candle_interval, ind)
+            classes.append(ind.__class__)
+
+            if ind is self:
+                break
+
+        digest = hashlib.sha1(repr(self.get_session_key(opening_time)).encode())
+        digest.update(code_version_helper.get_code_version(classes).encode())
+
+        days = [t.date() for t in get_n_previous_trading_days(2, opening_time)]
+        for candle_interval in sorted(indicators):
+            ind = indicators[candle_interval]
+
+            for day in days:
+                digest.update(candle_cache.get_session_hash(ind.symbol, ind.period, candle_interval, day,
+                                                            ind.load_data).encode())
+
+        return digest.hexdigest()
+
+    def get_session_slots(self, opening_time):
+        """
+        :param opening_time: Opening time of the trading session
+        :return: SessionLines without any value, with a slot for every indicator value of the session
+        """
+        day = opening_time.date()
+
+        times = []
+        for slot in self.allowed_time_slots:
+            hour, minute = slot.split(':')
+            times.append(self.get_previous_indicator_time(
+                datetime.datetime.combine(day, datetime.time(int(hour), int(minute)))))
+
+        lines = SessionLines(times, 0)
+        lines.replay_only = True
+        return lines
+
+    def record_row(self, candle_time):
+        """
+        Records the indicator value calculated for the candle time, as it is at the time
+        """
+        key, lines = self.recording
+
+        expected_time = self.get_previous_indicator_time(candle_time)
+        position = lines.get_position(expected_time)
+
+        if position is None or self.values.get_last_key() != to_epoch_minute(expected_time):
+            # No value was calculated for the candle time
+            return
+
+        lines.set_row(position, self.get_recorded_row())
+
+    def get_recorded_row(self):
+        """
+        :return: the most recent indicator value as a dictionary of line name and value. See replay_row
+        """
+        return self.values.get_last_row()
+
+    def save_recorded_lines(self):
+        """
+        Stores the lines recorded during the session for the later back tests to replay
+        """
+        if self.recording is None:
+            return
+
+        key, lines = self.recording
+        self.recording = None
+
+        recorded_lines_store.put_lines(key, lines)
+
+    def get_parameters(self):
+        """
+        :return: a tuple of the parameters (other than the candle interval and length) the indicator lines depend on
+        """
+        return ()
+
+    def calculate_session_lines(self, opening_time):
+        """
+        Calculates the indicator lines for the whole trading session
+        It has to match what calculate_lines would produce minute by minute, including the candles for which
+        no value can be calculated
+        :param opening_time: Opening time of the trading session
+        :return: SessionLines or None if batch calculation is not supported
+        """
+        return None
+
+    def replay_session_lines(self, candle_time):
+        """
+        Stores the precomputed value for the candle time
+        :return: True if the candle time is part of the prepared session
+        """
+        position = self.session_lines.get_position(self.get_previous_indicator_time(candle_time))
+
+        if position is None:
+            return False
+
+        if self.session_lines.has_row(position):
+            self.replay_row(self.session_lines.times[position], self.session_lines.get_row(position))
+
+        return True
+
+    def replay_row(self, ts, row):
+        """
+        Stores a precomputed or recorded indicator value
+        :param ts: Candle time of the value
+        :param row: dictionary of line name and value
+        """
+        self.values.append(ts, row)
+
+    def get_session_candles(self, opening_time, lookback):
+        """
+        Gets all the candles of the trading session along with a few candles of the previous session
+        :param opening_time: Opening time of the trading session
+        :param lookback: How many candles of the previous session are needed
+        :return: SessionLines containing open, high, low, close and volume. Missing candles do not exist
+        """
+        delta = get_time_delta(self.period, self.candle_interval)
+        day = opening_time.date()
+
+        session_times = []
+        for slot in self.allowed_time_slots:
+            hour, minute = slot.split(':')
+            session_times.append(datetime.datetime.combine(day, datetime.time(int(hour), int(minute))) - delta)
+
+        previous_times = list(reversed(get_time_sequence(self.period, self.candle_interval, lookback,
+                                                         session_times[0])))
+
+        times = previous_times + session_times
+        candles = SessionLines(times, len(previous_times))
+
+        df = self.do_get_data(times[0], times[-1] + delta)
+
+        positions = []
+        rows = []
+        for i in range(len(df)):
+            position = candles.get_position(df.index[i])
+            if position is not None:
+                positions.append(position)
+                rows.append(i)
+
+        for name in ['open', 'high', 'low', 'close', 'volume']:
+            column = candles.add_column(name)
+            column[positions] = df[name].values[rows]
+
+        candles.exists[positions] = True
+
+        return candles
+
+    def is_in_sync(self, candle_time):
+        """
+        Checks if the most recent indicator value is the one just before the candle time. Same as the check done by
+        get_previous_indicator_value. When it is not, the kernel's state is stale
+        """
+        if self.values.empty:
+            return False
+
+        return self.values.get_last_key() == to_epoch_minute(self.get_n_candle_sequence(2, candle_time)[-1])
+
     def get_previous_indicator_time(self, candle_time):
         return get_previous_time(self.period, self.candle_interval, candle_time)
 
@@ -67,9 +372,8 @@ class Indicator(ABC):
         :return:
         """
         candle_sequence = self.get_n_candle_sequence(n, candle_time)
-        df = self.values.tail(n)
-        self.validate_candles(df, reversed(candle_sequence))
-        return df.copy()
+        self.validate_keys(self.values.get_keys(n), list(reversed(candle_sequence)))
+        return self.values.to_frame(n)
 
     def get_lines_unsafe(self, n):
         """
@@ -79,21 +383,56 @@ class Indicator(ABC):
         :param n: How many previous indicator values
         :return:
         """
-        df = self.values.tail(n)
-        return df.copy()
+        return self.values.to_frame(n)
 
     def get_all_values(self):
         """
         This method should be used when we simply want all of indicator values
-        :param n: How many previous indicator values
         :return:
         """
-        df = self.values
-        return df.copy()
+        return self.values.to_frame()
+
+    def is_empty(self):
+        return self.values.empty
+
+    def get_line(self, name, n=None):
+        """
+        Read only view of the most recent n values of a single line. No copies are made
+        :param name: Name of the line (i.e column)
+        :param n: How many previous indicator values. All the values if None
+        :return: numpy array which should not be modified
+        """
+        return self.values.get_column(name, n)
+
+    def get_last_line(self, candle_time):
+        """
+        Gets the most recent indicator value as a dictionary of line name and value
+        This is the cheaper equivalent of get_lines(1, candle_time) and is validated the same way
+        :param candle_time: Current candle time
+        :return: dictionary of line name and value
+        """
+        expected_time = self.get_previous_indicator_time(candle_time)
+
+        if self.values.empty or self.values.get_last_key() != to_epoch_minute(expected_time):
+            logging.debug("Expected candles: {} for indicator: {}".format([expected_time], self.indicator_name))
+            logging.debug("Actual candles: {} for indicator: {}".format([self.values.get_last_time()],
+                                                                        self.indicator_name))
+
+            raise DataNotAvailableError("Data not available")
+
+        return self.values.get_last_row()
 
     def store_indicator_value(self, df, candle_time):
         self.validate_candles_and_throw(df, [self.get_previous_indicator_time(candle_time)])
-        self.values = self.values.append(df)
+        self.values.append_frame(df)
+
+    def store_indicator_line(self, row, candle_time):
+        """
+        Stores a single indicator value calculated by the streaming kernel
+        :param row: dictionary of line name and value
+        :param candle_time: Current candle time
+        """
+        self.values.append(self.get_previous_indicator_time(candle_time), row)
 
     def get_data(self, candle_end_time):
         candle_sequence = self.get_candle_sequence(candle_end_time)
@@ -114,7 +453,21 @@ class Indicator(ABC):
 
         return df.copy()
 
+    def get_candle(self, candle_end_time):
+        """
+        Gets the candle that ends at candle_end_time as a dictionary of column and value
+        """
+        return self.get_data_for_time(candle_end_time).to_dict('records')[0]
+
     def do_get_data(self, start_time, end_time):
+        if self.mode == BACK_TEST:
+            # Historical candles do not change. Serve them from the shared cache
+            return candle_cache.get_data(self.symbol, self.period, self.candle_interval, start_time, end_time,
+                                         self.load_data)
+
+        return self.load_data(start_time, end_time)
+
+    def load_data(self, start_time, end_time):
         data_fetcher = DataManagerFactory(self.kite, self.mode).\
             get_object(period=self.period,
                        candle_interval=self.candle_interval,
@@ -148,9 +501,11 @@ class Indicator(ABC):
         which is when the market moves
         """
         engine = create_engine(f"sqlite:///" + self.indicator_db_path)
-        # For now pick the last 50 entries
-        df = self.values.tail(375)
+        # The store holds at most one trading session worth of values
+        df = self.values.to_frame()
         df.index = df.index.strftime('%Y-%m-%d %H:%M:%S')
+        # Values are read back by their epoch minutes. The string time is for humans
+        df['epoch_minute'] = self.values.get_keys()
         df.to_sql(self.indicator_table_name, engine, if_exists='replace', index=True)
         engine.dispose()
 
@@ -159,22 +514,27 @@ class Indicator(ABC):
         Load the indicator values that were stored when the program ended
         By doing this load, we quickly regain context and do not have to
         build indicators from first in the start of trading day
-        :return: dataframe containing the indicator values
+        :return: line store containing the indicator values
         """
         if stateless is True:
             # We do not want previous trading session's values
-            return pd.DataFrame()
+            return LineStore(self.capacity)
 
         engine = create_engine(f"sqlite:///" + self.indicator_db_path)
         try:
             cnx = engine.connect()
             df = pd.read_sql_table(self.indicator_table_name, cnx)
-            df = df.set_index('ts')
-            df.index = pd.to_datetime(df.index)
-            return df.copy()
+            if 'epoch_minute' in df.columns:
+                df = df.drop('ts', axis=1)
+                df.index = from_epoch_minutes(df.pop('epoch_minute'))
+            else:
+                # Stored before epoch minutes were recorded
+                df = df.set_index('ts')
+                df.index = pd.to_datetime(df.index)
+            return LineStore.from_frame(df, self.capacity)
         except ValueError:
             logging.warning("Table {} does not exist. Starting afresh".format(self.indicator_table_name))
-            return pd.DataFrame()
+            return LineStore(self.capacity)
         finally:
             engine.dispose()
 
@@ -189,31 +549,52 @@ class Indicator(ABC):
         if self.values.empty:
             return pd.DataFrame()
 
-        expected_time = str(self.get_n_candle_sequence(2, candle_time)[-1])
-        actual_time = str(self.values.tail(1).index[0])
+        expected_time = self.get_n_candle_sequence(2, candle_time)[-1]
 
-        if expected_time != actual_time:
+        if self.values.get_last_key() != to_epoch_minute(expected_time):
             logging.error("Database state is not in sync with program! Expected time: {}, Actual time {}".format(
-                expected_time, actual_time
+                expected_time, self.values.get_last_time()
             ))
             logging.info("Assuming a fresh run")
             return pd.DataFrame()
 
-        return self.values.tail(1)
+        return self.values.to_frame(1)
 
     def validate_candles(self, actual_candles_in, expected_candles):
-        actual_candles, expected_candles = self.get_actual_and_expected_candles(actual_candles_in, expected_candles)
+        self.validate_keys(to_epoch_minutes(actual_candles_in.index), list(expected_candles))
+
+    def validate_keys(self, actual_keys, expected_candles):
+        """
+        Candles are compared by their epoch minutes
+        :param actual_keys: numpy array of epoch minutes
+        :param expected_candles: list of candle times
+        """
+        if not self.is_aligned(actual_keys, expected_candles):
+            expected_candles = [str(i) for i in expected_candles]
+            actual_candles = [str(i) for i in from_epoch_minutes(actual_keys)]
 
-        if actual_candles != expected_candles:
             logging.debug("Expected candles: {} for indicator: {}".format(expected_candles, self.indicator_name))
             logging.debug("Actual candles: {} for indicator: {}".format(str(actual_candles), self.indicator_name))
 
             raise DataNotAvailableError("Data not available")
 
+    @staticmethod
+    def is_aligned(actual_keys, expected_candles):
+        if len(actual_keys) != len(expected_candles):
+            return False
+
+        for i in range(len(expected_candles)):
+            if actual_keys[i] != to_epoch_minute(expected_candles[i]):
+                return False
+
+        return True
+
     def validate_candles_and_throw(self, actual_candles_in, expected_candles):
-        actual_candles, expected_candles = self.get_actual_and_expected_candles(actual_candles_in, expected_candles)
+        expected_candles = list(expected_candles)
 
-        if actual_candles != expected_candles:
+        if not self.is_aligned(to_epoch_minutes(actual_candles_in.index), expected_candles):
+            actual_candles, expected_candles = self.get_actual_and_expected_candles(actual_candles_in,
+                                                                                    expected_candles)
             logging.info("Expected candles: {} for indicator: {}".format(expected_candles, self.indicator_name))
             logging.info("Actual candles: {} for indicator: {}".format(str(actual_candles), self.indicator_name))
 
@@ -1,12 +1,21 @@
+import numpy as np
+
 from trading.indicators.Indicator import Indicator
+from trading.indicators.kernels.ParabolicSARKernel import ParabolicSARKernel
+from trading.lines.SessionLines import SessionLines
 
 
 class ParabolicSAR(Indicator):
     def __init__(self, strategy, **kwargs):
         super().__init__(self.__class__.__name__, strategy, **kwargs)
 
-        self.af = 0.02
-        self.max_af = 0.20
+        # Acceleration factor starts at, and increases by, the step till it reaches the maximum
+        self.af_step = kwargs.get('af', 0.02)
+        self.max_af = kwargs.get('max_af', 0.20)
+        self.af = self.af_step
+
+    def get_parameters(self):
+        return self.af_step, self.max_af
 
     def do_calculate_lines(self, candle_time):
         sar_df = self.get_previous_indicator_value(candle_time)
@@ -38,7 +47,7 @@ class ParabolicSAR(Indicator):
             # If current high greater than SAR set for today, then we are going long
             if df['high'][i] > df[self.indicator_name][i - 1]:
                 # Reset acceleration factor
-                self.af = 0.02
+                self.af = self.af_step
 
                 df.loc[ind[i], 'EP'] = df['high'][i]
 
@@ -51,7 +60,7 @@ class ParabolicSAR(Indicator):
             # Find Extreme Price
             if df['low'][i] < df['EP'][i - 1]:
                 # If a new high was made, then the acceleration factor has to increase two fold
-                self.af = self.af + 0.02
+                self.af = self.af + self.af_step
 
                 # If the acceleration factor increases beyond a threshold, then limit it
                 if self.af > self.max_af:
@@ -79,7 +88,7 @@ class ParabolicSAR(Indicator):
             # If current low less than SAR set for today, then we are going short
             if df['low'][i] < df[self.indicator_name][i - 1]:
                 # Reset acceleration factor
-                self.af = 0.02
+                self.af = self.af_step
 
                 df.loc[ind[i], 'EP'] = df['low'][i]
 
@@ -92,7 +101,7 @@ class ParabolicSAR(Indicator):
             # Find Extreme Price
             if df['high'][i] > df['EP'][i - 1]:
                 # If a new high was made, then the acceleration factor has to increase two fold
-                self.af = self.af + 0.02
+                self.af = self.af + self.af_step
 
                 # If the acceleration factor increases beyond a threshold, then limit it
                 if self.af > self.max_af:
@@ -134,3 +143,83 @@ class ParabolicSAR(Indicator):
             df['AF'] = self.af
 
         return df
+
+    def prime_kernel(self, candle_time):
+        if self.kernel is None:
+            self.kernel = ParabolicSARKernel(self.af_step, self.max_af)
+
+        row = self.values.get_last_row()
+        self.kernel.seed(row[self.indicator_name], row['EP'], self.af, row['color'])
+
+    def stream_lines(self, candle_time):
+        row = self.get_candle(candle_time)
+
+        ep, sar, color, af = self.kernel.update(row['high'], row['low'])
+
+        # Keep the acceleration factor in sync for the reference implementation
+        self.af = af
+
+        row['EP'] = ep
+        row[self.indicator_name] = sar
+        row['color'] = color
+        row['AF'] = af
+
+        self.store_indicator_line(row, candle_time)
+
+    def calculate_session_lines(self, opening_time):
+        n = self.candle_length
+        candles = self.get_session_candles(opening_time, n)
+
+        candle_exists = candles.exists.tolist()
+        high = candles.get_column('high').tolist()
+        low = candles.get_column('low').tolist()
+
+        names = ['EP', self.indicator_name, 'color', 'AF']
+        values = [[np.nan] * len(candles) for _ in names]
+        exists = [False] * len(candles)
+        kernel = ParabolicSARKernel(self.af_step, self.max_af)
+
+        for i in range(candles.first_session_slot, len(candles)):
+            if not candle_exists[i]:
+                continue
+
+            if exists[i - 1]:
+                row = kernel.update(high[i], low[i])
+                self.af = kernel.af
+            elif i + 1 >= n and all(candle_exists[i - n + 1:i + 1]):
+                row = self.calculate_session_base_params(high, low, i - n + 1, i)
+                kernel.seed(row[1], row[0], self.af, row[2])
+            else:
+                continue
+
+            for j in range(len(names)):
+                values[j][i] = row[j]
+            exists[i] = True
+
+        lines = SessionLines.like(candles)
+        for name in ['open', 'high', 'low', 'close', 'volume']:
+            lines.add_column(name, candles.get_column(name))
+        lines.add_column('EP', np.array(values[0]))
+        lines.add_column(self.indicator_name, np.array(values[1]))
+        lines.add_column('color', np.array(values[2], dtype=object))
+        lines.add_column('AF', np.array(values[3]))
+        lines.exists[:] = exists
+
+        return lines
+
+    def calculate_session_base_params(self, high, low, first, last):
+        """
+        Same as calculate_base_params for the candles between first and last (both inclusive)
+        :return: a tuple of extreme price, SAR, color and acceleration factor of the last candle
+        """
+        # The starting value is a guess
+        if high[first] < high[first + 1]:
+            # We are in uptrend
+            ep = high[last]
+            psar = min(low[first], low[first + 1])
+            return ep, psar + (self.af * (ep - psar)), "green", self.af
+        else:
+            # We are in down trend
+            ep = low[last]
+            psar = max(high[first], high[first + 1])
+            return ep, psar - (self.af * (psar - ep)), "red", self.af
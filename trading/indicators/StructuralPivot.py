@@ -1,7 +1,19 @@
+import numpy as np
+import pandas as pd
+
 from trading.indicators.Indicator import Indicator
+from trading.indicators.kernels.StructuralPivotKernel import StructuralPivotKernel
+from trading.lines.PivotIndex import PivotIndex
 
 
 class StructuralPivot(Indicator):
+    # Column holding the price of every pivot type
+    PIVOT_PRICES = {'sph': 'high', 'spl': 'low'}
+
+    # Lines of a recorded value that tell which pivot was found with it. Pivots annotate older values, so they are
+    # replayed at the candle they were found at. See get_recorded_row
+    PIVOT_LINES = ['pivot_anchor', 'pivot_bar1', 'pivot_bar2']
+
     def __init__(self, strategy, **kwargs):
         super().__init__(self.__class__.__name__, strategy, **kwargs)
 
@@ -9,6 +21,13 @@ class StructuralPivot(Indicator):
         self.prev_small_pivot_idx = 0
         self.plt = None
 
+        # Pivots found so far. Lets strategies look up the most recent pivots without scanning the values
+        self.pivots = PivotIndex.from_frame(self.get_all_values(), self.PIVOT_PRICES)
+
+        # Epoch minute of the value the most recent pivot was found with, its type and the epoch minutes of its
+        # anchor, bar1 and bar2
+        self.found_pivot = None
+
     def do_calculate_lines(self, candle_time):
         ticks_df = self.get_data(candle_time)
         ticks_df['small_pivot_type'] = "na"
@@ -16,81 +35,169 @@ class StructuralPivot(Indicator):
         ticks_df['bar2'] = "na"
         self.store_indicator_value(ticks_df, candle_time)
 
-        if len(self.values) - self.prev_small_pivot_idx < 3:
+        # Pivot positions are remembered relative to the very first value. The store can drop its oldest values
+        # once it is full. Hence translate them to positions in the store
+        start = max(self.prev_small_pivot_idx - self.values.get_offset(), 0)
+
+        if len(self.values) - start < 3:
             # Enough candles to find a pivot has not formed yet
             return
 
-        df = self.values.copy()
-
         if self.prev_small_pivot == "na":
-            sp_df, sph_found, sph_index = self.calculate_small_pivot_high(df)
+            sph_found, sph_index = self.calculate_small_pivot_high(start)
 
             if not sph_found:
-                sp_df, spl_found, spl_index = self.calculate_small_pivot_low(df)
+                spl_found, spl_index = self.calculate_small_pivot_low(start)
         elif self.prev_small_pivot == "sph":
-            sp_df, sph_found, spl_index = self.calculate_small_pivot_low(df)
+            spl_found, spl_index = self.calculate_small_pivot_low(start)
         elif self.prev_small_pivot == "spl":
-            sp_df, spl_found, sph_index = self.calculate_small_pivot_high(df)
-        else:
-            sp_df = df
+            sph_found, sph_index = self.calculate_small_pivot_high(start)
 
-        self.values = sp_df.copy()
+    def calculate_small_pivot_high(self, start):
+        ind = self.values.get_index()
+        close = self.values.get_column('close')
+        low = self.values.get_column('low')
 
-    def calculate_small_pivot_high(self, df):
-        ind = df.index
+        for i in range(start, len(ind)):
+            anchor_close = close[i]
+            anchor_low = low[i]
 
-        for i in range(self.prev_small_pivot_idx, len(df)):
-            anchor_close = df['close'][i]
-            anchor_low = df['low'][i]
-
-            for j in range(i + 1, len(df)):
-                bar1_close = df['close'][j]
-                bar1_low = df['low'][j]
+            for j in range(i + 1, len(ind)):
+                bar1_close = close[j]
+                bar1_low = low[j]
 
                 # Do not look for candles where bar1 itself does not meet the criteria
                 if bar1_close < anchor_close and bar1_low < anchor_low:
-                    for k in range(j + 1, len(df)):
-                        bar2_close = df['close'][k]
-                        bar2_low = df['low'][k]
+                    for k in range(j + 1, len(ind)):
+                        bar2_close = close[k]
+                        bar2_low = low[k]
 
                         if bar2_close < anchor_close and bar2_low < anchor_low:
                             # We have found a pivot
-                            df.loc[ind[i], 'small_pivot_type'] = "sph"
-                            self.prev_small_pivot = "sph"
-                            df.loc[ind[i], 'bar1'] = str(ind[j])
-                            df.loc[ind[i], 'bar2'] = str(ind[k])
-                            self.prev_small_pivot_idx = k
-                            return df, True, i
+                            self.record_pivot("sph", i, j, k)
+                            return True, i
 
-        return df, False, -1
+        return False, -1
 
-    def calculate_small_pivot_low(self, df):
-        ind = df.index
+    def calculate_small_pivot_low(self, start):
+        ind = self.values.get_index()
+        close = self.values.get_column('close')
+        high = self.values.get_column('high')
 
-        for i in range(self.prev_small_pivot_idx, len(df)):
-            anchor_close = df['close'][i]
-            anchor_high = df['high'][i]
+        for i in range(start, len(ind)):
+            anchor_close = close[i]
+            anchor_high = high[i]
 
-            for j in range(i + 1, len(df)):
-                bar1_close = df['close'][j]
-                bar1_high = df['high'][j]
+            for j in range(i + 1, len(ind)):
+                bar1_close = close[j]
+                bar1_high = high[j]
 
                 # Do not look for candles where bar1 itself does not meet the criteria
                 if bar1_close > anchor_close and bar1_high > anchor_high:
-                    for k in range(j + 1, len(df)):
-                        bar2_close = df['close'][k]
-                        bar2_high = df['high'][k]
+                    for k in range(j + 1, len(ind)):
+                        bar2_close = close[k]
+                        bar2_high = high[k]
 
                         if bar2_close > anchor_close and bar2_high > anchor_high:
                             # We have found a pivot
-                            df.loc[ind[i], 'small_pivot_type'] = "spl"
-                            df.loc[ind[i], 'bar1'] = str(ind[j])
-                            df.loc[ind[i], 'bar2'] = str(ind[k])
-                            self.prev_small_pivot = "spl"
-                            self.prev_small_pivot_idx = k
-                            return df, True, i
-
-        return df, False, -1
+                            self.record_pivot("spl", i, j, k)
+                            return True, i
+
+        return False, -1
+
+    def prime_kernel(self, candle_time):
+        if self.kernel is None:
+            self.kernel = StructuralPivotKernel()
+
+        self.kernel.seed(self.prev_small_pivot)
+
+        # Replay the candles after the previous pivot to collect the anchors
+        offset = self.values.get_offset()
+        start = max(self.prev_small_pivot_idx - offset, 0)
+
+        high = self.values.get_column('high')
+        low = self.values.get_column('low')
+        close = self.values.get_column('close')
+
+        for i in range(start, len(self.values)):
+            if self.kernel.update(offset + i, high[i], low[i], close[i]) is not None:
+                # More than one pivot was pending. Let do_calculate_lines find them one at a time
+                self.kernel.reset()
+                return
+
+    def stream_lines(self, candle_time):
+        first_anchor = self.kernel.get_first_anchor()
+        if len(self.values) == self.capacity and first_anchor is not None and \
+                first_anchor <= self.values.get_offset():
+            # The oldest anchor is about to be dropped from the store. Start over from what is left
+            self.do_calculate_lines(candle_time)
+            self.prime_kernel(candle_time)
+            return
+
+        ticks_df = self.get_data(candle_time)
+        ticks_df['small_pivot_type'] = "na"
+        ticks_df['bar1'] = "na"
+        ticks_df['bar2'] = "na"
+        self.store_indicator_value(ticks_df, candle_time)
+
+        offset = self.values.get_offset()
+        pivot = self.kernel.update(offset + len(self.values) - 1, self.values.get_last_value('high'),
+                                   self.values.get_last_value('low'), self.values.get_last_value('close'))
+        if pivot is None:
+            return
+
+        pivot_type, anchor, bar1, bar2 = pivot
+        self.record_pivot(pivot_type, anchor - offset, bar1 - offset, bar2 - offset)
+
+    def record_pivot(self, pivot_type, anchor, bar1, bar2):
+        """
+        Annotates the anchor candle with the pivot and publishes it to the pivot index
+        :param pivot_type: sph or spl
+        :param anchor: Position of the anchor in the store
+        :param bar1: Position of bar1 in the store
+        :param bar2: Position of bar2 in the store
+        """
+        ind = self.values.get_index()
+
+        self.values.set_value(anchor, 'small_pivot_type', pivot_type)
+        self.values.set_value(anchor, 'bar1', str(pd.Timestamp(ind[bar1])))
+        self.values.set_value(anchor, 'bar2', str(pd.Timestamp(ind[bar2])))
+        self.prev_small_pivot = pivot_type
+        self.prev_small_pivot_idx = self.values.get_offset() + bar2
+
+        price = self.values.get_column(self.PIVOT_PRICES[pivot_type])[anchor]
+        self.pivots.append(pivot_type, price, ind[anchor])
+
+        keys = self.values.get_keys()
+        self.found_pivot = (self.values.get_last_key(), pivot_type, int(keys[anchor]), int(keys[bar1]),
+                            int(keys[bar2]))
+
+    def get_recorded_row(self):
+        row = super().get_recorded_row()
+
+        if self.found_pivot is not None and self.found_pivot[0] == self.values.get_last_key():
+            row['pivot_type'] = self.found_pivot[1]
+            row.update(zip(self.PIVOT_LINES, self.found_pivot[2:]))
+
+        return row
+
+    def replay_row(self, ts, row):
+        row = dict(row)
+        pivot_type = row.pop('pivot_type', np.nan)
+        pivot_keys = [row.pop(name, np.nan) for name in self.PIVOT_LINES]
+
+        super().replay_row(ts, row)
+
+        if isinstance(pivot_type, str):
+            anchor, bar1, bar2 = np.searchsorted(self.values.get_keys(), np.asarray(pivot_keys, dtype=np.int64))
+            self.record_pivot(pivot_type, int(anchor), int(bar1), int(bar2))
+
+    def get_last_pivot(self, pivot_type):
+        """
+        :param pivot_type: sph or spl
+        :return: a tuple of price and candle time of the most recent pivot of the type. (None, None) if there is none
+        """
+        return self.pivots.get_last(pivot_type)
 
     def plot(self):
         pass
@@ -1,4 +1,8 @@
+import numpy as np
+
 from trading.indicators.Indicator import Indicator
+from trading.indicators.kernels.SuperTrendKernel import SuperTrendKernel
+from trading.lines.SessionLines import SessionLines
 
 
 class SuperTrend(Indicator):
@@ -36,9 +40,63 @@ class SuperTrend(Indicator):
         df = df[['open', 'high', 'low', 'close', self.indicator_name, 'color']]
         self.store_indicator_value(df.tail(1), candle_time)
 
+    def prime_kernel(self, candle_time):
+        if self.kernel is None:
+            self.kernel = SuperTrendKernel()
+
+        # The kernel remembers the bands of the previous candle too
+        band_row = self.st_band.get_last_line(candle_time)
+        row = self.values.get_last_row()
+        self.kernel.seed(row['close'], band_row['UB'], band_row['LB'], row[self.indicator_name], row['color'])
+
+    def stream_lines(self, candle_time):
+        band_row = self.st_band.get_last_line(candle_time)
+
+        super_trend, color = self.kernel.update(band_row['close'], band_row['UB'], band_row['LB'])
+
+        row = {
+            'open': band_row['open'],
+            'high': band_row['high'],
+            'low': band_row['low'],
+            'close': band_row['close'],
+            self.indicator_name: super_trend,
+            'color': color
+        }
+
+        self.store_indicator_line(row, candle_time)
+
+    def calculate_session_lines(self, opening_time):
+        band_lines = self.st_band.get_session_lines()
+        if band_lines is None:
+            return None
+
+        band_exists = band_lines.exists.tolist()
+        close = band_lines.get_column('close').tolist()
+        upper_band = band_lines.get_column('UB').tolist()
+        lower_band = band_lines.get_column('LB').tolist()
 
+        super_trend = [np.nan] * len(band_lines)
+        color = [np.nan] * len(band_lines)
+        exists = [False] * len(band_lines)
+        kernel = SuperTrendKernel()
 
+        for i in range(max(band_lines.first_session_slot, 1), len(band_lines)):
+            # Bands of both the previous and the current candles are needed
+            if not (band_exists[i] and band_exists[i - 1]):
+                continue
 
+            if not exists[i - 1]:
+                # There is no previous super trend to start with
+                kernel.seed(close[i - 1], upper_band[i - 1], lower_band[i - 1], 0.0, "na")
 
+            super_trend[i], color[i] = kernel.update(close[i], upper_band[i], lower_band[i])
+            exists[i] = True
 
+        lines = SessionLines.like(band_lines)
+        for name in ['open', 'high', 'low', 'close']:
+            lines.add_column(name, band_lines.get_column(name))
+        lines.add_column(self.indicator_name, np.array(super_trend))
+        lines.add_column('color', np.array(color, dtype=object))
+        lines.exists[:] = exists
 
+        return lines
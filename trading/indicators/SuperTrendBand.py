@@ -1,4 +1,8 @@
+import numpy as np
+
 from trading.indicators.Indicator import Indicator
+from trading.indicators.kernels.SuperTrendBandKernel import SuperTrendBandKernel
+from trading.lines.SessionLines import SessionLines
 
 
 class SuperTrendBand(Indicator):
@@ -10,6 +14,9 @@ class SuperTrendBand(Indicator):
 
         super().__init__(self.__class__.__name__, strategy, **kwargs)
 
+    def get_parameters(self):
+        return self.multiplier,
+
     def do_calculate_lines(self, candle_time):
         st_band_df = self.get_previous_indicator_value(candle_time)
         if st_band_df.empty:
@@ -70,10 +77,70 @@ class SuperTrendBand(Indicator):
 
         return df
 
-
-
-
-
-
-
-
+    def prime_kernel(self, candle_time):
+        if self.kernel is None:
+            self.kernel = SuperTrendBandKernel(self.multiplier)
+
+        row = self.values.get_last_row()
+        self.kernel.seed(row['close'], row['UB'], row['LB'])
+
+    def stream_lines(self, candle_time):
+        atr_row = self.average_true_range.get_last_line(candle_time)
+
+        bu, bl, ub, lb = self.kernel.update(atr_row['high'], atr_row['low'], atr_row['close'], atr_row[self.atr_name])
+
+        row = {
+            'open': atr_row['open'],
+            'high': atr_row['high'],
+            'low': atr_row['low'],
+            'close': atr_row['close'],
+            'volume': atr_row['volume'],
+            'BU': bu,
+            'BL': bl,
+            'UB': ub,
+            'LB': lb
+        }
+
+        self.store_indicator_line(row, candle_time)
+
+    def calculate_session_lines(self, opening_time):
+        atr_lines = self.average_true_range.get_session_lines()
+        if atr_lines is None:
+            return None
+
+        atr_exists = atr_lines.exists.tolist()
+        high = atr_lines.get_column('high').tolist()
+        low = atr_lines.get_column('low').tolist()
+        close = atr_lines.get_column('close').tolist()
+        atr = atr_lines.get_column(self.atr_name).tolist()
+
+        names = ['BU', 'BL', 'UB', 'LB']
+        values = [[np.nan] * len(atr_lines) for _ in names]
+        exists = [False] * len(atr_lines)
+        kernel = SuperTrendBandKernel(self.multiplier)
+
+        for i in range(atr_lines.first_session_slot, len(atr_lines)):
+            if not atr_exists[i]:
+                continue
+
+            if exists[i - 1]:
+                row = kernel.update(high[i], low[i], close[i], atr[i])
+            else:
+                # Final bands start off as the basic bands
+                basic_upper_band = ((high[i] + low[i]) / 2) + (atr[i] * self.multiplier)
+                basic_lower_band = ((high[i] + low[i]) / 2) - (atr[i] * self.multiplier)
+                row = (basic_upper_band, basic_lower_band, basic_upper_band, basic_lower_band)
+                kernel.seed(close[i], basic_upper_band, basic_lower_band)
+
+            for j in range(len(names)):
+                values[j][i] = row[j]
+            exists[i] = True
+
+        lines = SessionLines.like(atr_lines)
+        for name in ['open', 'high', 'low', 'close', 'volume']:
+            lines.add_column(name, atr_lines.get_column(name))
+        for j in range(len(names)):
+            lines.add_column(names[j], np.array(values[j]))
+        lines.exists[:] = exists
+
+        return lines
@@ -1,4 +1,8 @@
+import numpy as np
+
 from trading.indicators.Indicator import Indicator
+from trading.indicators.kernels.TrueRangeKernel import TrueRangeKernel
+from trading.lines.SessionLines import SessionLines
 
 
 class TrueRange(Indicator):
@@ -37,3 +41,33 @@ class TrueRange(Indicator):
 
         self.store_indicator_value(df.tail(1), candle_time)
 
+    def prime_kernel(self, candle_time):
+        if self.kernel is None:
+            self.kernel = TrueRangeKernel()
+
+        self.kernel.seed(self.values.get_last_value('close'))
+
+    def stream_lines(self, candle_time):
+        row = self.get_candle(candle_time)
+        row[self.indicator_name] = self.kernel.update(row['high'], row['low'], row['close'])
+
+        self.store_indicator_line(row, candle_time)
+
+    def calculate_session_lines(self, opening_time):
+        candles = self.get_session_candles(opening_time, self.candle_length)
+
+        high = candles.get_column('high')
+        low = candles.get_column('low')
+        prev_close = np.roll(candles.get_column('close'), 1)
+
+        lines = SessionLines.like(candles)
+        for name in ['open', 'high', 'low', 'close', 'volume']:
+            lines.add_column(name, candles.get_column(name))
+        lines.add_column(self.indicator_name,
+                         np.maximum(np.abs(high - low), np.maximum(np.abs(high - prev_close), np.abs(low - prev_close))))
+
+        # Both the previous and the current candles are needed
+        lines.exists[1:] = candles.exists[1:] & candles.exists[:-1]
+        lines.exists[:lines.first_session_slot] = False
+
+        return lines
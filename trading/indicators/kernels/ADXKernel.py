@@ -0,0 +1,19 @@
+from trading.indicators.kernels.Kernel import Kernel
+
+
+class ADXKernel(Kernel):
+    def __init__(self, candle_length):
+        super().__init__()
+
+        self.candle_length = candle_length
+        self.adx = 0.0
+
+    def seed(self, adx):
+        self.adx = float(adx)
+        self.primed = True
+
+    def update(self, dx):
+        # Wilder's smoothing
+        self.adx = ((self.adx * (self.candle_length - 1)) + dx) / self.candle_length
+
+        return self.adx
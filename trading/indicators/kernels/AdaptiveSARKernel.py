@@ -0,0 +1,49 @@
+from trading.indicators.kernels.Kernel import Kernel
+
+
+class AdaptiveSARKernel(Kernel):
+    """
+    Keeps the significant close (SIC), the SAR and the color (i.e trend) of the previous candle
+    """
+
+    def __init__(self, arc):
+        super().__init__()
+
+        self.arc = arc
+
+        self.sic = 0.0
+        self.sar = 0.0
+        self.color = "na"
+
+    def seed(self, sic, sar, color):
+        self.sic = float(sic)
+        self.sar = float(sar)
+        self.color = color
+        self.primed = True
+
+    def update(self, close, atr):
+        """
+        :return: a tuple of SIC, SAR and color
+        """
+        if self.color == "green":
+            if close < self.sar:
+                # Trend reversal. We are going short
+                self.sic = float(close)
+                self.sar = self.sic + (atr * self.arc)
+                self.color = "red"
+            else:
+                if close > self.sic:
+                    self.sic = float(close)
+                self.sar = self.sic - (atr * self.arc)
+        else:
+            if close > self.sar:
+                # Trend reversal. We are going long
+                self.sic = float(close)
+                self.sar = self.sic - (atr * self.arc)
+                self.color = "green"
+            else:
+                if close < self.sic:
+                    self.sic = float(close)
+                self.sar = self.sic + (atr * self.arc)
+
+        return self.sic, self.sar, self.color
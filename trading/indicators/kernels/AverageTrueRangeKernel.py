@@ -0,0 +1,19 @@
+from trading.indicators.kernels.Kernel import Kernel
+
+
+class AverageTrueRangeKernel(Kernel):
+    def __init__(self, candle_length):
+        super().__init__()
+
+        self.candle_length = candle_length
+        self.atr = 0.0
+
+    def seed(self, atr):
+        self.atr = float(atr)
+        self.primed = True
+
+    def update(self, true_range):
+        # Wilder's smoothing
+        self.atr = ((self.atr * (self.candle_length - 1)) + true_range) / self.candle_length
+
+        return self.atr
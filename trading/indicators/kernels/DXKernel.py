@@ -0,0 +1,70 @@
+from trading.indicators.kernels.Kernel import Kernel
+
+
+class DXKernel(Kernel):
+    """
+    Keeps the previous candle's high and low along with the Wilder sums of true range and directional movements
+    """
+
+    def __init__(self, candle_length):
+        super().__init__()
+
+        self.candle_length = candle_length
+
+        self.prev_high = 0.0
+        self.prev_low = 0.0
+        self.tr_sum = 0.0
+        self.plus_dm_sum = 0.0
+        self.minus_dm_sum = 0.0
+
+    def seed(self, high, low, tr_sum, plus_dm_sum, minus_dm_sum):
+        self.prev_high = float(high)
+        self.prev_low = float(low)
+        self.tr_sum = float(tr_sum)
+        self.plus_dm_sum = float(plus_dm_sum)
+        self.minus_dm_sum = float(minus_dm_sum)
+        self.primed = True
+
+    def update(self, high, low, true_range):
+        """
+        :return: a tuple of +DM, -DM, smoothed TR, smoothed +DM, smoothed -DM, +DI, -DI, DI difference, DI sum and DX
+        """
+        high_diff = high - self.prev_high
+        low_diff = self.prev_low - low
+
+        if high_diff > 0 and high_diff > low_diff:
+            plus_dm = high_diff
+            minus_dm = 0.0
+        elif low_diff > 0 and low_diff > high_diff:
+            plus_dm = 0.0
+            minus_dm = low_diff
+        else:
+            plus_dm = 0.0
+            minus_dm = 0.0
+
+        n = self.candle_length
+        self.tr_sum = (self.tr_sum - (self.tr_sum / n)) + true_range
+        self.plus_dm_sum = (self.plus_dm_sum - (self.plus_dm_sum / n)) + plus_dm
+        self.minus_dm_sum = (self.minus_dm_sum - (self.minus_dm_sum / n)) + minus_dm
+
+        self.prev_high = float(high)
+        self.prev_low = float(low)
+
+        if self.tr_sum == 0:
+            # A flat market. There is no directional movement
+            plus_di = 0.0
+            minus_di = 0.0
+        else:
+            plus_di = float(round((self.plus_dm_sum / self.tr_sum) * 100))
+            minus_di = float(round((self.minus_dm_sum / self.tr_sum) * 100))
+
+        di_diff = abs(plus_di - minus_di)
+        di_sum = plus_di + minus_di
+
+        if di_sum == 0:
+            dx = 0.0
+        else:
+            dx = float(round((di_diff / di_sum) * 100))
+
+        return plus_dm, minus_dm, self.tr_sum, self.plus_dm_sum, self.minus_dm_sum, \
+            plus_di, minus_di, di_diff, di_sum, dx
@@ -0,0 +1,27 @@
+from abc import ABC, abstractmethod
+
+
+class Kernel(ABC):
+    """
+    Streaming counterpart of an indicator.
+    A kernel carries the recurrence state of the indicator as plain scalars and updates it from one new candle in
+    constant time. It has to be seeded with the state of the most recent indicator value before it can be updated.
+    The dataframe based calculation of the indicator is the reference and kernels are expected to match it
+    """
+
+    def __init__(self):
+        self.primed = False
+
+    def is_primed(self):
+        return self.primed
+
+    def reset(self):
+        self.primed = False
+
+    @abstractmethod
+    def seed(self, *args):
+        pass
+
+    @abstractmethod
+    def update(self, *args):
+        pass
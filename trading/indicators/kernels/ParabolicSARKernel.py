@@ -0,0 +1,82 @@
+from trading.indicators.kernels.Kernel import Kernel
+
+
+class ParabolicSARKernel(Kernel):
+    """
+    Keeps the SAR, extreme price, acceleration factor and the color (i.e trend) of the previous candle
+    """
+
+    def __init__(self, af_step, max_af):
+        super().__init__()
+
+        self.af_step = af_step
+        self.max_af = max_af
+
+        self.sar = 0.0
+        self.ep = 0.0
+        self.af = af_step
+        self.color = "na"
+
+    def seed(self, sar, ep, af, color):
+        self.sar = float(sar)
+        self.ep = float(ep)
+        self.af = af
+        self.color = color
+        self.primed = True
+
+    def update(self, high, low):
+        """
+        :return: a tuple of extreme price, SAR, color and acceleration factor
+        """
+        if self.color == "green":
+            self.update_from_long_trade(high, low)
+        else:
+            self.update_from_short_trade(high, low)
+
+        return self.ep, self.sar, self.color, self.af
+
+    def update_from_long_trade(self, high, low):
+        # If current low less than SAR set for today, then we are going short
+        if low < self.sar:
+            # Reset acceleration factor
+            self.af = self.af_step
+
+            psar = self.ep
+            self.ep = float(low)
+            self.sar = psar - (self.af * (psar - self.ep))
+            self.color = "red"
+            return
+
+        # Find Extreme Price
+        if high > self.ep:
+            self.af = self.af + self.af_step
+
+            # If the acceleration factor increases beyond a threshold, then limit it
+            if self.af > self.max_af:
+                self.af = self.max_af
+            self.ep = float(high)
+
+        self.sar = self.sar + (self.af * (self.ep - self.sar))
+
+    def update_from_short_trade(self, high, low):
+        # If current high greater than SAR set for today, then we are going long
+        if high > self.sar:
+            # Reset acceleration factor
+            self.af = self.af_step
+
+            psar = self.ep
+            self.ep = float(high)
+            self.sar = psar + (self.af * (self.ep - psar))
+            self.color = "green"
+            return
+
+        # Find Extreme Price
+        if low < self.ep:
+            self.af = self.af + self.af_step
+
+            # If the acceleration factor increases beyond a threshold, then limit it
+            if self.af > self.max_af:
+                self.af = self.max_af
+            self.ep = float(low)
+
+        self.sar = self.sar - (self.af * (self.sar - self.ep))
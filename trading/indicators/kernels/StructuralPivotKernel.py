@@ -0,0 +1,107 @@
+from trading.indicators.kernels.Kernel import Kernel
+
+
+class StructuralPivotKernel(Kernel):
+    """
+    Tracks the candidate anchors of the next small pivot along with their bar1 confirmation.
+    A small pivot high (SPH) is an anchor followed by two candles (bar1 and bar2) whose close and low are both lower
+    than the anchor's. A small pivot low (SPL) is the mirror image. Of all the anchors that get confirmed, the earliest
+    one is the pivot.
+    An anchor whose close and low (high for SPL) are both beaten by an earlier anchor can never be the pivot. Every
+    candle that confirms it also confirms the earlier anchor. Such anchors are dropped and every candle is compared
+    against the anchors that are left.
+    Unlike the other kernels, an update is not constant time. It is linear in the number of anchors. When prices
+    swing, most candles are dominated and only a few anchors are kept. In a steady rise (fall for SPL) every candle is
+    a new anchor that a later candle may still confirm, so none of them can be dropped. The indicator starts over
+    before the oldest anchor leaves its line store, which bounds the anchors by the capacity of the store
+    Positions are absolute i.e. counted from the very first indicator value
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        # The previous pivot. Decides whether we look for a SPH, a SPL or both
+        self.prev_small_pivot = "na"
+
+        # Anchors as lists of [position, close, low / high, bar1 position]
+        self.sph_anchors = []
+        self.spl_anchors = []
+
+    def seed(self, prev_small_pivot):
+        self.prev_small_pivot = prev_small_pivot
+        self.sph_anchors = []
+        self.spl_anchors = []
+        self.primed = True
+
+    def update(self, position, high, low, close):
+        """
+        :return: None if no pivot is confirmed by the candle. Else a tuple of pivot type and the positions of the
+        anchor, bar1 and bar2
+        """
+        # SPL is the mirror image of SPH. Negating the prices lets us reuse the same comparisons
+        if self.prev_small_pivot != "sph":
+            anchor = self.find_confirmed_anchor(self.sph_anchors, close, low)
+            if anchor is not None:
+                return self.on_pivot("sph", anchor, position, high, close)
+
+        if self.prev_small_pivot != "spl":
+            anchor = self.find_confirmed_anchor(self.spl_anchors, -close, -high)
+            if anchor is not None:
+                return self.on_pivot("spl", anchor, position, low, close)
+
+        if self.prev_small_pivot != "sph":
+            self.add_candle(self.sph_anchors, position, close, low)
+
+        if self.prev_small_pivot != "spl":
+            self.add_candle(self.spl_anchors, position, -close, -high)
+
+        return None
+
+    def get_first_anchor(self):
+        """
+        :return: Position of the earliest anchor that is tracked or None
+        """
+        positions = [anchors[0][0] for anchors in [self.sph_anchors, self.spl_anchors] if anchors]
+        if not positions:
+            return None
+
+        return min(positions)
+
+    def on_pivot(self, pivot_type, anchor, position, extreme, close):
+        # The next pivot (of the other type) is looked for starting from bar2 of this pivot
+        self.seed(pivot_type)
+
+        if pivot_type == "sph":
+            self.spl_anchors.append([position, -close, -extreme, -1])
+        else:
+            self.sph_anchors.append([position, close, extreme, -1])
+
+        anchor_position, bar1 = anchor
+        return pivot_type, anchor_position, bar1, position
+
+    @staticmethod
+    def find_confirmed_anchor(anchors, close, extreme):
+        """
+        Finds the earliest anchor for which the candle is bar2
+        :return: a tuple of anchor position and bar1 position or None
+        """
+        for anchor_position, anchor_close, anchor_extreme, bar1 in anchors:
+            if bar1 >= 0 and close < anchor_close and extreme < anchor_extreme:
+                return anchor_position, bar1
+
+        return None
+
+    @staticmethod
+    def add_candle(anchors, position, close, extreme):
+        dominated = False
+
+        for anchor in anchors:
+            # Candle is bar1 of the anchor
+            if anchor[3] < 0 and close < anchor[1] and extreme < anchor[2]:
+                anchor[3] = position
+
+            if close <= anchor[1] and extreme <= anchor[2]:
+                dominated = True
+
+        if not dominated:
+            anchors.append([position, close, extreme, -1])
@@ -0,0 +1,43 @@
+from trading.indicators.kernels.Kernel import Kernel
+
+
+class SuperTrendBandKernel(Kernel):
+    """
+    Keeps the previous candle's close along with the final upper and lower bands
+    """
+
+    def __init__(self, multiplier):
+        super().__init__()
+
+        self.multiplier = multiplier
+
+        self.prev_close = 0.0
+        self.upper_band = 0.0
+        self.lower_band = 0.0
+
+    def seed(self, close, upper_band, lower_band):
+        self.prev_close = float(close)
+        self.upper_band = float(upper_band)
+        self.lower_band = float(lower_band)
+        self.primed = True
+
+    def update(self, high, low, close, atr):
+        """
+        :return: a tuple of basic upper band, basic lower band, final upper band and final lower band
+        """
+        basic_upper_band = ((high + low) / 2) + (atr * self.multiplier)
+        basic_lower_band = ((high + low) / 2) - (atr * self.multiplier)
+
+        if self.prev_close > self.upper_band:
+            self.upper_band = basic_upper_band
+        else:
+            self.upper_band = min(basic_upper_band, self.upper_band)
+
+        if self.prev_close < self.lower_band:
+            self.lower_band = basic_lower_band
+        else:
+            self.lower_band = max(basic_lower_band, self.lower_band)
+
+        self.prev_close = float(close)
+
+        return basic_upper_band, basic_lower_band, self.upper_band, self.lower_band
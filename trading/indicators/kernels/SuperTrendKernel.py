@@ -0,0 +1,41 @@
+from trading.indicators.kernels.Kernel import Kernel
+
+
+class SuperTrendKernel(Kernel):
+    """
+    Keeps the previous candle's close and bands along with the super trend value and its color
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        self.prev_close = 0.0
+        self.prev_upper_band = 0.0
+        self.prev_lower_band = 0.0
+        self.super_trend = 0.0
+        self.color = "na"
+
+    def seed(self, close, upper_band, lower_band, super_trend, color):
+        self.prev_close = float(close)
+        self.prev_upper_band = float(upper_band)
+        self.prev_lower_band = float(lower_band)
+        self.super_trend = float(super_trend)
+        self.color = color
+        self.primed = True
+
+    def update(self, close, upper_band, lower_band):
+        """
+        :return: a pair of super trend value and its color
+        """
+        if (self.prev_close <= self.prev_upper_band) and (close > upper_band):
+            self.super_trend = float(lower_band)
+            self.color = "green"
+        elif (self.prev_close >= self.prev_lower_band) and (close < lower_band):
+            self.super_trend = float(upper_band)
+            self.color = "red"
+
+        self.prev_close = float(close)
+        self.prev_upper_band = float(upper_band)
+        self.prev_lower_band = float(lower_band)
+
+        return self.super_trend, self.color
@@ -0,0 +1,18 @@
+from trading.indicators.kernels.Kernel import Kernel
+
+
+class TrueRangeKernel(Kernel):
+    def __init__(self):
+        super().__init__()
+
+        self.prev_close = 0.0
+
+    def seed(self, close):
+        self.prev_close = float(close)
+        self.primed = True
+
+    def update(self, high, low, close):
+        true_range = max(abs(high - low), abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = float(close)
+
+        return true_range
@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+
+from trading.constants import INDICATOR_STORE_CAPACITY
+
+
+class LineStore:
+    """
+    Fixed capacity, column oriented store for indicator lines.
+    Every column is backed by a preallocated numpy array that is twice the capacity. Rows are appended at the end of
+    the arrays and once the end is reached, the most recent rows are moved back to the front. This keeps appends O(1)
+    (amortised) and guarantees that the most recent `capacity` rows are always contiguous. Hence reads are served as
+    read only views instead of copies.
+    Once the capacity is reached, the oldest row is dropped for every new row
+    """
+
+    def __init__(self, capacity=INDICATOR_STORE_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("Capacity of the line store should be positive. Given {}".format(capacity))
+
+        self.capacity = capacity
+        self.buffer_size = 2 * capacity
+
+        self.index = np.empty(self.buffer_size, dtype='datetime64[ns]')
+
+        # Candle times as minutes since the unix epoch. Alignment checks compare these
+        self.keys = np.empty(self.buffer_size, dtype=np.int64)
+        self.columns = {}
+
+        # Rows [start, end) of the arrays are the ones that are alive
+        self.start = 0
+        self.end = 0
+
+        # Number of rows that were dropped because of the capacity
+        # Helps consumers who remember positions to translate them
+        self.offset = 0
+
+    @classmethod
+    def from_frame(cls, df, capacity=INDICATOR_STORE_CAPACITY):
+        store = cls(capacity)
+        store.append_frame(df)
+        return store
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def empty(self):
+        return self.end == self.start
+
+    def get_columns(self):
+        return list(self.columns.keys())
+
+    def get_offset(self):
+        return self.offset
+
+    def append(self, ts, row):
+        """
+        Append a single row to the store
+        Columns that are not seen before are added on the fly and the older rows are filled with NaN
+        Columns that are missing in the row are filled with NaN. This mimics pandas append
+        :param ts: Candle time of the row
+        :param row: Dictionary of column name and value
+        """
+        if self.end == self.buffer_size:
+            self.compact()
+
+        if self.end - self.start == self.capacity:
+            self.start = self.start + 1
+            self.offset = self.offset + 1
+
+        pos = self.end
+        self.index[pos] = np.datetime64(ts, 'ns')
+        self.keys[pos] = self.index[pos].astype('datetime64[m]').astype(np.int64)
+
+        for name, value in row.items():
+            if name not in self.columns:
+                self.add_column(name, value)
+
+            self.set_at(pos, name, value)
+
+        for name, column in self.columns.items():
+            if name not in row:
+                column[pos] = np.nan
+
+        self.end = pos + 1
+
+    def append_frame(self, df):
+        if df.empty:
+            return
+
+        for ts, row in zip(df.index, df.to_dict('records')):
+            self.append(ts, row)
+
+    def compact(self):
+        size = self.end - self.start
+
+        self.index[:size] = self.index[self.start:self.end]
+        self.keys[:size] = self.keys[self.start:self.end]
+        for column in self.columns.values():
+            column[:size] = column[self.start:self.end]
+
+        self.start = 0
+        self.end = size
+
+    def add_column(self, name, value):
+        if self.is_numeric(value):
+            column = np.full(self.buffer_size, np.nan, dtype=np.float64)
+        else:
+            column = np.full(self.buffer_size, np.nan, dtype=object)
+
+        self.columns[name] = column
+
+    def set_at(self, pos, name, value):
+        column = self.columns[name]
+
+        if column.dtype != object and not self.is_numeric(value):
+            # A non numeric value landed on a numeric column. Widen the column
+            column = column.astype(object)
+            self.columns[name] = column
+
+        column[pos] = value
+
+    def set_value(self, position, name, value):
+        """
+        Overwrite the value of a column for an existing row
+        :param position: Position of the row counted from the oldest row that is alive
+        :param name: Column name
+        :param value: New value
+        """
+        if not 0 <= position < len(self):
+            raise IndexError("Position {} is out of range for a store of length {}".format(position, len(self)))
+
+        if name not in self.columns:
+            self.add_column(name, value)
+
+        self.set_at(self.start + position, name, value)
+
+    def get_index(self, n=None):
+        return self.read_only(self.index[self.get_tail_start(n):self.end])
+
+    def get_keys(self, n=None):
+        """
+        :return: Read only view of the epoch minutes of the most recent n rows
+        """
+        return self.read_only(self.keys[self.get_tail_start(n):self.end])
+
+    def get_column(self, name, n=None):
+        return self.read_only(self.columns[name][self.get_tail_start(n):self.end])
+
+    def get_last_time(self):
+        if self.empty:
+            return None
+
+        return pd.Timestamp(self.index[self.end - 1])
+
+    def get_last_key(self):
+        if self.empty:
+            return None
+
+        return int(self.keys[self.end - 1])
+
+    def get_last_value(self, name):
+        return self.columns[name][self.end - 1]
+
+    def get_last_row(self):
+        if self.empty:
+            return {}
+
+        pos = self.end - 1
+        return {name: column[pos] for name, column in self.columns.items()}
+
+    def to_frame(self, n=None):
+        """
+        Materialise the most recent n rows as a dataframe. The dataframe owns its data
+        :param n: Number of rows. All the rows when None
+        :return: A dataframe indexed by candle time
+        """
+        start = self.get_tail_start(n)
+
+        index = pd.DatetimeIndex(self.index[start:self.end], name='ts')
+        if not self.columns:
+            return pd.DataFrame(index=index)
+
+        return pd.DataFrame({name: column[start:self.end].copy() for name, column in self.columns.items()},
+                            index=index)
+
+    def get_tail_start(self, n):
+        if n is None:
+            return self.start
+
+        return max(self.start, self.end - n)
+
+    @staticmethod
+    def read_only(view):
+        view.flags.writeable = False
+        return view
+
+    @staticmethod
+    def is_numeric(value):
+        return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
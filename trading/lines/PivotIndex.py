@@ -0,0 +1,66 @@
+import pandas as pd
+
+
+class PivotIndex:
+    """
+    Append only index of the pivots published by an indicator.
+    Every pivot is recorded with its type, price and candle time. The most recent pivot of every type is kept aside so
+    that it can be looked up in constant time
+    """
+
+    def __init__(self):
+        self.pivots = []
+
+        # Pivot type to the most recent pivot of that type
+        self.last_pivots = {}
+
+    @classmethod
+    def from_frame(cls, df, price_columns):
+        """
+        Builds the index from indicator values that are already annotated with pivots
+        :param df: Indicator values with a small_pivot_type column
+        :param price_columns: Pivot type to the column holding its price. i.e {'sph': 'high', 'spl': 'low'}
+        """
+        index = cls()
+
+        if df.empty or 'small_pivot_type' not in df.columns:
+            return index
+
+        for candle_time, row in zip(df.index, df.to_dict('records')):
+            pivot_type = row['small_pivot_type']
+            if pivot_type in price_columns:
+                index.append(pivot_type, row[price_columns[pivot_type]], candle_time)
+
+        return index
+
+    def __len__(self):
+        return len(self.pivots)
+
+    def append(self, pivot_type, price, candle_time):
+        """
+        Records a pivot. Pivots that are not newer than the most recent pivot of the same type are already known and
+        are ignored. This happens when the indicator rescans values that were loaded from the database
+        :param pivot_type: sph or spl
+        :param price: Price of the pivot
+        :param candle_time: Candle time of the pivot
+        """
+        candle_time = pd.Timestamp(candle_time)
+
+        last_pivot = self.last_pivots.get(pivot_type)
+        if last_pivot is not None and candle_time <= last_pivot[2]:
+            return
+
+        pivot = (pivot_type, price, candle_time)
+        self.pivots.append(pivot)
+        self.last_pivots[pivot_type] = pivot
+
+    def get_last(self, pivot_type):
+        """
+        :param pivot_type: sph or spl
+        :return: a tuple of price and candle time of the most recent pivot of the type. (None, None) if there is none
+        """
+        pivot = self.last_pivots.get(pivot_type)
+        if pivot is None:
+            return None, None
+
+        return pivot[1], pivot[2]
@@ -0,0 +1,101 @@
+import logging
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from trading.constants import RECORDED_LINES_PATH
+from trading.lines.SessionLines import SessionLines
+
+
+class RecordedLinesStore:
+    """
+    On disk store of the lines indicators calculated for whole trading sessions.
+    Lines are recorded the first time an indicator runs for a session and are replayed by later runs, so back tests
+    that only change the rules of a strategy do not calculate the indicators again.
+    Every recording is a compressed numpy archive named by the content address of the indicator's inputs (see
+    Indicator.get_recorded_lines_key). Recordings are written under a hidden name and renamed once complete, so
+    processes recording the same lines never see half written archives
+    """
+
+    def __init__(self, path=RECORDED_LINES_PATH):
+        self.path = path
+
+    def get_lines(self, key):
+        """
+        :param key: Content address of the lines
+        :return: SessionLines or None if the lines are not recorded
+        """
+        path = self.get_lines_path(key)
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as archive:
+            times = archive['times']
+            lines = SessionLines(times, int(archive['first_session_slot']))
+            lines.exists[:] = archive['exists']
+            lines.replay_only = bool(archive['replay_only'])
+
+            for i, (name, numeric) in enumerate(zip(archive['names'].tolist(), archive['numeric'].tolist())):
+                values = archive['arr_{}'.format(i)]
+
+                if numeric:
+                    lines.add_column(name, values.astype(np.float64))
+                else:
+                    # Text columns are stored along with the slots that have no value
+                    column = lines.add_column(name, numeric=False)
+                    present = ~archive['missing_{}'.format(i)]
+                    column[present] = values[present]
+
+        logging.debug("Replaying recorded lines {}".format(key))
+        return lines
+
+    def put_lines(self, key, lines):
+        """
+        Records the lines. Lines holding values that are neither numbers nor text are not recorded
+        :param key: Content address of the lines
+        :param lines: SessionLines
+        :return: True if the lines are recorded
+        """
+        columns = []
+        missing = {}
+        for i, (name, values) in enumerate(lines.columns.items()):
+            if values.dtype != object:
+                columns.append(values)
+                continue
+
+            absent = pd.isnull(values)
+            if not all(isinstance(value, str) for value in values[~absent]):
+                logging.warning("Lines {} cannot be recorded. Column {} is not text".format(key, name))
+                return False
+
+            columns.append(np.where(absent, "", values).astype(str))
+            missing['missing_{}'.format(i)] = absent
+
+        os.makedirs(self.path, exist_ok=True)
+        path = self.get_lines_path(key)
+        hidden_path = os.path.join(self.path, "." + key + "." + uuid.uuid4().hex)
+
+        with open(hidden_path, 'wb') as f:
+            np.savez_compressed(f, *columns,
+                                times=lines.times,
+                                first_session_slot=np.array(lines.first_session_slot),
+                                exists=lines.exists,
+                                replay_only=np.array(lines.replay_only),
+                                names=np.array(list(lines.columns.keys()), dtype=str),
+                                numeric=np.array([values.dtype != object for values in lines.columns.values()],
+                                                 dtype=bool),
+                                **missing)
+
+        os.replace(hidden_path, path)
+
+        logging.debug("Recorded lines {}".format(key))
+        return True
+
+    def get_lines_path(self, key):
+        return os.path.join(self.path, key + ".npz")
+
+
+# Shared by everything in the process
+recorded_lines_store = RecordedLinesStore()
@@ -0,0 +1,75 @@
+import numpy as np
+
+from trading.lines.LineStore import LineStore
+
+
+class SessionLines:
+    """
+    Lines of an indicator (or the OHLC data) precomputed for a whole trading session.
+    Values are aligned to the candle slots of the session. A few slots of the previous session precede them so that
+    indicators can look back. Slots for which there is no value do not exist
+    """
+
+    def __init__(self, times, first_session_slot):
+        self.times = np.asarray(times, dtype='datetime64[ns]')
+        self.first_session_slot = first_session_slot
+        self.exists = np.zeros(len(self.times), dtype=bool)
+        self.columns = {}
+
+        # Lines recorded value by value (see Indicator.record_row) have no slots of the previous session. They can
+        # only be replayed. Other indicators cannot calculate their lines from them
+        self.replay_only = False
+
+        # Candle time (in nanoseconds) to slot
+        self.positions = {t: i for i, t in enumerate(self.times.astype(np.int64).tolist())}
+
+    @classmethod
+    def like(cls, lines):
+        """
+        Session lines without any value but with the same slots as the given lines
+        """
+        return cls(lines.times, lines.first_session_slot)
+
+    def __len__(self):
+        return len(self.times)
+
+    def add_column(self, name, values=None, numeric=True):
+        if values is None:
+            values = np.full(len(self.times), np.nan, dtype=np.float64 if numeric else object)
+
+        self.columns[name] = values
+        return values
+
+    def set_row(self, position, row):
+        """
+        Stores the indicator value of a slot. Columns are added on the fly, like the line store does
+        :param row: dictionary of line name and value
+        """
+        for name, value in row.items():
+            column = self.columns.get(name)
+
+            if column is None:
+                column = self.add_column(name, numeric=LineStore.is_numeric(value))
+            elif column.dtype != object and not LineStore.is_numeric(value):
+                # A non numeric value landed on a numeric column. Widen the column
+                column = self.add_column(name, column.astype(object))
+
+            column[position] = value
+
+        self.exists[position] = True
+
+    def get_column(self, name):
+        return self.columns[name]
+
+    def get_position(self, ts):
+        """
+        :param ts: Candle time
+        :return: The slot of the candle time or None when it is not part of the session
+        """
+        return self.positions.get(int(np.datetime64(ts, 'ns').astype(np.int64)))
+
+    def has_row(self, position):
+        return self.exists[position]
+
+    def get_row(self, position):
+        return {name: column[position] for name, column in self.columns.items()}
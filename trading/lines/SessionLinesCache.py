@@ -0,0 +1,56 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from trading.constants import SESSION_LINES_CACHE_SIZE
+
+
+class SessionLinesCache:
+    """
+    In memory cache of the session lines precomputed by indicators.
+    Strategies that only differ in a few parameters (i.e a parameter sweep) share most of their indicators. Lines of
+    an indicator whose inputs are the same are calculated for the first strategy and reused by the others.
+    Session lines are never modified once calculated, so they are shared as is. Sessions are evicted in least recently
+    used order once the capacity is reached
+    """
+
+    def __init__(self, capacity=SESSION_LINES_CACHE_SIZE):
+        if capacity <= 0:
+            raise ValueError("Capacity of the session lines cache should be positive. Given {}".format(capacity))
+
+        self.capacity = capacity
+
+        # Key of the indicator's inputs (see Indicator.get_session_key) to its session lines
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_lines(self, key, calculate_lines):
+        """
+        :param key: Everything the lines depend on
+        :param calculate_lines: Function that calculates the session lines when they are not cached
+        :return: session lines. They are shared and should not be modified
+        """
+        with self.lock:
+            if key in self.sessions:
+                self.sessions.move_to_end(key)
+                return self.sessions[key]
+
+            lines = calculate_lines()
+            if lines is None:
+                return lines
+
+            logging.debug("Cached session lines for {}".format(key))
+
+            self.sessions[key] = lines
+            if len(self.sessions) > self.capacity:
+                self.sessions.popitem(last=False)
+
+            return lines
+
+    def clear(self):
+        with self.lock:
+            self.sessions.clear()
+
+
+# Shared by everything in the process
+session_lines_cache = SessionLinesCache()
@@ -2,8 +2,9 @@ import logging
 import time
 from abc import ABC, abstractmethod
 
+from trading.analytics.TradeAnalytics import TradeAnalytics
 from trading.zerodha.kite.Period import Period
-from trading.zerodha.kite.TimeSequencer import get_allowed_time_slots
+from trading.zerodha.kite.TimeSequencer import get_allowed_time_slots, is_allowed_time
 
 
 class Strategy(ABC):
@@ -39,10 +40,11 @@ class Strategy(ABC):
         # When strategy looks at only one time frame, this should not be an issue
         # However, if the strategy looks at multiple time frames, then the indicator with lowest time frame matters
         # The strategy should be aware that it will be run on the indicator with lowest time frame
+        self.lowest_candle_interval = interval
         self.allowed_time_slots = get_allowed_time_slots(period, interval)
 
     def act(self, candle_time):
-        if not candle_time.strftime('%H:%M') in self.allowed_time_slots:
+        if not is_allowed_time(Period.MIN, self.lowest_candle_interval, candle_time):
             return
 
         self.do_act(candle_time)
@@ -75,6 +77,9 @@ class Strategy(ABC):
     def get_opening_time(self):
         return self.opening_time
 
+    def get_orders(self):
+        return self.orders
+
     def get_mode(self):
         """
         Determines whether it is back test or not
@@ -240,6 +245,9 @@ class Strategy(ABC):
         - Loss %
         - Max winning streak
         - Max loosing streak
+        - Max drawdown
+        - Sharpe and Sortino ratios of the returns of the trades
+        - Exposure i.e % of the session for which positions were held
         :return: A dictionary containing the above statistics
         """
         # Since auto sqaure off worker does not know the current price at which the square off is triggered
@@ -247,42 +255,19 @@ class Strategy(ABC):
         some_indicator = self.indicators[0]
         some_indicator_values = some_indicator.get_all_values()
 
-        ind = self.orders.order_book.index
-
-        if len(ind) == 0:
+        if len(self.orders.order_book) == 0:
             return
 
         auto_square_off_value = some_indicator_values['close'].iloc[-1]
-        self.orders.order_book.loc[ind[-1], 'price'] = auto_square_off_value
-
-        ind = self.orders.all_positions.index
-        self.orders.all_positions.loc[ind[-1], 'ExitPrice'] = auto_square_off_value
-        self.orders.all_positions.loc[ind[-1], 'ExitValue'] = auto_square_off_value * \
-                                                              self.orders.all_positions['EntryQuantity'][-1]
-
-        if self.orders.all_positions['action'].iloc[-1] == "sell":
-            self.orders.all_positions.loc[ind[-1], 'Net'] = \
-                (self.orders.all_positions['EntryPrice'][-1] - self.orders.all_positions['ExitPrice'][-1]) * \
-                self.orders.all_positions['EntryQuantity'][-1]
-        elif self.orders.all_positions['action'].iloc[-1] == "buy":
-            self.orders.all_positions.loc[ind[-1], 'Net'] = \
-                (self.orders.all_positions['ExitPrice'][-1] - self.orders.all_positions['EntryPrice'][-1]) * \
-                self.orders.all_positions['EntryQuantity'][-1]
-
-        #print(self.orders.order_book)
-        #print(self.orders.all_positions)
-        #print(self.orders.active_positions)
-
-        if len(self.orders.active_positions) != 0:
+        self.orders.set_square_off_price(auto_square_off_value)
+
+        if self.orders.has_active_positions():
             raise ValueError("We have not closed open positions!!")
 
-        return {
+        results = {
             'Status': "PASS",
-            'Total Orders': len(self.orders.order_book),
-            'Total Trades': len(self.orders.all_positions),
-            'Total Cash Invested': self.orders.get_start_cash(),
-            'Net income': self.orders.all_positions['Net'].sum(),
-            'ROI': (self.orders.all_positions['Net'].sum() / self.orders.get_start_cash()) * 100,
-            'Total Winning Trades': len(self.orders.all_positions[self.orders.all_positions.Net > 0]),
-            'Total Loosing Trades': len(self.orders.all_positions[self.orders.all_positions.Net < 0])
+            'Total Orders': len(self.orders.order_book)
         }
+        results.update(TradeAnalytics(self.orders.get_start_cash()).get_run_statistics(self.orders.get_trades()))
+
+        return results
@@ -48,25 +48,23 @@ class StructuralPivotMethodStrategy(Strategy):
         }
 
     def do_act(self, candle_time):
-        pivots = self.sp_indicator.get_all_values()
-
-        if pivots.empty:
+        if self.sp_indicator.is_empty():
             # Enough candle have not formed yet
             return
 
-        recent_close = pivots['close'].iloc[-1]
+        recent_close = self.sp_indicator.get_line('close', 1)[-1]
 
         if self.previous_sph['value'] == 0.0 or self.previous_spl['value'] == 0.0:
             # We need to find the first two pivots to start with
             # Until we find them, we wont take any all_positions
-            self.initialise_pivots(pivots)
+            self.initialise_pivots()
         elif self.previous_pivot == "sph":
             # Look for last SPL closing below the most recent SPL
-            # Most recent SPL is self.previous_spl and the last SPL is the last value in pivots df
+            # Most recent SPL is self.previous_spl and the last SPL is the last one published by the indicator
             # If these two values are the same, it means we are still looking for out a new SPL
-            last_spl, last_spl_candle_time = self.get_last_spl(pivots)
+            last_spl, last_spl_candle_time = self.get_last_spl()
 
-            if self.can_go_short(recent_close, pivots):
+            if self.can_go_short(recent_close):
                 # We have not found a new SPL!!
                 # But we have broken the previous SPL. Hence we are going short
                 self.stop_and_reverse_enter_short_position(candle_time, recent_close)
@@ -82,16 +80,16 @@ class StructuralPivotMethodStrategy(Strategy):
                 }
                 self.previous_pivot = "spl"
 
-                if self.can_go_long(recent_close, pivots):
+                if self.can_go_long(recent_close):
                     # There can be cases where a new pivot is formed and we breach the previous pivot
                     self.stop_and_reverse_enter_long_position(candle_time, recent_close)
         elif self.previous_pivot == "spl":
             # Look for last SPH closing above the most recent SPH
-            # Most recent SPL is self.previous_sph and the last SPH is the last value in pivots df
+            # Most recent SPL is self.previous_sph and the last SPH is the last one published by the indicator
             # If these two values are the same, it means we are still looking for out a new SPH
-            last_sph, last_sph_candle_time = self.get_last_sph(pivots)
+            last_sph, last_sph_candle_time = self.get_last_sph()
 
-            if self.can_go_long(recent_close, pivots):
+            if self.can_go_long(recent_close):
                 # We have not found a new SPH!!
                 # But we have broken the previous SPH. Hence we are going long
                 self.stop_and_reverse_enter_long_position(candle_time, recent_close)
@@ -107,61 +105,53 @@ class StructuralPivotMethodStrategy(Strategy):
                 }
                 self.previous_pivot = "sph"
 
-                if self.can_go_short(recent_close, pivots):
+                if self.can_go_short(recent_close):
                     # There can be cases where a new pivot is formed and we breach the previous pivot
                     self.stop_and_reverse_enter_short_position(candle_time, recent_close)
 
-    def initialise_pivots(self, df):
-        spl_df = df[df.small_pivot_type == "spl"]
-        if not spl_df.empty:
-            if self.previous_spl['value'] != 0.0 and self.previous_spl['value'] != spl_df['low'].iloc[-1]:
+    def initialise_pivots(self):
+        last_spl, last_spl_candle_time = self.get_last_spl()
+        if last_spl is not None:
+            if self.previous_spl['value'] != 0.0 and self.previous_spl['value'] != last_spl:
                 raise ValueError("SPL is already initialised")
 
             self.previous_spl = {
-                'candle_time': spl_df.index[-1],
-                'value': spl_df['low'].iloc[-1]
+                'candle_time': last_spl_candle_time,
+                'value': last_spl
             }
 
             self.all_pivots.append(self.previous_spl)
             self.previous_pivot = "spl"
 
-        sph_df = df[df.small_pivot_type == "sph"]
-        if not sph_df.empty:
-            if self.previous_sph['value'] != 0.0 and self.previous_sph['value'] != sph_df['high'].iloc[-1]:
+        last_sph, last_sph_candle_time = self.get_last_sph()
+        if last_sph is not None:
+            if self.previous_sph['value'] != 0.0 and self.previous_sph['value'] != last_sph:
                 raise ValueError("SPH is already initialised")
 
             self.previous_sph = {
-                'candle_time': sph_df.index[-1],
-                'value': sph_df['high'].iloc[-1]
+                'candle_time': last_sph_candle_time,
+                'value': last_sph
             }
 
             self.all_pivots.append(self.previous_sph)
             self.previous_pivot = "sph"
 
-    def get_last_spl(self, df):
-        spl_df = df[df.small_pivot_type == "spl"].tail(1)
-        last_spl = spl_df['low'].iloc[-1]
-        last_spl_candle_time = spl_df.index[-1]
-
-        return last_spl, last_spl_candle_time
-
-    def get_last_sph(self, df):
-        sph_df = df[df.small_pivot_type == "sph"].tail(1)
-        last_sph = sph_df['high'].iloc[-1]
-        last_sph_candle_time = sph_df.index[-1]
+    def get_last_spl(self):
+        return self.sp_indicator.get_last_pivot("spl")
 
-        return last_sph, last_sph_candle_time
+    def get_last_sph(self):
+        return self.sp_indicator.get_last_pivot("sph")
 
-    def can_go_short(self, recent_close, df):
-        last_spl, last_spl_candle_time = self.get_last_spl(df)
+    def can_go_short(self, recent_close):
+        last_spl, last_spl_candle_time = self.get_last_spl()
 
         if recent_close < last_spl and len(self.short_positions) == 0:
             return True
 
         return False
 
-    def can_go_long(self, recent_close, df):
-        last_sph, last_sph_candle_time = self.get_last_sph(df)
+    def can_go_long(self, recent_close):
+        last_sph, last_sph_candle_time = self.get_last_sph()
 
         if recent_close > last_sph and len(self.long_positions) == 0:
             return True
@@ -13,12 +13,13 @@ class SuperTrend73Strategy(Strategy):
         self.kite = kite
 
         # Initialise all strategy params
-        self.candle_length = 7
+        # Candle length is the length of the ATR
+        self.candle_length = kwargs.get('candle_length', 7)
         self.mode = kwargs['mode']
         self.candle_interval = kwargs['candle_interval']
         self.db_path = kwargs['db_path']
         self.period = Period.MIN
-        self.multiplier = 3
+        self.multiplier = kwargs.pop('multiplier', 3)
         # This initialisation is necessary for the strategies to access the value
         # DO NOT remove this thinking it is redundant
         self.symbol = symbol
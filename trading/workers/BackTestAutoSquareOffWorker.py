@@ -20,6 +20,9 @@ class BackTestAutoSquareOffWorker(BackTestWorker):
         self.auto_square_off = AutoSquareOff(kwargs['orders'], kite)
         self.strategy = None
 
+    def get_candle_times(self, opening_time):
+        return [t for t in super().get_candle_times(opening_time) if t.hour == 15 and t.minute > 24]
+
     def do_run(self, candle_time):
         current_hour = candle_time.hour
         current_minute = candle_time.minute
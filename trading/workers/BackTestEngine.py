@@ -0,0 +1,42 @@
+import heapq
+import logging
+
+from trading.workers.BackTestWorker import BackTestWorker
+
+
+class BackTestEngine:
+    """
+    Runs the back test of a session for all the workers (strategy runners, auto square off, ...) on one simulated
+    clock, in a single thread.
+    Every worker tells the candle times it has to run at. The engine merges them into one stream and steps through it.
+    At every candle time, the workers run in the order they were added. Strategies added before the auto square off
+    hence act on a candle before positions are squared off on it. Every step sees the orders of all the workers placed
+    till then, so runs are deterministic
+    """
+
+    def __init__(self, opening_time):
+        self.opening_time = opening_time
+        self.workers = []
+
+    def add_worker(self, worker):
+        """
+        :param worker: Back test worker. It is run by the engine and should not be started as a thread
+        """
+        self.workers.append(worker)
+
+    def run(self):
+        for worker in self.workers:
+            worker.prepare(self.opening_time)
+
+        # Stream of candle time, position of the worker and the worker
+        events = heapq.merge(*[[(candle_time, i) for candle_time in worker.get_candle_times(self.opening_time)]
+                               for i, worker in enumerate(self.workers)])
+
+        for candle_time, i in events:
+            self.workers[i].do_run(candle_time)
+
+        closing_time = BackTestWorker.get_closing_time(self.opening_time)
+        logging.info("Market has ended for the session opening at {}".format(self.opening_time))
+
+        for worker in self.workers:
+            worker.stop(closing_time)
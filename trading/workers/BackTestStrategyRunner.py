@@ -3,6 +3,7 @@ import logging
 from trading.errors.DataNotAvailableError import DataNotAvailableError
 from trading.errors.NoCashError import NoCashError
 from trading.workers.BackTestWorker import BackTestWorker
+from trading.zerodha.kite.TimeSequencer import is_allowed_time
 
 
 class BackTestStrategyRunner(BackTestWorker):
@@ -11,6 +12,22 @@ class BackTestStrategyRunner(BackTestWorker):
 
         self.strategy = strategy
 
+        # Indicator values are stored for the next session unless asked not to (i.e parameter sweeps)
+        self.persist = kwargs.get('persist', True)
+
+    def prepare(self, opening_time):
+        # In back tests, the data of the whole session is available upfront
+        # Indicators can hence compute the lines of the session in one go
+        for ind in self.strategy.get_indicators():
+            ind.prepare_session(opening_time)
+
+    def get_candle_times(self, opening_time):
+        # Indicators and the strategy do nothing outside the time slots of their candle intervals
+        candle_intervals = set((ind.period, ind.candle_interval) for ind in self.strategy.get_indicators())
+
+        return [t for t in super().get_candle_times(opening_time)
+                if any(is_allowed_time(period, candle_interval, t) for period, candle_interval in candle_intervals)]
+
     def do_run(self, candle_time):
         logging.debug(
             "Running strategy {} for symbol {}".format(self.strategy.__class__.__name__, self.strategy.symbol))
@@ -29,6 +46,12 @@ class BackTestStrategyRunner(BackTestWorker):
             pass
 
     def stop(self, candle_time):
+        for ind in self.strategy.get_indicators():
+            ind.save_recorded_lines()
+
+        if not self.persist:
+            return
+
         for ind in self.strategy.get_indicators():
             ind.persist_indicator_values()
 
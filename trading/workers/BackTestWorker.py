@@ -14,22 +14,41 @@ class BackTestWorker(WorkerThread, ABC):
         self.opening_time = kwargs['opening_time']
 
     def run(self):
-        candle_time = self.opening_time
-
-        while True:
-            current_hour = candle_time.hour
-            current_minute = candle_time.minute
-
-            if current_hour == 15 and current_minute > 30:
-                logging.info("Market has ended. Current hour {} Current minute {}. "
-                             "Exiting thread and recording state".format(current_hour, current_minute))
-                self.stop(candle_time)
-                break
+        self.prepare(self.opening_time)
+
+        for candle_time in self.get_candle_times(self.opening_time):
+            self.do_run(candle_time)
+
+        closing_time = self.get_closing_time(self.opening_time)
+        logging.info("Market has ended. Current hour {} Current minute {}. "
+                     "Exiting thread and recording state".format(closing_time.hour, closing_time.minute))
+        self.stop(closing_time)
+
+    def get_candle_times(self, opening_time):
+        """
+        Candle times at which the worker has to run. Every minute of the session by default. Workers that do nothing
+        on most of the minutes can narrow it down
+        :param opening_time: Opening time of the session
+        :return: a list of candle times in ascending order
+        """
+        candle_time = opening_time.replace(second=0, microsecond=0)
+        closing_time = self.get_closing_time(opening_time)
+
+        candle_times = []
+        while candle_time < closing_time:
+            candle_times.append(candle_time)
+            candle_time = candle_time + datetime.timedelta(minutes=1)
 
-            # Reset the second to 0. We are only concerned about the minute
-            # There could a few milliseconds or probably 1 or 2 seconds difference
-            # For our use case it is okay
-            self.do_run(candle_time.replace(second=0))
+        return candle_times
 
-            candle_time = candle_time + datetime.timedelta(minutes=1)
+    @staticmethod
+    def get_closing_time(opening_time):
+        # First minute after the market has ended
+        return opening_time.replace(hour=15, minute=31, second=0, microsecond=0)
 
+    def prepare(self, opening_time):
+        """
+        Hook to do any work for the whole session before the first candle is run
+        :param opening_time: Opening time of the session
+        """
+        pass
@@ -0,0 +1,57 @@
+import logging
+import queue
+
+from trading.data.live.BarBuilder import bar_builder
+from trading.workers.LiveStrategyRunner import LiveStrategyRunner
+
+
+class BarCloseStrategyRunner(LiveStrategyRunner):
+    """
+    Runs the strategy as soon as a bar of its lowest candle interval closes instead of at the strike of every minute.
+    Bars are closed by the bar builder when the first tick after them arrives, or by the BarCloseWorker at the strike
+    of the minute if no tick arrives. The strategy still acts only at its allowed time slots.
+    The runner either runs in its own thread or is run by a LiveScheduler
+    """
+
+    # Marks the close of the market
+    STOP = object()
+
+    def __init__(self, kite, strategy, **kwargs):
+        super().__init__(kite, strategy, **kwargs)
+
+        self.candle_times = queue.Queue()
+        self.market_close_time = None
+        self.scheduler = None
+        bar_builder.subscribe(strategy.symbol, strategy.lowest_candle_interval, self)
+
+    def set_scheduler(self, scheduler):
+        self.scheduler = scheduler
+
+    def on_bar_close(self, candle_time):
+        if self.scheduler is not None:
+            self.scheduler.submit(self, candle_time)
+        else:
+            self.candle_times.put(candle_time)
+
+    def on_market_close(self, candle_time):
+        # The scheduler stops its workers itself
+        if self.scheduler is not None:
+            return
+
+        self.market_close_time = candle_time
+        self.candle_times.put(self.STOP)
+
+    def run(self):
+        while True:
+            candle_time = self.candle_times.get()
+
+            # Only the latest bar matters if the strategy fell behind
+            while candle_time is not self.STOP and not self.candle_times.empty():
+                candle_time = self.candle_times.get()
+
+            if candle_time is self.STOP:
+                logging.info("Market has ended. Exiting thread and recording state")
+                self.stop(self.market_close_time)
+                break
+
+            self.do_run(candle_time)
@@ -0,0 +1,19 @@
+from trading.data.live.BarBuilder import bar_builder
+from trading.workers.LiveWorker import LiveWorker
+
+
+class BarCloseWorker(LiveWorker):
+    """
+    Worker that closes the bars of the bar builder at the strike of every minute.
+    Bars are usually closed by the first tick after them. This makes sure they close even if no tick arrives
+    """
+    def __init__(self, kite, **kwargs):
+        super().__init__(kite, **kwargs)
+
+        self.strategy = None
+
+    def do_run(self, candle_time):
+        bar_builder.close_bars(candle_time)
+
+    def stop(self, candle_time):
+        bar_builder.stop(candle_time)
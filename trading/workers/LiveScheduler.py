@@ -0,0 +1,154 @@
+import asyncio
+import datetime
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from trading.constants import LIVE_SCHEDULER_THREADS
+
+
+class LiveScheduler:
+    """
+    Runs all the live workers from one event loop instead of one thread per worker.
+    The scheduler owns the only clock. At the strike of every minute it fans the minute out to the clock driven
+    workers. Workers driven by closed bars are run as soon as they are told about a bar. The work itself (indicators,
+    strategies and orders) runs on a small thread pool, so that the event loop stays free.
+    A worker never runs twice at the same time. If it is still busy, only the latest candle time is kept and it runs
+    once the worker is free.
+    The time taken by every worker is tracked and logged when the market ends
+    """
+
+    def __init__(self, threads=LIVE_SCHEDULER_THREADS):
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+        # Event loop while the scheduler runs. Workers are not run any more once it stops
+        self.loop = None
+        self.stopping = False
+
+        self.clock_workers = []
+        self.event_workers = []
+
+        # Workers that are running and the candle time they should run for next
+        self.busy_workers = set()
+        self.pending_candle_times = {}
+        self.tasks = set()
+
+        # Worker name to number of runs, total and maximum seconds taken
+        self.timings = {}
+
+    def add_worker(self, worker):
+        """
+        :param worker: Live worker that runs at the strike of every minute
+        """
+        self.clock_workers.append(worker)
+
+    def add_event_worker(self, worker):
+        """
+        :param worker: Live worker that submits itself to the scheduler when it should run
+        """
+        worker.set_scheduler(self)
+        self.event_workers.append(worker)
+
+    def submit(self, worker, candle_time):
+        """
+        Runs the worker for the candle time. Can be called from any thread
+        Bars keep closing as long as ticks arrive. Those that close once the scheduler stops are ignored
+        """
+        loop = self.loop
+        if loop is None or loop.is_closed() or self.stopping:
+            return
+
+        try:
+            loop.call_soon_threadsafe(self.schedule, worker, candle_time)
+        except RuntimeError:
+            # The loop was closed in the meantime
+            pass
+
+    def run(self):
+        try:
+            asyncio.run(self.run_clock())
+        finally:
+            self.loop = None
+
+    async def run_clock(self):
+        self.loop = asyncio.get_running_loop()
+
+        while True:
+            candle_time = datetime.datetime.now().replace(microsecond=0)
+
+            if candle_time.hour == 15 and candle_time.minute > 30:
+                logging.info("Market has ended. Current hour {} Current minute {}. "
+                             "Stopping the workers".format(candle_time.hour, candle_time.minute))
+                break
+
+            for worker in self.clock_workers:
+                self.schedule(worker, candle_time.replace(second=0))
+
+            # Sleep till the strike of the next minute
+            await asyncio.sleep(60.0 - time.time() % 60.0)
+
+        await self.stop(candle_time)
+
+    def schedule(self, worker, candle_time):
+        if self.stopping:
+            # The executor is being shut down. Nothing new is run
+            return
+
+        if worker in self.busy_workers:
+            self.pending_candle_times[worker] = candle_time
+            return
+
+        self.busy_workers.add(worker)
+
+        task = self.loop.create_task(self.run_worker(worker, candle_time))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_worker(self, worker, candle_time):
+        while candle_time is not None:
+            start = time.perf_counter()
+
+            try:
+                await self.loop.run_in_executor(self.executor, worker.do_run, candle_time)
+            except Exception as e:
+                logging.exception("Worker {} failed for candle time {}: {}".format(
+                    self.get_name(worker), candle_time, e))
+
+            self.record_timing(worker, time.perf_counter() - start)
+
+            candle_time = self.pending_candle_times.pop(worker, None)
+
+        self.busy_workers.discard(worker)
+
+    async def stop(self, candle_time):
+        # Submits that arrive from now on are not run. Workers that are busy finish their pending candle times
+        self.stopping = True
+
+        if self.tasks:
+            await asyncio.wait(list(self.tasks))
+
+        for worker in self.clock_workers + self.event_workers:
+            await self.loop.run_in_executor(self.executor, worker.stop, candle_time)
+
+        self.executor.shutdown()
+        self.log_timings()
+
+    def record_timing(self, worker, seconds):
+        name = self.get_name(worker)
+        runs, total, maximum = self.timings.get(name, (0, 0.0, 0.0))
+        self.timings[name] = (runs + 1, total + seconds, max(maximum, seconds))
+
+        logging.debug("Worker {} took {:.3f} seconds".format(name, seconds))
+
+    def log_timings(self):
+        for name, (runs, total, maximum) in sorted(self.timings.items(), key=lambda item: -item[1][1]):
+            logging.info("Worker {} ran {} times. Average {:.3f} seconds, maximum {:.3f} seconds".format(
+                name, runs, total / runs, maximum))
+
+    @staticmethod
+    def get_name(worker):
+        strategy = getattr(worker, 'strategy', None)
+        if strategy is None:
+            return worker.__class__.__name__
+
+        return "{} {}".format(strategy.__class__.__name__, strategy.symbol)
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+from trading.zerodha.kite.TimeSequencer import to_epoch_minute
+
+POSITION_COLUMNS = ['tradingsymbol', 'action', 'quantity', 'EntryQuantity', 'EntryPrice', 'EntryValue', 'ExitPrice',
+                    'ExitValue', 'ExitTime', 'Net']
+
+
+class OrderLedger:
+    """
+    Append only record of the orders and positions of a back test.
+    Orders and positions are kept column wise in python lists, so a fill appends or updates a few values instead of
+    building dataframes. Active positions and the positions that are not exited yet are indexed by symbol, so a fill
+    finds the position it closes in constant time however many symbols and trades the ledger holds.
+    Dataframes are built only when asked for and are remembered till the next fill
+    """
+
+    def __init__(self):
+        self.order_columns = {'time': [], 'action': [], 'quantity': [], 'price': []}
+
+        self.position_times = []
+        self.position_columns = {name: [] for name in POSITION_COLUMNS}
+
+        # Entry and exit times of the positions as epoch minutes. Exit is -1 till the position is exited
+        self.entry_minutes = []
+        self.exit_minutes = []
+
+        # Symbol to a list of quantity and action of its active position
+        self.active_positions = {}
+
+        # Symbol to the rows of its positions that are not exited yet (i.e exit price is -1)
+        self.open_rows = {}
+
+        self.frames = {}
+
+    def __len__(self):
+        return len(self.position_times)
+
+    def fill(self, candle_time, symbol, transaction_type, quantity, price):
+        """
+        Records an order. It exits the active position of the symbol if there is one. Else it enters a new position
+        """
+        self.frames.clear()
+
+        self.order_columns['time'].append(candle_time)
+        self.order_columns['action'].append(transaction_type)
+        self.order_columns['quantity'].append(quantity)
+        self.order_columns['price'].append(price)
+
+        if symbol not in self.active_positions:
+            self.enter(candle_time, symbol, transaction_type, quantity, price)
+            return
+
+        # We already have an open position which could be long or short
+        active_quantity, active_position = self.active_positions[symbol]
+
+        if active_position == "sell":
+            new_quantity = (active_quantity * -1) + quantity
+        elif active_position == "buy":
+            new_quantity = active_quantity + (quantity * -1)
+        else:
+            raise ValueError("Active position should be buy or sell")
+
+        if new_quantity == 0:
+            # We have exited the position. Remove it from our records
+            del self.active_positions[symbol]
+
+        rows = self.open_rows.pop(symbol, [])
+        for row in rows:
+            self.position_columns['quantity'][row] = new_quantity
+            self.position_columns['ExitTime'][row] = candle_time
+            self.exit_minutes[row] = to_epoch_minute(candle_time)
+            self.set_exit_price(row, price)
+
+        # A position exited at an unknown price (-1) still looks open. See set_square_off_price
+        rows = [row for row in rows if self.position_columns['ExitPrice'][row] == -1]
+        if rows:
+            self.open_rows[symbol] = rows
+
+    def enter(self, candle_time, symbol, transaction_type, quantity, price):
+        row = len(self.position_times)
+
+        self.position_times.append(candle_time)
+        self.entry_minutes.append(to_epoch_minute(candle_time))
+        self.exit_minutes.append(-1)
+
+        for name, value in zip(POSITION_COLUMNS, [symbol, transaction_type, quantity, quantity, price,
+                                                  (quantity * price), -1, -1, -1, 0]):
+            self.position_columns[name].append(value)
+
+        self.active_positions[symbol] = [quantity, transaction_type]
+        self.open_rows.setdefault(symbol, []).append(row)
+
+    def set_exit_price(self, row, price):
+        columns = self.position_columns
+
+        columns['ExitPrice'][row] = price
+        columns['ExitValue'][row] = price * columns['EntryQuantity'][row]
+
+        if columns['action'][row] == "sell":
+            columns['Net'][row] = (columns['EntryPrice'][row] - price) * columns['EntryQuantity'][row]
+        elif columns['action'][row] == "buy":
+            columns['Net'][row] = (price - columns['EntryPrice'][row]) * columns['EntryQuantity'][row]
+
+    def set_square_off_price(self, price):
+        """
+        Sets the price of the last order and the exit price of the last position
+        Auto square off does not know the price at which it squares off. It places orders at -1
+        """
+        if not self.order_columns['time']:
+            return
+
+        self.frames.clear()
+        self.order_columns['price'][-1] = price
+
+        row = len(self.position_times) - 1
+        self.set_exit_price(row, price)
+
+        symbol = self.position_columns['tradingsymbol'][row]
+        rows = [r for r in self.open_rows.get(symbol, []) if r != row]
+        if rows:
+            self.open_rows[symbol] = rows
+        else:
+            self.open_rows.pop(symbol, None)
+
+    def get_trades(self):
+        """
+        :return: dictionary of numpy arrays of the net, entry time and exit time (as epoch minutes) of the positions
+        in the order they were entered. See TradeAnalytics
+        """
+        return {
+            'net': np.asarray(self.position_columns['Net'], dtype=np.float64),
+            'entry_minute': np.asarray(self.entry_minutes, dtype=np.int64),
+            'exit_minute': np.asarray(self.exit_minutes, dtype=np.int64)
+        }
+
+    def get_order_book(self):
+        if 'order_book' not in self.frames:
+            columns = self.order_columns
+            self.frames['order_book'] = pd.DataFrame({name: columns[name] for name in ['action', 'quantity', 'price']},
+                                                     index=pd.Index(columns['time']))
+
+        return self.frames['order_book']
+
+    def get_all_positions(self):
+        if 'all_positions' not in self.frames:
+            self.frames['all_positions'] = pd.DataFrame(self.position_columns, columns=POSITION_COLUMNS,
+                                                        index=pd.Index(self.position_times))
+
+        return self.frames['all_positions']
+
+    def get_active_positions(self):
+        return pd.DataFrame([[quantity, action] for quantity, action in self.active_positions.values()],
+                            columns=['quantity', 'action'], index=list(self.active_positions.keys()))
+
+    def get_positions(self, rows):
+        """
+        :param rows: Rows of the positions
+        :return: dataframe of the positions
+        """
+        return pd.DataFrame({name: [self.position_columns[name][row] for row in rows] for name in POSITION_COLUMNS},
+                            columns=POSITION_COLUMNS, index=pd.Index([self.position_times[row] for row in rows]))
+
+    def get_rows(self, long):
+        """
+        :param long: Rows of the long (positive quantity) positions if True. Else of the short ones
+        """
+        quantities = self.position_columns['quantity']
+        return [row for row in range(len(quantities)) if (quantities[row] > 0 if long else quantities[row] < 0)]
@@ -1,4 +1,7 @@
-from trading.data.live.TicksDataManager import TicksDataManager
+import datetime
+
+from trading.data.live.BarBuilder import bar_builder
+from trading.data.live.TickWriter import TickWriter
 
 
 class Ticks:
@@ -6,10 +9,20 @@ class Ticks:
         self.tokens = instruments_helper.get_instrument_tokens(symbols)
         self.instruments_helper = instruments_helper
 
+        self.tick_writer = TickWriter(instruments_helper)
+        self.tick_writer.start()
+
     def on_ticks(self, ws, ticks):
-        ticks_db = TicksDataManager(instruments_helper=self.instruments_helper)
-        ticks_db.insert_ticks(ticks)
-        ticks_db.close()
+        # Runs on the websocket thread. Bars are updated in memory and writing is left to the tick writer so that no
+        # tick is missed
+        tick_time = datetime.datetime.now()
+
+        bar_builder.on_ticks(tick_time, [(self.instruments_helper.get_symbol_from_instrument_token(
+            tick['instrument_token']), tick['last_price'], tick['last_quantity']) for tick in ticks])
+        self.tick_writer.put(tick_time, ticks)
 
     def on_connect(self, ws, response):
         ws.subscribe(self.tokens)
+
+    def stop(self):
+        self.tick_writer.stop()
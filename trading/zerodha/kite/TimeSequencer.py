@@ -1,6 +1,11 @@
 import datetime
 
+import numpy as np
+import pandas as pd
+
+from trading.constants import TRADING_CALENDAR_START_YEAR, TRADING_CALENDAR_END_YEAR
 from trading.zerodha.kite.Period import Period
+from trading.zerodha.kite.TradingCalendar import TradingCalendar
 
 trading_holidays = [
     datetime.date(2021, 10, 15),
@@ -9,6 +14,10 @@ trading_holidays = [
     datetime.date(2021, 11, 19)
 ]
 
+calendar = TradingCalendar(TRADING_CALENDAR_START_YEAR, TRADING_CALENDAR_END_YEAR, trading_holidays)
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
 
 def get_time_sequence(period, candle_interval, candle_length, start_time):
     if start_time.hour > 15:
@@ -18,32 +27,10 @@ def get_time_sequence(period, candle_interval, candle_length, start_time):
         raise ValueError(
             "Outside of market hours. Given hour {} and minute {}".format(start_time.hour, start_time.minute))
 
-    sequence = []
-    start_time = start_time.replace(second=0)
-    prev = start_time
-
-    delta = get_time_delta(period, candle_interval)
-
-    for i in range(candle_length):
-        prev = prev.replace(second=0)
-        prev = prev - delta
-
-        if prev.hour == 9 and prev.minute < 15:
-            while True:
-                prev = prev - datetime.timedelta(days=max(1, (prev.weekday() + 6) % 7 - 3))
-
-                if prev.date() in trading_holidays:
-                    continue
-
-                break
+    # Validates the period
+    get_time_delta(period, candle_interval)
 
-            prev = prev.replace(hour=15)
-            prev = prev.replace(minute=30)
-            prev = prev - delta
-
-        sequence.append(prev)
-
-    return sequence
+    return calendar.get_time_sequence(candle_interval, candle_length, start_time)
 
 
 def get_time_delta(period, candle_interval):
@@ -80,20 +67,52 @@ def get_previous_trading_day():
 
 
 def get_n_previous_trading_days(n, start_date):
-    start = start_date
-    delta = datetime.timedelta(days=1)
-    trading_days = []
+    """
+    :param n: Number of trading days
+    :param start_date: A date or a datetime. Trading days of a datetime keep its time
+    :return: n most recent trading days up to and including the start date. Most recent first
+    """
+    if isinstance(start_date, datetime.datetime):
+        return [start_date - (start_date.date() - day) for day in calendar.get_trading_days(n, start_date.date())]
+
+    return calendar.get_trading_days(n, start_date)
+
+
+def to_epoch_minute(t):
+    """
+    Integer key of a candle time. Candles are compared and stored by this key instead of their string form
+    :param t: datetime or pandas timestamp
+    :return: Number of minutes since the unix epoch. Seconds are dropped
+    """
+    return (t.toordinal() - EPOCH_ORDINAL) * 24 * 60 + t.hour * 60 + t.minute
+
+
+def to_epoch_minutes(times):
+    """
+    Vectorised to_epoch_minute
+    :param times: DatetimeIndex or any array like of times
+    :return: numpy array of int64 keys
+    """
+    if len(times) == 0:
+        return np.empty(0, dtype=np.int64)
 
-    while n > 0:
-        if start.weekday() == 5 or start.weekday() == 6 or start in trading_holidays:
-            start = start - delta
-            continue
+    return np.asarray(times, dtype='datetime64[ns]').astype('datetime64[m]').astype(np.int64)
 
-        trading_days.append(start)
-        start = start - delta
-        n = n - 1
 
-    return trading_days
+def from_epoch_minutes(keys):
+    """
+    :param keys: array like of epoch minutes
+    :return: DatetimeIndex of the candle times
+    """
+    return pd.DatetimeIndex(np.asarray(keys, dtype=np.int64).astype('datetime64[m]').astype('datetime64[ns]'),
+                            name='ts')
+
+
+def get_trading_days_between(start_date, end_date):
+    """
+    :return: trading days from the start date till the end date (both inclusive) in ascending order
+    """
+    return calendar.get_trading_days_between(start_date, end_date)
 
 
 def get_missing_time(actual_time_list, expected_time_list):
@@ -110,19 +129,20 @@ def get_allowed_time_slots(period, candle_interval):
     If its a 15 min candle, 09:30, 09:45, ... , 15:00, 15:15, 15:30
     :return: a list of allowed time slots
     """
-    start_time = datetime.datetime.now()
-    end_time = start_time.replace(hour=15, minute=30, second=0, microsecond=0)
-    start_time = start_time.replace(hour=9, minute=15, second=0, microsecond=0)
-    delta = get_time_delta(period, candle_interval)
-    start_time = start_time + delta
+    # Validates the period
+    get_time_delta(period, candle_interval)
 
-    allowed_time_slots = []
+    return list(calendar.get_allowed_time_slots(candle_interval))
 
-    while start_time <= end_time:
-        allowed_time_slots.append(start_time.strftime('%H:%M'))
-        start_time = start_time + delta
 
-    return allowed_time_slots
+def is_allowed_time(period, candle_interval, candle_time):
+    """
+    Same as checking if the candle time (hour and minute) is one of the allowed time slots, without any string
+    formatting or searching
+    """
+    get_time_delta(period, candle_interval)
+
+    return calendar.is_allowed_time(candle_interval, candle_time)
 
 
 '''
@@ -0,0 +1,36 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket rate limiter.
+    Tokens are added at a constant rate up to the capacity. Every call takes one token and waits until one is
+    available. The capacity decides how many calls can burst at once after an idle period
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("Rate of the token bucket should be positive. Given {}".format(rate))
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens = self.tokens - 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
@@ -0,0 +1,164 @@
+import datetime
+from functools import lru_cache
+
+# Session boundaries as minutes of the day
+MARKET_OPEN_MINUTE = 9 * 60 + 15
+MARKET_CLOSE_MINUTE = 15 * 60 + 30
+
+MINUTES_IN_A_DAY = 24 * 60
+
+
+class TradingCalendar:
+    """
+    Precomputed trading days for a range of years.
+    Every calendar day of the range is mapped (by its ordinal) to the trading day just before it. Together with
+    candle times represented as minutes of the day, this answers the previous candle, candle sequence, time slot and
+    previous trading day questions with integer arithmetic instead of walking datetimes day by day.
+    Dates outside the range fall back to walking the weekdays
+    """
+
+    def __init__(self, start_year, end_year, holidays):
+        if start_year > end_year:
+            raise ValueError("Calendar cannot start ({}) after it ends ({})".format(start_year, end_year))
+
+        self.holidays = frozenset(holidays)
+
+        self.first_ordinal = datetime.date(start_year, 1, 1).toordinal()
+        self.last_ordinal = datetime.date(end_year, 12, 31).toordinal()
+
+        # All the trading days of the range in ascending order
+        self.trading_days = []
+
+        # Calendar day (relative to the first day) to the number of trading days up to and including it
+        self.trading_day_counts = []
+
+        for ordinal in range(self.first_ordinal, self.last_ordinal + 1):
+            day = datetime.date.fromordinal(ordinal)
+            if self.is_trading_day(day):
+                self.trading_days.append(day)
+
+            self.trading_day_counts.append(len(self.trading_days))
+
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day not in self.holidays
+
+    def get_previous_trading_day(self, day):
+        """
+        :param day: Any calendar day
+        :return: The trading day just before the day
+        """
+        ordinal = day.toordinal()
+
+        if self.first_ordinal < ordinal <= self.last_ordinal + 1:
+            count = self.trading_day_counts[ordinal - 1 - self.first_ordinal]
+            if count > 0:
+                return self.trading_days[count - 1]
+
+        # Outside the range. Walk the weekdays
+        day = day - datetime.timedelta(days=1)
+        while not self.is_trading_day(day):
+            day = day - datetime.timedelta(days=1)
+
+        return day
+
+    def get_trading_days(self, n, day):
+        """
+        :param n: Number of trading days
+        :param day: Any calendar day
+        :return: n most recent trading days up to and including the day. Most recent first
+        """
+        ordinal = day.toordinal()
+
+        if self.first_ordinal <= ordinal <= self.last_ordinal:
+            count = self.trading_day_counts[ordinal - self.first_ordinal]
+            if count >= n:
+                return list(reversed(self.trading_days[count - n:count]))
+
+        trading_days = []
+        if self.is_trading_day(day):
+            trading_days.append(day)
+
+        while len(trading_days) < n:
+            day = self.get_previous_trading_day(day)
+            trading_days.append(day)
+
+        return trading_days
+
+    def get_trading_days_between(self, first_day, last_day):
+        """
+        :return: trading days from the first day till the last day (both inclusive) in ascending order
+        """
+        first_ordinal = first_day.toordinal()
+        last_ordinal = last_day.toordinal()
+
+        if self.first_ordinal <= first_ordinal and last_ordinal <= self.last_ordinal:
+            if last_ordinal < first_ordinal:
+                return []
+
+            first = self.trading_day_counts[first_ordinal - self.first_ordinal - 1] \
+                if first_ordinal > self.first_ordinal else 0
+            last = self.trading_day_counts[last_ordinal - self.first_ordinal]
+            return self.trading_days[first:last]
+
+        trading_days = []
+        day = first_day
+        while day <= last_day:
+            if self.is_trading_day(day):
+                trading_days.append(day)
+            day = day + datetime.timedelta(days=1)
+
+        return trading_days
+
+    def get_time_sequence(self, candle_interval, candle_length, start_time):
+        """
+        Candle start times of the candle_length candles before the start time. Stepping back from the first candle of
+        the session (09:15) lands on the last candle of the previous trading day
+        :param candle_interval: Candle interval in minutes
+        :param candle_length: Number of candles
+        :param start_time: Candle end time
+        :return: a list of candle times. Most recent first
+        """
+        return list(self.get_cached_time_sequence(candle_interval, candle_length, start_time.replace(second=0)))
+
+    @lru_cache(maxsize=4096, typed=True)
+    def get_cached_time_sequence(self, candle_interval, candle_length, start_time):
+        ordinal = start_time.toordinal()
+        minute = start_time.hour * 60 + start_time.minute
+
+        sequence = []
+        for i in range(candle_length):
+            minute = minute - candle_interval
+
+            if minute < 0:
+                ordinal = ordinal - 1
+                minute = minute + MINUTES_IN_A_DAY
+
+            if MARKET_OPEN_MINUTE - 15 <= minute < MARKET_OPEN_MINUTE:
+                # Before the market opens. Move to the last candle of the previous trading day
+                ordinal = self.get_previous_trading_day(datetime.date.fromordinal(ordinal)).toordinal()
+                minute = MARKET_CLOSE_MINUTE - candle_interval
+
+            day = datetime.date.fromordinal(ordinal)
+            sequence.append(start_time.replace(year=day.year, month=day.month, day=day.day,
+                                               hour=minute // 60, minute=minute % 60))
+
+        return tuple(sequence)
+
+    @staticmethod
+    def is_allowed_time(candle_interval, candle_time):
+        """
+        Checks if the candle time is the end of a candle of the session. For 1 min candles, those are 09:16, 09:17,
+        ..., 15:30 and for 15 min candles, those are 09:30, 09:45, ..., 15:30
+        """
+        session_minute = candle_time.hour * 60 + candle_time.minute - MARKET_OPEN_MINUTE
+        return 0 < session_minute <= MARKET_CLOSE_MINUTE - MARKET_OPEN_MINUTE and session_minute % candle_interval == 0
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_allowed_time_slots(candle_interval):
+        slots = []
+
+        for minute in range(MARKET_OPEN_MINUTE + candle_interval, MARKET_CLOSE_MINUTE + 1, candle_interval):
+            slots.append("{:02d}:{:02d}".format(minute // 60, minute % 60))
+
+        return tuple(slots)